@@ -1,8 +1,13 @@
 import logging
 from enum import Enum
-from functools import cache, cached_property
+from functools import cache, cached_property, partial
+from time import perf_counter
 
+from PuzzleCache import solutionCache
+from PuzzleFormats import normalizePuzzle
+from PuzzleStore import solutionStore
 from py2runtime import RuntimePy as rt
+from py2runtime import pythonRuntimes, supportedRuntimes
 
 uiLogger = logging.getLogger("uiLogger")
 
@@ -31,7 +36,7 @@ class SudokuPuzzle(object):
         if ptype is dict:
             for sqKey, sqValue in inPuzzle.items():
                 pzl[sqKey] = [int(sqValue)]
-        elif ptype is str and len(inPuzzle) == 81:
+        elif ptype is str and (inPuzzle := normalizePuzzle(inPuzzle)):
             for idx, val in enumerate(inPuzzle):
                 if val != ".":
                     pzl[self.squares[idx]] = [int(val)]
@@ -43,10 +48,8 @@ class SudokuPuzzle(object):
 
     @runtime.setter
     def runtime(self, lang: str) -> None:
-        if lang.lower() not in ["luajit", "lua", "julia", "python"]:
-            raise ValueError(
-                "Invalid language specified. Choose from 'luajit','lua', 'julia', or 'python'."
-            )
+        if lang.lower() not in supportedRuntimes:
+            raise ValueError(f"Invalid language specified. Choose from {supportedRuntimes}.")
         self.lang = lang
         rt.lang = lang
 
@@ -62,7 +65,7 @@ class SudokuPuzzle(object):
             return sorted(list(rt.definitions.rowNames.values()))
         elif self.runtime == "julia":
             return sorted(list(rt.definitions.rowNames))
-        elif self.runtime == "python":
+        elif self.runtime in pythonRuntimes:
             return sorted(rt.definitions.rowNames)
 
     @cached_property
@@ -77,7 +80,7 @@ class SudokuPuzzle(object):
             return sorted(list(rt.definitions.colNames.values()))
         elif self.runtime == "julia":
             return sorted(list(rt.definitions.columnNames))
-        elif self.runtime == "python":
+        elif self.runtime in pythonRuntimes:
             return sorted(rt.definitions.columnNames)
 
     @cached_property
@@ -92,7 +95,7 @@ class SudokuPuzzle(object):
             return sorted(list(rt.definitions.allKeys.values()), reverse=False)
         elif self.runtime == "julia":
             return sorted(list(rt.definitions.squares), reverse=False)
-        elif self.runtime == "python":
+        elif self.runtime in pythonRuntimes:
             return sorted(rt.definitions.squares)
 
     @cache
@@ -141,41 +144,206 @@ class SudokuPuzzle(object):
             return list(rt.definitions["getNeighbors"](squareID))
         elif self.runtime == "julia":
             return list(rt.definitions.neighbors[squareID])
-        elif self.runtime == "python":
+        elif self.runtime in pythonRuntimes:
             return rt.definitions.neighbors[squareID]
 
-    def solve(self) -> dict[str, str]:
-        puzzleArg = self.value
+    def solve(
+        self,
+        portfolio=None,
+        timeLimit_ms: float | None = None,
+        maxNodes: int | None = None,
+        cancelToken=None,
+        useCache: bool = True,
+        useStore: bool = True,
+        **solverOptions,
+    ) -> dict[str, str]:
+        """
+        Solve the puzzle with the selected runtime.
+
+        A solve can be bounded by time, by search nodes and by a cancel token. When a limit is
+        hit the result comes back with what was done so far instead of hanging, see status below.
+
+        Args:
+            portfolio (iterable | bool): Configurations to race against each other instead of
+                solving with the selected runtime, see PuzzlePortfolio. True races the default
+                portfolio. The result records the winner under "portfolio", unless it is a
+                cache or store hit.
+            timeLimit_ms (float): Milliseconds the solve may take. None for no limit.
+            maxNodes (int): Most search nodes to expand. None for no limit.
+            cancelToken: Object with an is_set() method, e.g. a threading.Event, that stops the
+                solve once set from another thread or process.
+            useCache (bool): Look the puzzle up in PuzzleCache.solutionCache first, and store the
+                result there. Relabeled, transposed and band/stack permuted copies of a solved
+                puzzle are hits. A hit has cacheHit set and the lookup time as duration_ms.
+            useStore (bool): Look the puzzle up in the persistent PuzzleStore next, and store the
+                result there. A hit has storeHit set and the lookup time as duration_ms.
+            **solverOptions: Extra keyword arguments for the python solvers, e.g. rules=() to turn
+                off the PySolver propagation rules. Ignored by the lua and julia runtimes. The
+                cache and the store are skipped when any are given, their metrics belong to the
+                default options.
+
+        Returns:
+            dict: The solver result dictionary with difficultyLevel added. "status" is "solved",
+                "unsolvable", "timeout" (out of time or nodes) or "cancelled". Results from the
+                cache or the store name the runtime their metrics belong to under "runtime".
+        """
+        tStart = perf_counter()
+        if solverOptions:
+            useCache = useStore = False
+        puzzleString = self.valueString() if useCache or useStore else None
+        store = solutionStore() if useStore else None
+        result = solutionCache.get(puzzleString) if useCache else None
+        hitKey = "cacheHit"
+        if result is None and store is not None:
+            result = store.get(puzzleString, None if portfolio else rt.lang)
+            hitKey = "storeHit"
+            if result is not None and useCache:
+                solutionCache.put(puzzleString, result)
+        if result is not None:
+            # No race was run for a hit, so it neither carries a portfolio nor counts as a win
+            result.pop("portfolio", None)
+            if result["solution"]:
+                result["solution"] = dict(zip(self.squares, result["solution"]))
+            if "numRecursions" in result:
+                result["difficultyLevel"] = getDifficulty(result["numRecursions"])
+            result.update({hitKey: True, "duration_ms": (perf_counter() - tStart) * 1000.0})
+            self.solution = dict(result["solution"]) if result["solution"] else None
+            return result
+
+        if portfolio:
+            result = self._solvePortfolio(portfolio, solverOptions)
+        else:
+            result = self._solveWithRuntime(timeLimit_ms, maxNodes, cancelToken, solverOptions)
+
+        # Only final answers are kept, not solves cut short by a budget. The metrics are kept
+        # under the configuration that produced them, the winner of a portfolio
+        if puzzleString and result["status"] in ("solved", "unsolvable"):
+            solutionString = self.solution and "".join(self.solution[sq] for sq in self.squares)
+            statsRuntime = result["portfolio"]["winner"] if portfolio else rt.lang
+            entry = dict(result, solution=solutionString or False, runtime=statsRuntime)
+            entry.pop("portfolio", None)
+            if useCache:
+                solutionCache.put(puzzleString, entry)
+            if store is not None:
+                store.put(puzzleString, statsRuntime, entry)
+        return result
+
+    def _solveWithRuntime(
+        self, timeLimit_ms: float | None, maxNodes: int | None, cancelToken, solverOptions: dict
+    ) -> dict:
+        """Solve the puzzle with the selected runtime, see solve."""
+        puzzleArg = self._runtimePuzzle()
 
         self.lang = rt.lang
+        solveArgs = ()
         if rt.lang == "luajit" or rt.lang == "lua":
-            puzzleArg = {
-                k: "".join([str(x) for x in puzzleArg[k]]) for k in puzzleArg.keys()
-            }  # temporary
-            puzzleArg = rt.dict2Table(puzzleArg)
             solveFun = rt.solver["solve"]
+            # Lua functions take positional arguments only, nil for the budgets not set. Lua
+            # only has cpu time, so time limits and durations are read from the python clock
+            solveArgs = (
+                timeLimit_ms,
+                maxNodes,
+                self._cancelCheck(cancelToken),
+                lambda: perf_counter() * 1000.0,
+            )
         elif rt.lang == "julia":
-            puzzleArg = rt.runtime.copy(rt.definitions.puzzle0)
-            for k, v in self.value.items():
-                puzzleArg[k] = v
-            solveFun = rt.solver.solve
-        elif rt.lang == "python":
-            solveFun = rt.solver
+            solveFun = partial(
+                rt.solver.solve,
+                timeLimit_ms=timeLimit_ms,
+                maxNodes=maxNodes,
+                isCancelled=self._cancelCheck(cancelToken),
+            )
+        elif rt.lang in pythonRuntimes:
+            # Only pass the budgets that are set, so solvers without budgets still work
+            budgets = dict(timeLimit_ms=timeLimit_ms, maxNodes=maxNodes, cancelToken=cancelToken)
+            solverOptions.update((k, v) for k, v in budgets.items() if v is not None)
+            solveFun = partial(rt.solver, **solverOptions)
             # Everything is ready to call
 
-        result = solveFun(puzzleArg)
+        result = solveFun(puzzleArg, *solveArgs)
 
-        if self._lang != "python":  # Convert lua table to a dict
+        if rt.lang not in pythonRuntimes:  # Convert lua table to a dict
             result = dict(result)
-            result["solution"] = dict(result["solution"])
+            # lua returns -1 and julia false when there is no solution
+            if result["solution"] in (-1, False):
+                result["solution"] = False
+            else:
+                result["solution"] = dict(result["solution"])
+        result.setdefault("status", "solved" if result["solution"] else "unsolvable")
 
         if type(result) is dict and "numRecursions" in result:
             result["difficultyLevel"] = getDifficulty(result["numRecursions"])
 
-        self.solution = dict(result["solution"])
+        self.solution = dict(result["solution"]) if result["solution"] else None
+
+        return result
+
+    @staticmethod
+    def _cancelCheck(cancelToken):
+        """Wrap a cancel token into a function without arguments the lua or julia solver can
+        poll. Polling through a python function gives the thread that sets the token a chance to
+        run.
+        """
+        if cancelToken is None:
+            return None
+        if rt.lang == "julia":
+            rt.runtime.seval("import PythonCall")
+            return rt.runtime.seval("isSet -> () -> PythonCall.pyconvert(Bool, isSet())")(
+                lambda: cancelToken.is_set()
+            )
+        return lambda: cancelToken.is_set()
+
+    def _solvePortfolio(self, portfolio, solverOptions: dict) -> dict:
+        """Race a portfolio of configurations on the puzzle, see solve."""
+        from PuzzlePortfolio import defaultPortfolio, solvePortfolio
 
+        configurations = defaultPortfolio if portfolio is True else portfolio
+        result = solvePortfolio(self.valueString(), configurations, **solverOptions)
+        if result["solution"]:
+            result["solution"] = dict(zip(self.squares, result["solution"]))
+        self.solution = dict(result["solution"]) if result["solution"] else None
         return result
 
+    def countSolutions(self, limit: int = 2) -> int:
+        """
+        Count the solutions of the puzzle with the selected runtime, stopping at limit.
+
+        A well-posed puzzle has exactly one solution, so countSolutions() == 1 checks it.
+
+        Args:
+            limit (int): Stop searching after this many solutions.
+
+        Returns:
+            int: Number of solutions found, at most limit.
+        """
+        puzzleArg = self._runtimePuzzle()
+        if rt.lang == "luajit" or rt.lang == "lua":
+            return int(rt.solver["countSolutions"](puzzleArg, limit))
+        elif rt.lang == "julia":
+            return int(rt.solver.countSolutions(puzzleArg, limit))
+        # Every python runtime shares the PySolver definitions module
+        return rt.definitions.countSolutions(puzzleArg, limit)
+
+    def valueString(self) -> str:
+        """The puzzle as an 81 character string, '.' for squares that are not fixed."""
+        return "".join(
+            str(self.value[sq][0]) if len(self.value[sq]) == 1 else "." for sq in self.squares
+        )
+
+    def _runtimePuzzle(self):
+        """Convert the puzzle value into the argument type the selected runtime expects."""
+        puzzleArg = self.value
+        if rt.lang == "luajit" or rt.lang == "lua":
+            puzzleArg = {
+                k: "".join([str(x) for x in puzzleArg[k]]) for k in puzzleArg.keys()
+            }  # temporary
+            puzzleArg = rt.dict2Table(puzzleArg)
+        elif rt.lang == "julia":
+            puzzleArg = rt.runtime.copy(rt.definitions.puzzle0)
+            for k, v in self.value.items():
+                puzzleArg[k] = v
+        return puzzleArg
+
     def clear(self):
         self.value = "." * 81
         self.solution = None
@@ -0,0 +1,613 @@
+"""
+Solve many puzzles across a pool of worker processes.
+
+Every worker process sets up its own solver runtime through SudokuPuzzle, exactly like the GUI
+does for a single puzzle, once when the worker starts. Puzzles are sent to the workers in chunks
+and only a bounded number of chunks is in flight at any time, so memory stays flat no matter how
+long the input is.
+"""
+
+import logging
+import multiprocessing
+import os
+import threading
+from collections.abc import Iterable, Iterator
+from concurrent.futures import FIRST_COMPLETED, Future, ProcessPoolExecutor, wait
+from itertools import count, islice
+from time import perf_counter, sleep
+
+from py2runtime import supportedRuntimes
+from PuzzleCorpus import PuzzleCorpus, defaultScoreBands, isCorpusFile
+from PuzzleFormats import readPuzzleFile
+
+uiLogger = logging.getLogger("uiLogger")
+
+
+def readPuzzles(source: str = "-", puzzleFormat: str | None = None) -> Iterator[str]:
+    """Read puzzles one at a time from a file or stdin.
+    Text files are read with PuzzleFormats.readPuzzleFile, which takes one puzzle per line,
+    puzzles.csv style CSV, JSONL and .sdk/.ss grids, each possibly gzip, xz or zstd compressed.
+    Corpus files written by PuzzleCorpus.convertCsv are read from their memory map.
+    Args:
+            source (str): Path of the input file, "-" for stdin.
+            puzzleFormat (str): Format of a text file, see PuzzleFormats.puzzleFormats. Detected
+                from the file when None.
+    Yields:
+            str: One 81 character puzzle string at a time.
+    """
+    if source != "-" and isCorpusFile(source):
+        with PuzzleCorpus(source) as corpus:
+            yield from corpus.puzzles()
+        return
+    yield from readPuzzleFile(source, puzzleFormat)
+
+
+def readPuzzlesByScore(
+    source: str,
+    scoreRange: tuple[float, float] | None = None,
+    perBand: int | None = None,
+    bands=defaultScoreBands,
+    seed: int | None = None,
+) -> Iterator[str]:
+    """Read the puzzles of a corpus file selected through its score index.
+    Args:
+            source (str): Path of a corpus file, see PuzzleCorpus.
+            scoreRange (tuple): Only puzzles with a score in [low, high], easiest first.
+            perBand (int): Instead draw this many random puzzles from every score band.
+            bands (sequence): Band edges for perBand, see ScoreIndex.sample.
+            seed (int): Seed of the perBand draw.
+    Yields:
+            str: One 81 character puzzle string at a time.
+    Raises:
+            ValueError: If source is not a corpus file.
+    """
+    if not isCorpusFile(source):
+        raise ValueError(f"{source} is not a corpus file, convert it with the corpus command")
+    with PuzzleCorpus(source) as corpus:
+        if perBand is not None:
+            yield from corpus.sampleByScore(perBand, bands, seed)
+        elif scoreRange is not None:
+            yield from corpus.byScore(*scoreRange)
+        else:
+            yield from corpus.puzzles()
+
+
+def latencyStats(latencies_ms: list[float]) -> dict[str, float]:
+    """Summarize a list of latencies in milliseconds.
+    Returns:
+            dict: mean, p50, p90, p99 and max latency, all 0.0 for an empty list.
+    """
+    if not latencies_ms:
+        return {"mean": 0.0, "p50": 0.0, "p90": 0.0, "p99": 0.0, "max": 0.0}
+    ordered = sorted(latencies_ms)
+
+    def _percentile(pct: float) -> float:
+        return ordered[min(len(ordered) - 1, int(pct / 100.0 * len(ordered)))]
+
+    return {
+        "mean": sum(ordered) / len(ordered),
+        "p50": _percentile(50),
+        "p90": _percentile(90),
+        "p99": _percentile(99),
+        "max": ordered[-1],
+    }
+
+
+def solveChunk(firstIndex: int, puzzles: list, runtime: str, solverOptions: dict) -> list[dict]:
+    """Solve a chunk of puzzles in this process, e.g. inside a worker process.
+    Args:
+            firstIndex (int): Position of the first puzzle of the chunk in the input.
+            puzzles (list): Puzzle values accepted by SudokuPuzzle, e.g. 81 character strings.
+            runtime (str): Solver runtime to use.
+            solverOptions (dict): Extra keyword arguments for SudokuPuzzle.solve.
+    Returns:
+            list[dict]: One result per puzzle, see solveMany.
+    """
+    from Puzzle import SudokuPuzzle
+
+    results = []
+    for index, value in enumerate(puzzles, firstIndex):
+        try:
+            puzzle = SudokuPuzzle(lang=runtime, value=value)
+            result = puzzle.solve(**solverOptions)
+        except Exception as err:
+            uiLogger.error(f"Failed to solve puzzle {index}: {err}")
+            results.append({"index": index, "solution": False, "error": str(err)})
+            continue
+
+        if result["solution"]:
+            result["solution"] = "".join(result["solution"][sq] for sq in puzzle.squares)
+        result["index"] = index
+        results.append(result)
+    return results
+
+
+# Set once per worker process by _initWorker
+_workerInitTime_ms: float = 0.0
+
+# Shared with the pool that started the worker, cancellable tasks numbered below it stop at
+# their next check, see SolverPool.cancel
+_cancelledBefore = None
+
+# Easy puzzle solved while a worker starts, so lazy imports and JIT compilation are done before
+# the first real puzzle arrives
+warmupPuzzle: str = (
+    "..5...7....38.1..5..2.6..399...8...7.....5....7.2..14...........8613............3"
+)
+
+
+def _initWorker(runtime: str, cancelledBefore=None) -> None:
+    """Pool initializer. Brings up the solver runtime once when a worker process starts.
+    The time it takes is kept in _workerInitTime_ms and reported back with every chunk.
+    """
+    global _workerInitTime_ms, _cancelledBefore
+    _cancelledBefore = cancelledBefore
+    tStart = perf_counter()
+    from Puzzle import SudokuPuzzle
+
+    SudokuPuzzle(lang=runtime, value=warmupPuzzle).solve(useCache=False, useStore=False)
+    _workerInitTime_ms = (perf_counter() - tStart) * 1000.0
+
+
+def _workerInfo(holdSeconds: float = 0.0) -> tuple[int, float]:
+    """Return the pid and runtime init time of the worker running this task, after holding the
+    worker for holdSeconds.
+    """
+    sleep(holdSeconds)
+    return os.getpid(), _workerInitTime_ms
+
+
+class _TaskCancelToken(object):
+    """Cancel token of a cancellable task, set through SolverPool.cancel."""
+
+    def __init__(self, taskNumber: int):
+        self.taskNumber = taskNumber
+
+    def is_set(self) -> bool:
+        return _cancelledBefore.value > self.taskNumber
+
+
+def _solveChunkInWorker(
+    firstIndex: int,
+    puzzles: list,
+    runtime: str,
+    solverOptions: dict,
+    taskNumber: int | None = None,
+) -> tuple[int, float, list[dict]]:
+    """solveChunk for pool workers, with the worker pid and init time added. Cancellable tasks
+    have a taskNumber and solve with its cancel token.
+    """
+    if taskNumber is not None:
+        solverOptions = dict(solverOptions, cancelToken=_TaskCancelToken(taskNumber))
+    return os.getpid(), _workerInitTime_ms, solveChunk(firstIndex, puzzles, runtime, solverOptions)
+
+
+def _attachSharedMemory(name: str):
+    """Attach to a shared memory block created by another process without taking ownership.
+    The creating process unlinks the block, so the attaching side must not track it.
+    """
+    from multiprocessing import shared_memory
+
+    try:
+        return shared_memory.SharedMemory(name=name, track=False)
+    except TypeError:
+        # track was added in python 3.13. Before that attaching registers the block again, which
+        # is harmless as long as the worker shares the resource tracker of the parent, see
+        # SolverPool
+        return shared_memory.SharedMemory(name=name)
+
+
+# Status of each puzzle in SharedBatchResults
+STATUS_PENDING: int = 0
+STATUS_SOLVED: int = 1
+STATUS_UNSOLVABLE: int = 2
+STATUS_ERROR: int = 3
+STATUS_TIMEOUT: int = 4
+STATUS_CANCELLED: int = 5
+
+
+class SharedBatchResults(object):
+    """Result buffers for a batch run, kept in one multiprocessing.shared_memory block.
+
+    Workers write straight into the block and the parent reads it through memoryviews, so no
+    result is ever pickled. Every field is a fixed width column over the N puzzles, laid out so
+    each column is aligned for its type:
+        duration_ms     N float64
+        numRecursions   N int32
+        numOperations   N int32
+        status          N uint8, one of the STATUS_ values
+        solutions       N * 81 ascii digits, zero bytes while a puzzle has no solution
+    """
+
+    recordSize: int = 8 + 4 + 4 + 1 + 81
+
+    def __init__(self, numPuzzles: int, name: str | None = None):
+        from multiprocessing import shared_memory
+
+        self.numPuzzles = numPuzzles
+        if name is None:
+            self.shm = shared_memory.SharedMemory(
+                create=True, size=max(1, numPuzzles * self.recordSize)
+            )
+        else:
+            self.shm = _attachSharedMemory(name)
+
+        buf = self.shm.buf
+        n = numPuzzles
+        self.duration_ms = buf[0 : 8 * n].cast("d")
+        self.numRecursions = buf[8 * n : 12 * n].cast("i")
+        self.numOperations = buf[12 * n : 16 * n].cast("i")
+        self.status = buf[16 * n : 17 * n]
+        self.solutions = buf[17 * n : 98 * n]
+
+    @property
+    def name(self) -> str:
+        return self.shm.name
+
+    def solution(self, index: int) -> str | None:
+        """Return the solution of one puzzle as an 81 character string, None if there is none."""
+        if self.status[index] != STATUS_SOLVED:
+            return None
+        return bytes(self.solutions[81 * index : 81 * (index + 1)]).decode("ascii")
+
+    def write(self, index: int, result: dict | None) -> None:
+        """Store one solver result, None marks a puzzle that raised."""
+        if result is None:
+            self.status[index] = STATUS_ERROR
+            return
+        self.numRecursions[index] = result["numRecursions"]
+        self.numOperations[index] = result["numOperations"]
+        self.duration_ms[index] = result["duration_ms"]
+        if result["solution"]:
+            self.solutions[81 * index : 81 * (index + 1)] = result["solution"].encode("ascii")
+            self.status[index] = STATUS_SOLVED
+        elif result.get("status") == "timeout":
+            self.status[index] = STATUS_TIMEOUT
+        elif result.get("status") == "cancelled":
+            self.status[index] = STATUS_CANCELLED
+        else:
+            self.status[index] = STATUS_UNSOLVABLE
+
+    def close(self) -> None:
+        """Release the views and detach from the block. The block itself stays alive."""
+        for view in (
+            self.duration_ms,
+            self.numRecursions,
+            self.numOperations,
+            self.status,
+            self.solutions,
+        ):
+            view.release()
+        self.shm.close()
+
+    def unlink(self) -> None:
+        """Free the shared memory block. Only the process that created it should call this."""
+        self.shm.unlink()
+
+    def __enter__(self) -> "SharedBatchResults":
+        return self
+
+    def __exit__(self, *excInfo) -> None:
+        self.close()
+        self.unlink()
+
+
+def _solveChunkShared(
+    shmName: str,
+    numPuzzles: int,
+    firstIndex: int,
+    puzzles: list,
+    runtime: str,
+    solverOptions: dict,
+) -> tuple[int, float, int]:
+    """Solve a chunk of puzzles inside a worker process and write the results to shared memory.
+    Returns:
+            tuple: Worker pid, its init time and the number of puzzles written. Only these small
+                values go back to the parent.
+    """
+    results = SharedBatchResults(numPuzzles, name=shmName)
+    try:
+        for result in solveChunk(firstIndex, puzzles, runtime, solverOptions):
+            results.write(result["index"], None if "error" in result else result)
+    finally:
+        results.close()
+    return os.getpid(), _workerInitTime_ms, len(puzzles)
+
+
+class SolverPool(object):
+    """A pool of worker processes that each keep one solver runtime warm.
+
+    Every worker brings up its runtime once in the pool initializer, so the LuaRuntime, the
+    Julia packages and the solver modules are loaded once per process instead of once per
+    batch. Hold on to the pool across batch calls to keep the workers warm, and close it, or
+    use it as a context manager, when done.
+
+    The init time of every worker is collected in workerInitTimes_ms, separate from the solve
+    times in the results.
+
+    Chunks submitted with cancellable=True can be stopped early with cancel, e.g. the losers of
+    a portfolio race.
+    """
+
+    def __init__(self, workers: int | None = None, runtime: str = "python"):
+        if runtime.lower() not in supportedRuntimes:
+            raise ValueError(f"Invalid runtime: {runtime}. Must be one of {supportedRuntimes}.")
+        self.workers = workers or os.cpu_count() or 1
+        self.runtime = runtime.lower()
+        # Worker pid to the time its runtime took to come up
+        self.workerInitTimes_ms: dict[int, float] = {}
+        uiLogger.info(f"Starting {self.workers} {self.runtime} workers")
+        if os.name == "posix":
+            # Workers inherit a running resource tracker, so shared memory blocks they attach to
+            # are tracked once, by the parent that unlinks them
+            from multiprocessing import resource_tracker
+
+            resource_tracker.ensure_running()
+        # Number of the next cancellable task, and the shared number below which they stop
+        self._numCancellable = 0
+        self._cancelledBefore = multiprocessing.Value("q", 0, lock=False)
+        self._cancelLock = threading.Lock()
+        self._executor = ProcessPoolExecutor(
+            max_workers=self.workers,
+            initializer=_initWorker,
+            initargs=(self.runtime, self._cancelledBefore),
+        )
+
+    def warmup(self, maxRounds: int = 20) -> dict[int, float]:
+        """Start every worker now instead of on the first batch.
+        Args:
+                maxRounds (int): Rounds of tasks to submit before giving up on reaching every
+                    worker.
+        Returns:
+                dict: Worker pid to runtime init time in milliseconds.
+        """
+        for _ in range(maxRounds):
+            if len(self.workerInitTimes_ms) >= self.workers:
+                break
+            # Every task holds its worker for a moment, so one worker can not take them all
+            futures = [self._executor.submit(_workerInfo, 0.05) for _ in range(self.workers)]
+            for future in futures:
+                pid, initTime_ms = future.result()
+                self.workerInitTimes_ms[pid] = initTime_ms
+        return self.workerInitTimes_ms
+
+    def submit(self, puzzles: list, cancellable: bool = False, **solverOptions) -> Future:
+        """Solve one chunk of puzzles on a worker without waiting for it.
+        Args:
+                puzzles (list): Puzzle values accepted by SudokuPuzzle.
+                cancellable (bool): Solve with a cancel token that cancel sets. The solvers
+                    then check it while they search, which costs a little time.
+                **solverOptions: Extra keyword arguments for the python solvers.
+        Returns:
+                Future: Resolves to the list of results of the chunk, indexed from 0, see solveMany.
+        """
+        chunkFuture = Future()
+        taskNumber = None
+        if cancellable:
+            with self._cancelLock:
+                taskNumber = self._numCancellable
+                self._numCancellable += 1
+
+        def _chunkDone(workerFuture: Future) -> None:
+            try:
+                pid, initTime_ms, results = workerFuture.result()
+            except BaseException as err:
+                chunkFuture.set_exception(err)
+                return
+            self.workerInitTimes_ms[pid] = initTime_ms
+            chunkFuture.set_result(results)
+
+        workerFuture = self._executor.submit(
+            _solveChunkInWorker, 0, list(puzzles), self.runtime, solverOptions, taskNumber
+        )
+        workerFuture.add_done_callback(_chunkDone)
+        return chunkFuture
+
+    def solveMany(
+        self,
+        puzzles: Iterable,
+        ordered: bool = False,
+        chunkSize: int = 16,
+        maxInFlight: int | None = None,
+        **solverOptions,
+    ) -> Iterator[dict]:
+        """Solve puzzles on the pool and yield the results as they finish, see solveMany."""
+        maxInFlight = maxInFlight or 4 * self.workers
+        puzzleIter = iter(puzzles)
+        nextIndex = 0
+        # Chunk index of the next chunk to yield when ordered, and finished chunks waiting for it
+        nextChunkToYield = 0
+        finishedChunks: dict[int, list[dict]] = {}
+        pending = {}
+
+        def _submitChunks() -> None:
+            nonlocal nextIndex
+            while len(pending) + len(finishedChunks) < maxInFlight:
+                chunk = list(islice(puzzleIter, chunkSize))
+                if not chunk:
+                    return
+                chunkIdx = nextIndex // chunkSize
+                future = self._executor.submit(
+                    _solveChunkInWorker, nextIndex, chunk, self.runtime, solverOptions
+                )
+                pending[future] = chunkIdx
+                nextIndex += len(chunk)
+
+        _submitChunks()
+        while pending:
+            done, _ = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                chunkIdx = pending.pop(future)
+                pid, initTime_ms, results = future.result()
+                self.workerInitTimes_ms[pid] = initTime_ms
+                if not ordered:
+                    yield from results
+                    continue
+                finishedChunks[chunkIdx] = results
+                while nextChunkToYield in finishedChunks:
+                    yield from finishedChunks.pop(nextChunkToYield)
+                    nextChunkToYield += 1
+            _submitChunks()
+
+    def solveManyShared(
+        self,
+        puzzles: Iterable,
+        numPuzzles: int | None = None,
+        chunkSize: int = 64,
+        maxInFlight: int | None = None,
+        **solverOptions,
+    ) -> "SharedBatchResults":
+        """Solve puzzles on the pool with the results written to shared memory, see
+        solveManyShared.
+        """
+        if numPuzzles is None:
+            numPuzzles = len(puzzles)
+        maxInFlight = maxInFlight or 4 * self.workers
+
+        results = SharedBatchResults(numPuzzles)
+        puzzleIter = islice(puzzles, numPuzzles)
+        pending = set()
+        nextIndex = 0
+        try:
+            while True:
+                while len(pending) < maxInFlight:
+                    chunk = list(islice(puzzleIter, chunkSize))
+                    if not chunk:
+                        break
+                    pending.add(
+                        self._executor.submit(
+                            _solveChunkShared,
+                            results.name,
+                            numPuzzles,
+                            nextIndex,
+                            chunk,
+                            self.runtime,
+                            solverOptions,
+                        )
+                    )
+                    nextIndex += len(chunk)
+                if not pending:
+                    break
+                done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    pid, initTime_ms, _ = future.result()
+                    self.workerInitTimes_ms[pid] = initTime_ms
+        except BaseException:
+            results.close()
+            results.unlink()
+            raise
+        return results
+
+    def cancel(self) -> None:
+        """Stop every cancellable chunk submitted so far. Running solves stop at their next
+        check and come back with status "cancelled", queued ones are cancelled as they start.
+        """
+        with self._cancelLock:
+            self._cancelledBefore.value = self._numCancellable
+
+    def close(self) -> None:
+        """Shut the workers down."""
+        self._executor.shutdown(wait=True, cancel_futures=True)
+
+    def __enter__(self) -> "SolverPool":
+        return self
+
+    def __exit__(self, *excInfo) -> None:
+        self.close()
+
+
+def solveMany(
+    puzzles: Iterable,
+    workers: int | None = None,
+    runtime: str = "python",
+    ordered: bool = False,
+    chunkSize: int = 16,
+    maxInFlight: int | None = None,
+    **solverOptions,
+) -> Iterator[dict]:
+    """
+    Solve puzzles on a process pool and yield the results as they finish.
+
+    The input is consumed lazily. At most maxInFlight chunks are submitted or waiting to be
+    yielded at any time, which keeps memory flat on inputs with millions of puzzles. A pool is
+    started for this call only, hold a SolverPool to reuse warm workers across calls.
+
+    Args:
+        puzzles (Iterable): Puzzle values accepted by SudokuPuzzle, e.g. 81 character strings.
+        workers (int): Number of worker processes. Defaults to the number of CPUs. With a single
+            worker the puzzles are solved in this process, without starting a pool.
+        runtime (str): Solver runtime each worker uses, one of supportedRuntimes.
+        ordered (bool): Yield results in input order instead of completion order.
+        chunkSize (int): Puzzles sent to a worker per task, amortizes the inter process overhead.
+        maxInFlight (int): Most chunks in flight. Defaults to four per worker.
+        **solverOptions: Extra keyword arguments for the python solvers, see SudokuPuzzle.solve.
+
+    Yields:
+        dict: The solver result dictionary of each puzzle with "index", its position in the
+            input, added. The solution is an 81 character string, or False if the puzzle has no
+            solution. Puzzles that raised have an "error" message instead of metrics.
+    """
+    if runtime.lower() not in supportedRuntimes:
+        raise ValueError(f"Invalid runtime: {runtime}. Must be one of {supportedRuntimes}.")
+    workers = workers or os.cpu_count() or 1
+
+    if workers == 1:
+        # Results come out in input order anyway, skip the pool start up and pickling
+        puzzleIter = iter(puzzles)
+        for firstIndex in count(0, chunkSize):
+            chunk = list(islice(puzzleIter, chunkSize))
+            if not chunk:
+                return
+            yield from solveChunk(firstIndex, chunk, runtime, solverOptions)
+
+    with SolverPool(workers, runtime) as pool:
+        yield from pool.solveMany(puzzles, ordered, chunkSize, maxInFlight, **solverOptions)
+
+
+def solveManyShared(
+    puzzles: Iterable,
+    numPuzzles: int | None = None,
+    workers: int | None = None,
+    runtime: str = "python",
+    chunkSize: int = 64,
+    maxInFlight: int | None = None,
+    **solverOptions,
+) -> SharedBatchResults:
+    """
+    Solve puzzles on a process pool with the results written to shared memory.
+
+    Unlike solveMany nothing is returned per puzzle. The workers fill a SharedBatchResults block
+    sized for every puzzle up front and the parent gets zero copy views of all results at the end.
+
+    Args:
+        puzzles (Iterable): Puzzle values accepted by SudokuPuzzle, read lazily.
+        numPuzzles (int): Number of puzzles, defaults to len(puzzles).
+        workers (int): Number of worker processes. Defaults to the number of CPUs.
+        runtime (str): Solver runtime each worker uses, one of supportedRuntimes.
+        chunkSize (int): Puzzles sent to a worker per task.
+        maxInFlight (int): Most chunks in flight. Defaults to four per worker.
+        **solverOptions: Extra keyword arguments for the python solvers, see SudokuPuzzle.solve.
+
+    Returns:
+        SharedBatchResults: The filled result buffers. The caller closes and unlinks them, e.g.
+            by using them as a context manager.
+    """
+    if runtime.lower() not in supportedRuntimes:
+        raise ValueError(f"Invalid runtime: {runtime}. Must be one of {supportedRuntimes}.")
+    if numPuzzles is None:
+        numPuzzles = len(puzzles)
+    workers = workers or os.cpu_count() or 1
+
+    if workers == 1:
+        results = SharedBatchResults(numPuzzles)
+        puzzleIter = islice(puzzles, numPuzzles)
+        for firstIndex in count(0, chunkSize):
+            chunk = list(islice(puzzleIter, chunkSize))
+            if not chunk:
+                break
+            for result in solveChunk(firstIndex, chunk, runtime, solverOptions):
+                results.write(result["index"], None if "error" in result else result)
+        return results
+
+    with SolverPool(workers, runtime) as pool:
+        return pool.solveManyShared(puzzles, numPuzzles, chunkSize, maxInFlight, **solverOptions)
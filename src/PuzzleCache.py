@@ -0,0 +1,168 @@
+"""
+Canonical forms of puzzles and a bounded LRU cache of their solutions.
+
+Relabeling the digits, transposing the grid or reordering its bands and stacks gives a
+different looking puzzle with the same solution, up to the same transform. canonicalForm maps
+every puzzle of such a family to one canonical 81 character string, plus the transform that
+maps the canonical form back. SolutionCache keys the solutions by that canonical string, so a
+relabeled or permuted copy of a solved puzzle is answered from the cache.
+
+Permutations of the rows inside a band, or of the columns inside a stack, are not reduced.
+Trying all of them multiplies the 72 grid transforms used here by 46656.
+"""
+
+from collections import OrderedDict
+from itertools import permutations
+from operator import itemgetter
+
+digits: str = "123456789"
+
+
+def _gridTransforms() -> list[tuple[int, ...]]:
+    """Every combination of transposition, band order and stack order as an index permutation.
+    Entry k of a permutation is the square of the puzzle that goes to square k of the result.
+    """
+    transforms = []
+    for transpose in (False, True):
+        for bandOrder in permutations(range(3)):
+            for stackOrder in permutations(range(3)):
+                rows = [3 * band + row for band in bandOrder for row in range(3)]
+                cols = [3 * stack + col for stack in stackOrder for col in range(3)]
+                squares = [(r, c) for r in range(9) for c in range(9)]
+                if transpose:
+                    squares = [(c, r) for r, c in squares]
+                transforms.append(tuple(9 * rows[r] + cols[c] for r, c in squares))
+    return transforms
+
+
+gridTransforms: list[tuple[int, ...]] = _gridTransforms()
+_transformGetters = [itemgetter(*transform) for transform in gridTransforms]
+_givenPatternTable = str.maketrans(digits, "1" * 9)
+
+
+def canonicalForm(puzzleString: str) -> tuple[str, tuple[int, str]]:
+    """
+    Map a puzzle to the canonical form of its family.
+
+    Every grid transform is applied and the digits of the result are relabeled in order of
+    first appearance. The smallest of those strings is the canonical form.
+
+    Args:
+        puzzleString (str): The puzzle as 81 characters, '.' for blanks.
+
+    Returns:
+        tuple: The canonical 81 character string and the transform used, an index into
+            gridTransforms and the canonical label of each digit 1-9 as a 9 character string.
+            Pass both to fromCanonical to map a canonical solution back.
+    """
+    # Blanks sort before digits, so the canonical form is one with the smallest pattern of
+    # blanks. Only the transforms giving that pattern need relabeling
+    givenPattern = puzzleString.translate(_givenPatternTable)
+    patterns = ["".join(getTransformed(givenPattern)) for getTransformed in _transformGetters]
+    bestPattern = min(patterns)
+
+    best = None
+    for transformIdx, pattern in enumerate(patterns):
+        if pattern != bestPattern:
+            continue
+        transformed = "".join(_transformGetters[transformIdx](puzzleString))
+        # Digits in order of first appearance get the labels 1, 2, 3, ...
+        order = "".join(dict.fromkeys(transformed.replace(".", "")))
+        candidate = transformed.translate(str.maketrans(order, digits[: len(order)]))
+        if best is None or candidate < best[0]:
+            best = (candidate, transformIdx, order)
+
+    canonical, transformIdx, order = best
+    # Digits missing from the puzzle take the labels left over, so the relabeling is complete
+    order += "".join(d for d in digits if d not in order)
+    labels = "".join(digits[order.index(d)] for d in digits)
+    return canonical, (transformIdx, labels)
+
+
+def fromCanonical(canonicalString: str, transform: tuple[int, str]) -> str:
+    """Map a canonical puzzle or solution back through the inverse of a canonicalForm transform."""
+    transformIdx, labels = transform
+    relabeled = canonicalString.translate(str.maketrans(labels, digits))
+    original = ["."] * 81
+    for square, value in zip(gridTransforms[transformIdx], relabeled):
+        original[square] = value
+    return "".join(original)
+
+
+class SolutionCache(object):
+    """Bounded LRU cache of solver results keyed by the canonical form of the puzzle.
+
+    Results are stored with the solution in canonical form, so one entry answers every
+    relabeled, transposed or band/stack permuted copy of the puzzle. The metrics of a hit are
+    those of the solve that filled the entry.
+
+    Args:
+        maxSize (int): Most puzzles kept. The least recently used one is evicted beyond that.
+    """
+
+    def __init__(self, maxSize: int = 10000):
+        self.maxSize = maxSize
+        self._entries: OrderedDict[str, dict] = OrderedDict()
+        self.numHits: int = 0
+        self.numMisses: int = 0
+        self.numEvictions: int = 0
+        # A miss is followed by a put of the same puzzle, so the last canonical form is kept
+        self._lastForm: tuple[str, str, tuple[int, str]] | None = None
+
+    def _canonicalForm(self, puzzleString: str) -> tuple[str, tuple[int, str]]:
+        if self._lastForm is None or self._lastForm[0] != puzzleString:
+            self._lastForm = (puzzleString, *canonicalForm(puzzleString))
+        return self._lastForm[1:]
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get(self, puzzleString: str) -> dict | None:
+        """Return a copy of the cached result with the solution as an 81 character string for
+        this puzzle, or None on a miss.
+        """
+        canonical, transform = self._canonicalForm(puzzleString)
+        entry = self._entries.get(canonical)
+        if entry is None:
+            self.numMisses += 1
+            return None
+        self.numHits += 1
+        self._entries.move_to_end(canonical)
+        result = dict(entry)
+        if result["solution"]:
+            result["solution"] = fromCanonical(result["solution"], transform)
+        return result
+
+    def put(self, puzzleString: str, result: dict) -> None:
+        """Store a result whose solution is an 81 character string for this puzzle, or False."""
+        canonical, (transformIdx, labels) = self._canonicalForm(puzzleString)
+        entry = dict(result)
+        if entry["solution"]:
+            transformed = "".join(_transformGetters[transformIdx](entry["solution"]))
+            entry["solution"] = transformed.translate(str.maketrans(digits, labels))
+        self._entries[canonical] = entry
+        self._entries.move_to_end(canonical)
+        while len(self._entries) > self.maxSize:
+            self._entries.popitem(last=False)
+            self.numEvictions += 1
+
+    def clear(self) -> None:
+        """Drop every entry and reset the statistics."""
+        self._entries.clear()
+        self.numHits = self.numMisses = self.numEvictions = 0
+
+    def stats(self) -> dict:
+        """Size, hit rate and eviction counts of the cache."""
+        numLookups = self.numHits + self.numMisses
+        return {
+            "size": len(self._entries),
+            "maxSize": self.maxSize,
+            "numHits": self.numHits,
+            "numMisses": self.numMisses,
+            "numEvictions": self.numEvictions,
+            "hitRate": self.numHits / numLookups if numLookups else 0.0,
+        }
+
+
+# Cache used by SudokuPuzzle.solve, one per process
+solutionCache = SolutionCache()
@@ -0,0 +1,100 @@
+"""
+Thin client for the solver daemon in PuzzleDaemon.
+
+Only the standard library socket and json modules are imported, so a client call costs a few
+milliseconds no matter which runtime the daemon solves with. Every request is one JSON line
+and every reply is one JSON line, on a fresh Unix domain socket connection.
+"""
+
+import json
+import os
+import socket
+import tempfile
+from collections.abc import Iterable, Iterator
+from itertools import islice
+
+defaultSocketPath: str = os.path.join(tempfile.gettempdir(), "sudokuSolver.sock")
+
+
+class DaemonError(Exception):
+    """Raised when the daemon can not be reached or answers with an error."""
+
+
+def request(message: dict, socketPath: str = defaultSocketPath, timeout: float | None = None):
+    """Send one request to the daemon and return its reply.
+    Args:
+            message (dict): Request with an "op" key, see PuzzleDaemon.
+            socketPath (str): Path of the daemon socket.
+            timeout (float): Seconds to wait for the reply, None to wait as long as it takes.
+    Returns:
+            The "result" of the reply.
+    Raises:
+            DaemonError: If the daemon is not running or the request failed.
+    """
+    try:
+        with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as sock:
+            sock.settimeout(timeout)
+            sock.connect(socketPath)
+            sock.sendall(json.dumps(message).encode() + b"\n")
+            with sock.makefile("rb") as replyFile:
+                reply = replyFile.readline()
+    except (FileNotFoundError, ConnectionRefusedError) as err:
+        raise DaemonError(f"No solver daemon listening on {socketPath}") from err
+    except OSError as err:
+        raise DaemonError(f"Solver daemon request failed: {err}") from err
+
+    if not reply:
+        raise DaemonError("Solver daemon closed the connection without a reply")
+    reply = json.loads(reply)
+    if "error" in reply:
+        raise DaemonError(reply["error"])
+    return reply["result"]
+
+
+def solvePuzzles(
+    puzzles: list[str],
+    runtime: str = "python",
+    socketPath: str = defaultSocketPath,
+    **solverOptions,
+) -> list[dict]:
+    """Solve a list of puzzles on the daemon.
+    Returns:
+            list[dict]: One result per puzzle with the solution as an 81 character string, see
+                PuzzleBatch.solveMany.
+    """
+    return request(
+        {"op": "solve", "runtime": runtime, "puzzles": list(puzzles), "options": solverOptions},
+        socketPath,
+    )
+
+
+def solveMany(
+    puzzles: Iterable[str],
+    runtime: str = "python",
+    socketPath: str = defaultSocketPath,
+    chunkSize: int = 256,
+    **solverOptions,
+) -> Iterator[dict]:
+    """Stream puzzles through the daemon in chunks and yield the results in input order.
+    Yields:
+            dict: The result of each puzzle with "index", its position in the input.
+    """
+    puzzleIter = iter(puzzles)
+    firstIndex = 0
+    while chunk := list(islice(puzzleIter, chunkSize)):
+        for index, result in enumerate(
+            solvePuzzles(chunk, runtime, socketPath, **solverOptions), firstIndex
+        ):
+            result["index"] = index
+            yield result
+        firstIndex += len(chunk)
+
+
+def daemonStatus(socketPath: str = defaultSocketPath) -> dict:
+    """Return the warmup and compile status of every runtime the daemon knows."""
+    return request({"op": "status"}, socketPath, timeout=5.0)
+
+
+def stopDaemon(socketPath: str = defaultSocketPath) -> None:
+    """Ask the daemon to shut down."""
+    request({"op": "shutdown"}, socketPath, timeout=5.0)
@@ -0,0 +1,467 @@
+"""
+Packed binary puzzle corpus with memory mapped random access.
+
+A corpus file holds fixed size records, so puzzle i lives at a known offset and opening a
+corpus of any size only maps the file instead of parsing it. Layout, all little endian:
+
+    header      64 bytes, see _headerFormat
+    records     numPuzzles * 49 bytes
+                    ID      uint32
+                    Score   float32
+                    cells   41 bytes, two cells per byte, high nibble first, 0 for a blank
+    index       only when the IDs are not consecutive: the IDs sorted (uint32) followed by
+                the record number of each of them (uint32)
+    comments    optional: numPuzzles + 1 uint64 offsets into the UTF-8 text that follows
+
+With consecutive IDs, as in resources/puzzles.csv, looking up an ID is one subtraction.
+Otherwise it is a binary search over the mapped index. convertCsv writes a corpus from a
+puzzles.csv style file, one row at a time.
+
+Range and stratified queries by score go through a ScoreIndex, a second memory mapped file next
+to the corpus with the scores sorted and the record number of each. It is built the first time
+PuzzleCorpus.scoreIndex is called, and again whenever the corpus is newer.
+
+numpy is only needed for records and masks, the zero copy views for PyBatchSolver.
+"""
+
+import csv
+import logging
+import mmap
+import os
+import struct
+import tempfile
+from array import array
+from bisect import bisect_left, bisect_right
+from collections.abc import Iterator
+from random import Random
+
+uiLogger = logging.getLogger("uiLogger")
+
+corpusMagic: bytes = b"SUDOKUC1"
+corpusVersion: int = 1
+corpusSuffix: str = ".sdkc"
+
+# magic, version, recordSize, flags, numPuzzles, firstID, indexOffset, commentOffset
+_headerFormat: str = "<8sHHIQQQQ16x"
+_headerSize: int = struct.calcsize(_headerFormat)  # 64
+_recordHeaderFormat: str = "<If"
+_recordHeaderSize: int = struct.calcsize(_recordHeaderFormat)  # 8
+cellBytes: int = 41
+recordSize: int = _recordHeaderSize + cellBytes  # 49
+
+FLAG_CONSECUTIVE_IDS: int = 1
+
+scoreIndexMagic: bytes = b"SUDOKUS1"
+scoreIndexSuffix: str = ".sdks"
+# magic, version, numPuzzles
+_scoreHeaderFormat: str = "<8sIxxxxQ8x"
+_scoreHeaderSize: int = struct.calcsize(_scoreHeaderFormat)  # 32
+
+# Score band edges for stratified sampling, the puzzles.csv scores run up to 8.5
+defaultScoreBands: tuple[float, ...] = (0.0, 2.0, 4.0, 6.5, 8.5)
+
+_blankToZero = str.maketrans(".", "0")
+
+# Both cells of a packed byte as text, '.' for a blank
+_byteCells: list[str] = [
+    (".123456789??????"[byte >> 4]) + (".123456789??????"[byte & 15]) for byte in range(256)
+]
+
+
+def packCells(puzzleString: str) -> bytes:
+    """Pack an 81 character puzzle into 41 bytes of 4 bit cells."""
+    if len(puzzleString) != 81:
+        raise ValueError("A puzzle string must have 81 characters.")
+    # Every cell is one hex digit, so the padded string is the packed record in hex
+    return bytes.fromhex(puzzleString.translate(_blankToZero) + "0")
+
+
+def unpackCells(cells: bytes | memoryview) -> str:
+    """Unpack 41 bytes of 4 bit cells into an 81 character puzzle string."""
+    return "".join(map(_byteCells.__getitem__, cells))[:81]
+
+
+class PuzzleCorpus(object):
+    """Read only, memory mapped view of a corpus file.
+
+    Opening reads the 64 byte header only. Records are decoded when they are asked for.
+
+    Args:
+        path (str): Corpus file written by convertCsv.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        with open(path, "rb") as corpusFile:
+            self._mmap = mmap.mmap(corpusFile.fileno(), 0, access=mmap.ACCESS_READ)
+        (
+            magic,
+            version,
+            fileRecordSize,
+            self.flags,
+            self.numPuzzles,
+            self.firstID,
+            self._indexOffset,
+            self._commentOffset,
+        ) = struct.unpack_from(_headerFormat, self._mmap, 0)
+        if magic != corpusMagic or fileRecordSize != recordSize:
+            self._mmap.close()
+            raise ValueError(f"{path} is not a puzzle corpus file")
+        if version > corpusVersion:
+            self._mmap.close()
+            raise ValueError(f"{path} has corpus version {version}, newer than {corpusVersion}")
+
+        self._buf = memoryview(self._mmap)
+        n = self.numPuzzles
+        if self._indexOffset:
+            self._sortedIDs = self._buf[self._indexOffset : self._indexOffset + 4 * n].cast("I")
+            self._sortedRecords = self._buf[
+                self._indexOffset + 4 * n : self._indexOffset + 8 * n
+            ].cast("I")
+        if self._commentOffset:
+            self._commentOffsets = self._buf[
+                self._commentOffset : self._commentOffset + 8 * (n + 1)
+            ].cast("Q")
+
+    def __len__(self) -> int:
+        return self.numPuzzles
+
+    @property
+    def minID(self) -> int:
+        if self.flags & FLAG_CONSECUTIVE_IDS:
+            return self.firstID
+        return self._sortedIDs[0]
+
+    @property
+    def maxID(self) -> int:
+        if self.flags & FLAG_CONSECUTIVE_IDS:
+            return self.firstID + self.numPuzzles - 1
+        return self._sortedIDs[-1]
+
+    def _recordOffset(self, index: int) -> int:
+        if not 0 <= index < self.numPuzzles:
+            raise IndexError(f"Puzzle index {index} out of range")
+        return _headerSize + index * recordSize
+
+    def puzzle(self, index: int) -> str:
+        """The puzzle of record index as an 81 character string."""
+        offset = self._recordOffset(index) + _recordHeaderSize
+        return unpackCells(self._buf[offset : offset + cellBytes])
+
+    def puzzleID(self, index: int) -> int:
+        return struct.unpack_from("<I", self._mmap, self._recordOffset(index))[0]
+
+    def score(self, index: int) -> float:
+        return struct.unpack_from("<f", self._mmap, self._recordOffset(index) + 4)[0]
+
+    def comment(self, index: int) -> str:
+        """The comment of record index, empty if the corpus was written without comments."""
+        if not self._commentOffset:
+            return ""
+        self._recordOffset(index)
+        textStart = self._commentOffset + 8 * (self.numPuzzles + 1)
+        start, stop = self._commentOffsets[index], self._commentOffsets[index + 1]
+        return bytes(self._buf[textStart + start : textStart + stop]).decode("utf-8")
+
+    def indexOf(self, puzzleID: int) -> int | None:
+        """Record number of a puzzle ID, None if the corpus does not have it."""
+        if self.flags & FLAG_CONSECUTIVE_IDS:
+            index = puzzleID - self.firstID
+            return index if 0 <= index < self.numPuzzles else None
+        pos = bisect_left(self._sortedIDs, puzzleID)
+        if pos < self.numPuzzles and self._sortedIDs[pos] == puzzleID:
+            return self._sortedRecords[pos]
+        return None
+
+    def byID(self, puzzleID: int) -> str | None:
+        """The puzzle with this ID as an 81 character string, None if there is none."""
+        index = self.indexOf(puzzleID)
+        return None if index is None else self.puzzle(index)
+
+    def puzzles(self, start: int = 0, stop: int | None = None) -> Iterator[str]:
+        """Yield the puzzle strings of records start to stop, one at a time."""
+        stop = self.numPuzzles if stop is None else min(stop, self.numPuzzles)
+        for index in range(start, stop):
+            yield self.puzzle(index)
+
+    def __iter__(self) -> Iterator[str]:
+        return self.puzzles()
+
+    def records(self, start: int = 0, stop: int | None = None):
+        """Zero copy numpy view of records start to stop with fields ID, Score and cells."""
+        import numpy as np
+
+        stop = self.numPuzzles if stop is None else min(stop, self.numPuzzles)
+        recordDtype = np.dtype([("ID", "<u4"), ("Score", "<f4"), ("cells", "u1", cellBytes)])
+        return np.frombuffer(
+            self._mmap,
+            dtype=recordDtype,
+            count=max(0, stop - start),
+            offset=_headerSize + start * recordSize,
+        )
+
+    def masks(self, start: int = 0, stop: int | None = None):
+        """Candidate masks of records start to stop, ready for PyBatchSolver.solveBatch.
+        Returns:
+                np.ndarray: (N, 81) uint16 masks, see PyBatchSolver.puzzleStringsToMasks.
+        """
+        import numpy as np
+
+        from solver.PyBatchSolver import valueBits
+        from solver.PyBitSolver import allValuesMask
+
+        # Nibble value to mask, a blank (0) can be any value
+        nibbleMasks = np.concatenate(([allValuesMask], valueBits)).astype(np.uint16)
+        cells = self.records(start, stop)["cells"]
+        nibbles = np.empty((len(cells), 2 * cellBytes), dtype=np.uint8)
+        nibbles[:, 0::2] = cells >> 4
+        nibbles[:, 1::2] = cells & 15
+        return nibbleMasks[nibbles[:, :81]]
+
+    def scoreIndex(self) -> "ScoreIndex":
+        """The score index next to the corpus, built first if it is missing or older."""
+        if getattr(self, "_scoreIndex", None) is None:
+            indexPath = os.path.splitext(self.path)[0] + scoreIndexSuffix
+            if not os.path.isfile(indexPath) or os.path.getmtime(indexPath) < os.path.getmtime(
+                self.path
+            ):
+                buildScoreIndex(self, indexPath)
+            self._scoreIndex = ScoreIndex(indexPath)
+            if len(self._scoreIndex) != self.numPuzzles:
+                self._scoreIndex.close()
+                buildScoreIndex(self, indexPath)
+                self._scoreIndex = ScoreIndex(indexPath)
+        return self._scoreIndex
+
+    def byScore(self, low: float, high: float) -> Iterator[str]:
+        """Yield the puzzles with a score in [low, high], easiest first."""
+        for index in self.scoreIndex().indices(low, high):
+            yield self.puzzle(index)
+
+    def sampleByScore(
+        self, perBand: int, bands=defaultScoreBands, seed: int | None = None
+    ) -> Iterator[str]:
+        """Yield perBand random puzzles of every score band, see ScoreIndex.sample."""
+        for indices in self.scoreIndex().sample(perBand, bands, seed).values():
+            for index in indices:
+                yield self.puzzle(index)
+
+    def close(self) -> None:
+        if getattr(self, "_scoreIndex", None) is not None:
+            self._scoreIndex.close()
+        for view in ("_sortedIDs", "_sortedRecords", "_commentOffsets"):
+            if hasattr(self, view):
+                getattr(self, view).release()
+        self._buf.release()
+        self._mmap.close()
+
+    def __enter__(self) -> "PuzzleCorpus":
+        return self
+
+    def __exit__(self, *excInfo) -> None:
+        self.close()
+
+
+def isCorpusFile(path: str) -> bool:
+    """True if the file starts with the corpus magic bytes."""
+    try:
+        with open(path, "rb") as corpusFile:
+            return corpusFile.read(len(corpusMagic)) == corpusMagic
+    except OSError:
+        return False
+
+
+def convertCsv(csvPath: str, corpusPath: str | None = None, withComments: bool = True) -> str:
+    """
+    Write a corpus file from a puzzles.csv style file with ID, Puzzle, Score and Comment columns.
+
+    Rows are streamed, only the IDs (8 bytes per puzzle) and the comment offsets stay in memory.
+
+    Args:
+        csvPath (str): The CSV file.
+        corpusPath (str): The corpus file to write. Defaults to the CSV path with .sdkc.
+        withComments (bool): Also store the Comment column.
+
+    Returns:
+        str: Path of the corpus file.
+    """
+    corpusPath = corpusPath or os.path.splitext(csvPath)[0] + corpusSuffix
+    puzzleIDs = array("I")
+    commentOffsets = array("Q", [0])
+    isConsecutive = True
+
+    # Written next to the final file and renamed, so readers never see half a corpus
+    tmpPath = f"{corpusPath}.{os.getpid()}.tmp"
+    try:
+        with (
+            open(csvPath, "r", newline="") as csvFile,
+            open(tmpPath, "wb") as corpusFile,
+            tempfile.TemporaryFile() as commentFile,
+        ):
+            corpusFile.write(bytes(_headerSize))
+            for row in csv.DictReader(csvFile):
+                puzzleID = int(row["ID"])
+                if puzzleIDs and puzzleID != puzzleIDs[-1] + 1:
+                    isConsecutive = False
+                puzzleIDs.append(puzzleID)
+                score = float(row.get("Score") or 0.0)
+                corpusFile.write(struct.pack(_recordHeaderFormat, puzzleID, score))
+                corpusFile.write(packCells(row["Puzzle"]))
+                if withComments:
+                    commentOffsets.append(
+                        commentOffsets[-1] + commentFile.write((row.get("Comment") or "").encode())
+                    )
+
+            indexOffset = 0
+            if not isConsecutive:
+                indexOffset = corpusFile.tell()
+                order = sorted(range(len(puzzleIDs)), key=puzzleIDs.__getitem__)
+                array("I", (puzzleIDs[i] for i in order)).tofile(corpusFile)
+                array("I", order).tofile(corpusFile)
+
+            commentOffset = 0
+            if withComments:
+                commentOffset = corpusFile.tell()
+                commentOffsets.tofile(corpusFile)
+                commentFile.seek(0)
+                while chunk := commentFile.read(1 << 20):
+                    corpusFile.write(chunk)
+
+            corpusFile.seek(0)
+            corpusFile.write(
+                struct.pack(
+                    _headerFormat,
+                    corpusMagic,
+                    corpusVersion,
+                    recordSize,
+                    FLAG_CONSECUTIVE_IDS if isConsecutive else 0,
+                    len(puzzleIDs),
+                    puzzleIDs[0] if puzzleIDs else 0,
+                    indexOffset,
+                    commentOffset,
+                )
+            )
+        os.replace(tmpPath, corpusPath)
+    except BaseException:
+        if os.path.exists(tmpPath):
+            os.unlink(tmpPath)
+        raise
+
+    uiLogger.info(f"Wrote {len(puzzleIDs)} puzzles to {corpusPath}")
+    return corpusPath
+
+
+def _float32(value: float) -> float:
+    """Round a bound to float32 like the stored scores, so an exact bound matches them."""
+    return struct.unpack("<f", struct.pack("<f", value))[0]
+
+
+class ScoreIndex(object):
+    """Read only, memory mapped index of corpus records sorted by score.
+
+    A query is two binary searches over the sorted scores, the matching records are a slice of
+    the index and are never copied.
+
+    Args:
+        path (str): Score index file written by buildScoreIndex.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        with open(path, "rb") as indexFile:
+            self._mmap = mmap.mmap(indexFile.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, version, self.numPuzzles = struct.unpack_from(_scoreHeaderFormat, self._mmap, 0)
+        if magic != scoreIndexMagic or version > corpusVersion:
+            self._mmap.close()
+            raise ValueError(f"{path} is not a score index file")
+        n = self.numPuzzles
+        self._buf = memoryview(self._mmap)
+        self._scores = self._buf[_scoreHeaderSize : _scoreHeaderSize + 4 * n].cast("f")
+        self._records = self._buf[_scoreHeaderSize + 4 * n : _scoreHeaderSize + 8 * n].cast("I")
+
+    def __len__(self) -> int:
+        return self.numPuzzles
+
+    def positions(self, low: float, high: float) -> tuple[int, int]:
+        """Start and stop in score order of the records with a score in [low, high]."""
+        start = bisect_left(self._scores, _float32(low))
+        stop = bisect_right(self._scores, _float32(high), lo=start)
+        return start, stop
+
+    def count(self, low: float, high: float) -> int:
+        start, stop = self.positions(low, high)
+        return stop - start
+
+    def indices(self, low: float, high: float) -> memoryview:
+        """Record numbers with a score in [low, high] in score order, a view of the index."""
+        start, stop = self.positions(low, high)
+        return self._records[start:stop]
+
+    def sample(
+        self, perBand: int, bands=defaultScoreBands, seed: int | None = None
+    ) -> dict[tuple[float, float], list[int]]:
+        """
+        Draw random records from every score band.
+
+        Args:
+            perBand (int): Records drawn per band, all of them if the band has fewer.
+            bands (sequence): Increasing band edges. Every band includes its lower edge, only
+                the last one its upper edge too.
+            seed (int): Seed for the draw, None for a different draw every time.
+
+        Returns:
+            dict: (low, high) of every band to the record numbers drawn from it.
+        """
+        rng = Random(seed)
+        samples = {}
+        for bandIdx, (low, high) in enumerate(zip(bands, bands[1:])):
+            start, stop = self.positions(low, high)
+            if bandIdx < len(bands) - 2:
+                stop = bisect_left(self._scores, _float32(high), lo=start, hi=stop)
+            picks = rng.sample(range(start, stop), min(perBand, stop - start))
+            samples[(low, high)] = [self._records[pos] for pos in picks]
+        return samples
+
+    def close(self) -> None:
+        self._scores.release()
+        self._records.release()
+        self._buf.release()
+        self._mmap.close()
+
+
+def buildScoreIndex(corpus: PuzzleCorpus, indexPath: str | None = None) -> str:
+    """
+    Write the score index of a corpus. Sorting uses numpy when it is installed.
+
+    Args:
+        corpus (PuzzleCorpus): The open corpus.
+        indexPath (str): The index file to write. Defaults to the corpus path with .sdks.
+
+    Returns:
+        str: Path of the score index file.
+    """
+    indexPath = indexPath or os.path.splitext(corpus.path)[0] + scoreIndexSuffix
+    n = corpus.numPuzzles
+    try:
+        import numpy as np
+
+        scores = corpus.records()["Score"]
+        order = np.argsort(scores, kind="stable").astype("<u4")
+        sortedScores, records = scores[order].astype("<f4").tobytes(), order.tobytes()
+    except ImportError:
+        recordBytes = corpus._buf[_headerSize : _headerSize + n * recordSize]
+        scores = array("f", (score for _, score in struct.iter_unpack("<If41x", recordBytes)))
+        order = sorted(range(n), key=scores.__getitem__)
+        sortedScores = array("f", (scores[i] for i in order)).tobytes()
+        records = array("I", order).tobytes()
+        recordBytes.release()
+
+    # Written next to the final file and renamed, so readers never see half an index
+    tmpPath = f"{indexPath}.{os.getpid()}.tmp"
+    with open(tmpPath, "wb") as indexFile:
+        indexFile.write(struct.pack(_scoreHeaderFormat, scoreIndexMagic, corpusVersion, n))
+        indexFile.write(sortedScores)
+        indexFile.write(records)
+    os.replace(tmpPath, indexPath)
+    uiLogger.info(f"Wrote the score index of {n} puzzles to {indexPath}")
+    return indexPath
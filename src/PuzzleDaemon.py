@@ -0,0 +1,233 @@
+"""
+Long lived solver daemon on a Unix domain socket.
+
+The daemon loads the requested runtimes once, solves a warmup puzzle with each so the Lua and
+Julia solvers are compiled, and then answers requests from PuzzleClient. Its status tells for
+every runtime whether the solver runs compiled and how long the compilation took. Fresh processes only
+pay for a socket round trip instead of the runtime start up and JIT compilation.
+
+Solves run on the main thread, one at a time, because the Julia runtime must stay on the
+thread that started it. Connections are accepted on a background thread, so status requests
+are answered even while a runtime is still warming up.
+
+Requests and replies are single JSON lines:
+    {"op": "solve", "runtime": "julia", "puzzles": [...], "options": {}} -> {"result": [...]}
+    {"op": "status"}                                                  -> {"result": {...}}
+    {"op": "shutdown"}                                                -> {"result": "ok"}
+Failures reply with {"error": message}.
+"""
+
+import json
+import logging
+import os
+import queue
+import socket
+import socketserver
+import threading
+from time import perf_counter
+
+from py2runtime import supportedRuntimes
+from PuzzleBatch import solveChunk, warmupPuzzle
+from PuzzleCache import solutionCache
+from PuzzleClient import defaultSocketPath
+from PuzzleStore import solutionStore
+
+uiLogger = logging.getLogger("uiLogger")
+
+
+class _SolverJob(object):
+    """A solve request handed from a connection thread to the main thread."""
+
+    def __init__(self, runtime: str, puzzles: list, options: dict):
+        self.runtime = runtime
+        self.puzzles = puzzles
+        self.options = options
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+
+class _RequestHandler(socketserver.StreamRequestHandler):
+    def handle(self) -> None:
+        daemon = self.server.solverDaemon
+        try:
+            message = json.loads(self.rfile.readline())
+            reply = {"result": daemon.handleRequest(message)}
+        except Exception as err:
+            reply = {"error": str(err)}
+        self.wfile.write(json.dumps(reply, default=str).encode() + b"\n")
+
+
+class SolverDaemon(object):
+    """Keeps solver runtimes loaded and serves solve requests on a Unix domain socket.
+
+    Args:
+        socketPath (str): Path of the socket to listen on.
+        runtimes (list[str]): Runtimes warmed up at start. Others are warmed on first use.
+    """
+
+    def __init__(self, socketPath: str = defaultSocketPath, runtimes=("python",)):
+        for runtime in runtimes:
+            if runtime.lower() not in supportedRuntimes:
+                raise ValueError(f"Invalid runtime: {runtime}. Must be one of {supportedRuntimes}.")
+        self.socketPath = socketPath
+        self.runtimes = [runtime.lower() for runtime in runtimes]
+        # Runtime name to its warmup and compile status
+        self.runtimeStatus: dict[str, dict] = {
+            runtime: {"state": "cold"} for runtime in self.runtimes
+        }
+        self._jobs: queue.Queue = queue.Queue()
+        self._server = None
+
+    def handleRequest(self, message: dict):
+        """Answer one request on the connection thread. Solves wait for the main thread."""
+        op = message.get("op")
+        if op == "status":
+            return self.status()
+        if op == "shutdown":
+            self._jobs.put(None)
+            return "ok"
+        if op != "solve":
+            raise ValueError(f"Unknown op: {op}")
+
+        runtime = message.get("runtime", "python").lower()
+        if runtime not in supportedRuntimes:
+            raise ValueError(f"Invalid runtime: {runtime}. Must be one of {supportedRuntimes}.")
+        job = _SolverJob(runtime, message.get("puzzles", []), message.get("options", {}))
+        self._jobs.put(job)
+        job.done.wait()
+        if job.error:
+            raise job.error
+        return job.result
+
+    def status(self) -> dict:
+        """Warmup and compile status of every runtime, plus the daemon pid, queue depth and the
+        statistics of its solution cache and store.
+        """
+        store = solutionStore()
+        return {
+            "pid": os.getpid(),
+            "socket": self.socketPath,
+            "queueDepth": self._jobs.qsize(),
+            "runtimes": {runtime: dict(status) for runtime, status in self.runtimeStatus.items()},
+            "solutionCache": solutionCache.stats(),
+            "solutionStore": store.stats() if store else None,
+        }
+
+    def warmRuntime(self, runtime: str) -> None:
+        """Load a runtime and solve the warmup puzzle twice.
+        The first solve includes the JIT compilation of the solver, the second shows the warm
+        solve time. Both end up in runtimeStatus.
+        """
+        from py2runtime import RuntimePy as rt
+
+        status = self.runtimeStatus.setdefault(runtime, {"state": "cold"})
+        if status["state"] == "ready":
+            return
+        status["state"] = "warming"
+        uiLogger.info(f"Warming up {runtime} runtime")
+        try:
+            tStart = perf_counter()
+            from Puzzle import SudokuPuzzle
+
+            puzzle = SudokuPuzzle(lang=runtime, value=warmupPuzzle)
+            status["init_ms"] = (perf_counter() - tStart) * 1000.0
+
+            tStart = perf_counter()
+            puzzle.solve(useCache=False, useStore=False)
+            firstSolve_ms = (perf_counter() - tStart) * 1000.0
+            tStart = perf_counter()
+            puzzle.solve(useCache=False, useStore=False)
+            warmSolve_ms = (perf_counter() - tStart) * 1000.0
+        except Exception as err:
+            status.update(state="failed", error=str(err))
+            uiLogger.error(f"Failed to warm up {runtime} runtime: {err}")
+            return
+
+        status.update(
+            state="ready",
+            version=str(rt.version),
+            **self._compileStatus(runtime),
+            compile_ms=max(0.0, firstSolve_ms - warmSolve_ms),
+            warmSolve_ms=warmSolve_ms,
+            numSolved=0,
+        )
+        uiLogger.info(f"{runtime} runtime ready in {status['init_ms'] + firstSolve_ms:.0f} ms")
+
+    @staticmethod
+    def _compileStatus(runtime: str) -> dict:
+        """How the solver of the runtime just loaded runs. compiled is True when it runs as
+        machine code, which Julia always does and LuaJIT does while its trace compiler is on.
+        Plain Lua and the python runtimes interpret bytecode. For Julia, sysimage is the system
+        image it loaded and pkgimages whether packages are loaded from precompiled images.
+        """
+        from py2runtime import RuntimePy as rt
+
+        if runtime == "julia":
+            jl = rt.runtime
+            return {
+                "compiled": True,
+                "sysimage": str(jl.seval("unsafe_string(Base.JLOptions().image_file)")),
+                "pkgimages": bool(
+                    jl.seval(
+                        "hasfield(typeof(Base.JLOptions()), :use_pkgimages) && "
+                        "Base.JLOptions().use_pkgimages != 0"
+                    )
+                ),
+            }
+        if runtime in ("luajit", "lua"):
+            return {"compiled": bool(rt.runtime.eval("type(jit) == 'table' and jit.status()"))}
+        return {"compiled": False}
+
+    def _runJob(self, job: _SolverJob) -> None:
+        try:
+            self.warmRuntime(job.runtime)
+            status = self.runtimeStatus[job.runtime]
+            if status["state"] != "ready":
+                raise RuntimeError(f"{job.runtime} runtime failed: {status.get('error')}")
+            job.result = solveChunk(0, job.puzzles, job.runtime, job.options)
+            for result in job.result:
+                result.pop("index", None)
+            status["numSolved"] += len(job.puzzles)
+        except Exception as err:
+            job.error = err
+        finally:
+            job.done.set()
+
+    def _bindSocket(self) -> None:
+        if os.path.exists(self.socketPath):
+            with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as probe:
+                try:
+                    probe.connect(self.socketPath)
+                    raise RuntimeError(f"A solver daemon is already running on {self.socketPath}")
+                except (ConnectionRefusedError, FileNotFoundError):
+                    # Left over from a daemon that did not shut down cleanly
+                    os.unlink(self.socketPath)
+        self._server = socketserver.ThreadingUnixStreamServer(self.socketPath, _RequestHandler)
+        self._server.solverDaemon = self
+        self._server.daemon_threads = True
+        os.chmod(self.socketPath, 0o600)
+
+    def run(self) -> None:
+        """Serve until a shutdown request arrives. Blocks the calling (main) thread."""
+        self._bindSocket()
+        serverThread = threading.Thread(target=self._server.serve_forever, daemon=True)
+        serverThread.start()
+        uiLogger.info(f"Solver daemon listening on {self.socketPath}")
+        try:
+            for runtime in self.runtimes:
+                self.warmRuntime(runtime)
+            while (job := self._jobs.get()) is not None:
+                self._runJob(job)
+        finally:
+            # Requests still waiting get an error instead of hanging
+            while not self._jobs.empty():
+                job = self._jobs.get_nowait()
+                if job is not None:
+                    job.error = RuntimeError("Solver daemon is shutting down")
+                    job.done.set()
+            self._server.shutdown()
+            self._server.server_close()
+            if os.path.exists(self.socketPath):
+                os.unlink(self.socketPath)
+            uiLogger.info("Solver daemon stopped")
@@ -0,0 +1,244 @@
+"""
+Streaming readers for the common text formats of sudoku puzzles.
+
+Every reader yields one normalized puzzle at a time, 81 characters with '.' for blanks, and
+only ever holds the current line or grid in memory. Supported formats:
+
+    lines   one puzzle per line, 81 characters, anything after the first space is ignored
+    csv     a header row with a Puzzle (or puzzle, quizzes, grid) column, e.g. puzzles.csv
+    jsonl   one JSON value per line, a puzzle string, a list of 81 or 9x9 values, or an object
+            with a puzzle, Puzzle, quizzes or grid key
+    grid    9 lines of 9 cells per puzzle, the .sdk and .ss (Simple Sudoku) layouts. '|', '+'
+            and '-' separators are skipped, as are lines starting with '#' or '['
+
+Blanks may be written as '.', '0', '_', '*' or 'x'. The format is taken from the file suffix
+and otherwise guessed from the first line. Files compressed with gzip, xz or zstd are detected
+by their magic bytes and decompressed on the fly. zstd needs the zstandard package, or
+Python 3.14.
+"""
+
+import csv
+import gzip
+import io
+import json
+import logging
+import lzma
+import os
+import sys
+from collections.abc import Iterator
+from contextlib import contextmanager
+from itertools import chain
+
+uiLogger = logging.getLogger("uiLogger")
+
+puzzleFormats: tuple[str, ...] = ("lines", "csv", "jsonl", "grid")
+
+_suffixFormats: dict[str, str] = {
+    ".csv": "csv",
+    ".jsonl": "jsonl",
+    ".ndjson": "jsonl",
+    ".json": "jsonl",
+    ".sdk": "grid",
+    ".ss": "grid",
+}
+_compressionSuffixes: tuple[str, ...] = (".gz", ".xz", ".zst", ".zstd")
+_puzzleKeys: tuple[str, ...] = ("Puzzle", "puzzle", "quizzes", "grid")
+
+# Given values stay, every blank becomes '.', separators and whitespace are dropped
+_cellTable = str.maketrans("0_*xX", ".....", "|+- \t\r\n")
+_cellChars = frozenset("123456789.")
+
+
+def normalizePuzzle(text: str) -> str | None:
+    """
+    Normalize a puzzle written in any of the supported cell notations.
+
+    Args:
+        text (str): The cells of one puzzle, with or without separators and line breaks.
+
+    Returns:
+        str | None: The puzzle as 81 characters, '.' for blanks. None if text does not hold
+            exactly 81 cells.
+    """
+    cells = text.translate(_cellTable)
+    if len(cells) != 81 or not _cellChars.issuperset(cells):
+        return None
+    return cells
+
+
+def _zstdReader(binaryFile):
+    try:
+        from compression import zstd
+
+        return zstd.ZstdFile(binaryFile)
+    except ImportError:
+        pass
+    try:
+        import zstandard
+    except ImportError as err:
+        raise ImportError("Reading zstd files needs the zstandard package") from err
+    return zstandard.ZstdDecompressor().stream_reader(binaryFile)
+
+
+@contextmanager
+def openPuzzleText(source: str = "-") -> Iterator[io.TextIOBase]:
+    """
+    Open a file, or stdin for "-", as text, decompressing gzip, xz and zstd on the fly.
+
+    Yields:
+        io.TextIOBase: The decompressed text, read as a stream.
+    """
+    binaryFile = sys.stdin.buffer if source == "-" else open(source, "rb")
+    try:
+        magic = binaryFile.peek(6)[:6]
+        if magic[:2] == b"\x1f\x8b":
+            stream = gzip.GzipFile(fileobj=binaryFile)
+        elif magic == b"\xfd7zXZ\x00":
+            stream = lzma.LZMAFile(binaryFile)
+        elif magic[:4] == b"\x28\xb5\x2f\xfd":
+            stream = _zstdReader(binaryFile)
+        else:
+            stream = binaryFile
+        textFile = io.TextIOWrapper(stream, encoding="utf-8", errors="replace", newline="")
+        try:
+            yield textFile
+        finally:
+            # Leave stdin open, detach the wrapper instead of closing it
+            if binaryFile is sys.stdin.buffer:
+                textFile.detach()
+            else:
+                textFile.close()
+    finally:
+        if binaryFile is not sys.stdin.buffer:
+            binaryFile.close()
+
+
+def detectFormat(source: str, firstLine: str) -> str:
+    """Format of a file from its suffix, or else from its first line that is not blank or a
+    comment.
+    """
+    root, suffix = os.path.splitext(source.lower())
+    if suffix in _compressionSuffixes:
+        suffix = os.path.splitext(root)[1]
+    if suffix in _suffixFormats:
+        return _suffixFormats[suffix]
+
+    line = firstLine.strip()
+    if line.startswith(("{", '"')):
+        return "jsonl"
+    if line.startswith("["):
+        try:
+            json.loads(line)
+            return "jsonl"
+        except ValueError:
+            return "grid"
+    if "," in line:
+        return "csv"
+    if line and normalizePuzzle(line.split()[0]) is not None:
+        return "lines"
+    return "grid"
+
+
+def _readLines(lines: Iterator[str]) -> Iterator[str]:
+    for lineNo, line in enumerate(lines, 1):
+        line = line.strip()
+        if not line or line.startswith("#"):
+            continue
+        puzzle = normalizePuzzle(line.split()[0]) or normalizePuzzle(line)
+        if puzzle is None:
+            uiLogger.warning(f"Skipping line {lineNo}, it is not an 81 cell puzzle")
+            continue
+        yield puzzle
+
+
+def _readCsv(lines: Iterator[str]) -> Iterator[str]:
+    rows = csv.DictReader(lines)
+    column = next((key for key in _puzzleKeys if key in (rows.fieldnames or ())), None)
+    if column is None:
+        uiLogger.error(f"No puzzle column in the CSV header {rows.fieldnames}")
+        return
+    for rowNo, row in enumerate(rows, 2):
+        puzzle = normalizePuzzle(row[column] or "")
+        if puzzle is None:
+            uiLogger.warning(f"Skipping row {rowNo}, it is not an 81 cell puzzle")
+            continue
+        yield puzzle
+
+
+def _jsonPuzzle(value) -> str | None:
+    if isinstance(value, dict):
+        value = next((value[key] for key in _puzzleKeys if key in value), None)
+    if isinstance(value, list):
+        cells = list(chain.from_iterable(v if isinstance(v, list) else [v] for v in value))
+        value = "".join(str(cell or ".") for cell in cells)
+    return normalizePuzzle(value) if isinstance(value, str) else None
+
+
+def _readJsonl(lines: Iterator[str]) -> Iterator[str]:
+    for lineNo, line in enumerate(lines, 1):
+        if not line.strip():
+            continue
+        try:
+            puzzle = _jsonPuzzle(json.loads(line))
+        except ValueError:
+            puzzle = None
+        if puzzle is None:
+            uiLogger.warning(f"Skipping line {lineNo}, it is not a JSON puzzle")
+            continue
+        yield puzzle
+
+
+def _readGrids(lines: Iterator[str]) -> Iterator[str]:
+    cells = ""
+    for lineNo, line in enumerate(lines, 1):
+        stripped = line.strip()
+        if stripped.startswith(("#", "[")):
+            continue
+        if not stripped:
+            # A blank line ends a grid, a partial one is dropped
+            if cells:
+                uiLogger.warning(f"Skipping the grid ending at line {lineNo}, it is incomplete")
+                cells = ""
+            continue
+        lineCells = stripped.translate(_cellTable)
+        if not _cellChars.issuperset(lineCells):
+            uiLogger.warning(f"Skipping line {lineNo}, it is not a grid row")
+            continue
+        cells += lineCells
+        if len(cells) >= 81:
+            if len(cells) == 81:
+                yield cells
+            else:
+                uiLogger.warning(f"Skipping the grid ending at line {lineNo}, it is too long")
+            cells = ""
+    if cells:
+        uiLogger.warning("Skipping the incomplete grid at the end of the file")
+
+
+_readers = {"lines": _readLines, "csv": _readCsv, "jsonl": _readJsonl, "grid": _readGrids}
+
+
+def readPuzzleFile(source: str = "-", puzzleFormat: str | None = None) -> Iterator[str]:
+    """
+    Read the puzzles of a file, or of stdin, one at a time.
+
+    Args:
+        source (str): Path of the file, "-" for stdin. May be gzip, xz or zstd compressed.
+        puzzleFormat (str): One of puzzleFormats. Detected from the file when None.
+
+    Yields:
+        str: One puzzle at a time as 81 characters, '.' for blanks.
+    """
+    if puzzleFormat is not None and puzzleFormat not in _readers:
+        raise ValueError(f"Invalid puzzle format: {puzzleFormat}. Must be one of {puzzleFormats}.")
+    with openPuzzleText(source) as textFile:
+        # The lines read to detect the format are handed to the reader too
+        skipped = []
+        firstLine = ""
+        for line in textFile:
+            skipped.append(line)
+            if line.strip() and not line.startswith("#"):
+                firstLine = line
+                break
+        puzzleFormat = puzzleFormat or detectFormat(source, firstLine)
+        yield from _readers[puzzleFormat](chain(skipped, textFile))
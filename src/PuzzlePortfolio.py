@@ -0,0 +1,157 @@
+"""
+Portfolio solving: race several solver configurations on the same puzzle.
+
+Which runtime and branching policy is fastest varies a lot from puzzle to puzzle. A portfolio
+keeps one single worker SolverPool per configuration, started on the first race that uses it
+and kept warm across races. A race submits the puzzle to every configuration at the same
+moment. The first one to finish wins and the others are cancelled through their pools, which
+the lua and julia solvers poll as well, so a loser frees its worker soon after.
+
+A race does not wait for configurations that are still bringing up their runtime, they take
+part with a late start. Only the configurations that were warm when the race started are
+listed as its entrants.
+
+A configuration is a runtime name, e.g. "luajit", or a dict with a "runtime" key and extra
+keyword arguments for the python solvers, e.g. {"runtime": "python", "policy": "mrv"}.
+Every win is tallied in portfolioWins by difficulty level and configuration, which is what a
+static choice of configuration per difficulty band can be learned from.
+"""
+
+import logging
+import threading
+from collections import Counter
+from concurrent.futures import FIRST_COMPLETED, wait
+from time import perf_counter
+
+from py2runtime import supportedRuntimes
+from PuzzleBatch import SolverPool
+
+uiLogger = logging.getLogger("uiLogger")
+
+# Julia is left out, its runtime takes far longer to come up than any solve it could win
+defaultPortfolio: tuple = (
+    {"runtime": "python", "policy": "mostFrequent"},
+    {"runtime": "python", "policy": "mrv"},
+    "luajit",
+)
+
+# (difficultyLevel, configuration label) to the number of races it won in this process
+portfolioWins: Counter = Counter()
+
+
+def configurationLabel(configuration: str | dict) -> str:
+    """Short name of a configuration, e.g. "luajit" or "python:policy=mrv"."""
+    if isinstance(configuration, str):
+        return configuration.lower()
+    options = ",".join(f"{k}={v}" for k, v in configuration.items() if k != "runtime")
+    runtime = configuration["runtime"].lower()
+    return f"{runtime}:{options}" if options else runtime
+
+
+# Configuration label to the pool it races on, kept warm across races
+_pools: dict[str, SolverPool] = {}
+# One race at a time, cancelling the losers of a race must not hit the entrants of another
+_raceLock = threading.Lock()
+
+
+def _getPool(label: str, runtime: str) -> SolverPool:
+    if label not in _pools:
+        _pools[label] = SolverPool(workers=1, runtime=runtime)
+    return _pools[label]
+
+
+def shutdown() -> None:
+    """Stop the pools kept between races."""
+    with _raceLock:
+        while _pools:
+            _, pool = _pools.popitem()
+            pool.close()
+
+
+def solvePortfolio(
+    puzzleString: str,
+    configurations=defaultPortfolio,
+    timeout: float | None = None,
+    **solverOptions,
+) -> dict:
+    """
+    Race the configurations on one puzzle and return the result of the first to finish.
+
+    Args:
+        puzzleString (str): The puzzle as 81 characters, '.' for blanks.
+        configurations (iterable): Runtime names or dicts with a "runtime" key, see the module.
+        timeout (float): Seconds to wait for a winner. None for no limit.
+        **solverOptions: Keyword arguments for the python solvers, overridden by the options of
+            a configuration.
+
+    Returns:
+        dict: The result of the winner with "portfolio" added, holding the "winner" label, the
+            "raceTime_ms" of the winner from the common start, the warm "entrants" and the
+            "failed" configurations with their errors. The solution is an 81 character string.
+
+    Raises:
+        RuntimeError: If every configuration failed or none finished within timeout.
+    """
+    entrants = {}
+    for configuration in configurations:
+        if isinstance(configuration, str):
+            configuration = {"runtime": configuration}
+        runtime = configuration["runtime"].lower()
+        if runtime not in supportedRuntimes:
+            raise ValueError(f"Invalid runtime: {runtime}. Must be one of {supportedRuntimes}.")
+        options = {k: v for k, v in configuration.items() if k != "runtime"}
+        entrants[configurationLabel(configuration)] = (runtime, {**solverOptions, **options})
+
+    with _raceLock:
+        ready, failed, futures = [], {}, {}
+        tStart = perf_counter()
+        for label, (runtime, options) in entrants.items():
+            pool = _getPool(label, runtime)
+            if pool.workerInitTimes_ms:
+                ready.append(label)
+            # Never answered from the cache or the store, or the race measures a lookup
+            future = pool.submit(
+                [puzzleString], cancellable=True, useCache=False, useStore=False, **options
+            )
+            futures[future] = label
+
+        deadline = None if timeout is None else tStart + timeout
+        pending, winner = set(futures), None
+        while pending and winner is None:
+            waitTime = None if deadline is None else max(0.0, deadline - perf_counter())
+            done, pending = wait(pending, timeout=waitTime, return_when=FIRST_COMPLETED)
+            if not done:
+                break
+            race_ms = (perf_counter() - tStart) * 1000.0
+            for future in done:
+                label = futures[future]
+                try:
+                    result = future.result()[0]
+                except Exception as err:
+                    # A pool whose runtime can not come up is dropped, the next race retries it
+                    result = {"error": f"{type(err).__name__}: {err}"}
+                    _pools.pop(label).close()
+                if "error" in result:
+                    failed[label] = result["error"]
+                    uiLogger.warning(f"Portfolio configuration {label} failed: {result['error']}")
+                elif winner is None:
+                    winner, winnerResult = label, result
+
+        # Losers stop at their next check and free their worker for the next race
+        for future in pending:
+            _pools[futures[future]].cancel()
+
+    if winner is None:
+        reason = "every configuration failed" if failed else "no configuration finished in time"
+        raise RuntimeError(f"Portfolio solve failed, {reason}: {failed}")
+
+    result = winnerResult
+    result.pop("index", None)
+    portfolioWins[(result.get("difficultyLevel"), winner)] += 1
+    result["portfolio"] = {
+        "winner": winner,
+        "raceTime_ms": race_ms,
+        "entrants": ready,
+        "failed": failed,
+    }
+    return result
@@ -0,0 +1,285 @@
+"""
+HTTP/JSON solve service built on asyncio and the standard library only.
+
+Requests are put on a bounded queue. A batcher task coalesces concurrent requests into small
+batches and hands each batch to a SolverPool, so the event loop never solves a puzzle itself.
+When the queue is full new requests get a 503 instead of piling up.
+
+Endpoints:
+    POST /solve   body: a puzzle string, a list of them, {"puzzle": ...} or {"puzzles": [...]}
+    GET  /stats   queue depth, counters and latency percentiles
+    GET  /health  runtime and worker status
+"""
+
+import asyncio
+import json
+import logging
+from collections import deque
+from http import HTTPStatus
+from time import perf_counter
+
+from PuzzleBatch import SolverPool, latencyStats
+
+uiLogger = logging.getLogger("uiLogger")
+
+
+class QueueFullError(Exception):
+    """Raised when a request does not fit in the solve queue."""
+
+
+class PuzzleServer(object):
+    """Solve service that micro-batches concurrent requests onto a SolverPool.
+
+    Args:
+        runtime (str): Solver runtime of the workers.
+        workers (int): Number of worker processes. Defaults to the number of CPUs.
+        batchSize (int): Most puzzles sent to a worker in one batch.
+        batchWindow_ms (float): How long the batcher waits for more puzzles to fill a batch.
+        maxQueue (int): Most puzzles waiting for a batch before requests are rejected with 503.
+        **solverOptions: Extra keyword arguments for the python solvers.
+    """
+
+    def __init__(
+        self,
+        runtime: str = "python",
+        workers: int | None = None,
+        batchSize: int = 16,
+        batchWindow_ms: float = 2.0,
+        maxQueue: int = 1024,
+        **solverOptions,
+    ):
+        self.runtime = runtime
+        self.workers = workers
+        self.batchSize = batchSize
+        self.batchWindow_ms = batchWindow_ms
+        self.maxQueue = maxQueue
+        self.solverOptions = solverOptions
+        self.pool: SolverPool | None = None
+
+        self.numRequests: int = 0
+        self.numPuzzles: int = 0
+        self.numRejected: int = 0
+        self.numBatches: int = 0
+        self.numInFlight: int = 0
+        # Latency of the most recent requests, from arrival to response
+        self.latencies_ms: deque[float] = deque(maxlen=10000)
+
+        self._queue: asyncio.Queue | None = None
+        self._batchSlots: asyncio.Semaphore | None = None
+        # The event loop only keeps weak references to tasks, the running batches are kept here
+        self._batchTasks: set[asyncio.Task] = set()
+
+    async def solvePuzzles(self, puzzles: list[str]) -> list[dict]:
+        """Queue puzzles for the batcher and wait for their results.
+        Raises:
+                QueueFullError: If the queue has no room for all of the puzzles.
+        """
+        if self._queue.maxsize - self._queue.qsize() < len(puzzles):
+            raise QueueFullError(f"Solve queue is full ({self._queue.qsize()} waiting)")
+        loop = asyncio.get_running_loop()
+        futures = []
+        for value in puzzles:
+            future = loop.create_future()
+            self._queue.put_nowait((value, future))
+            futures.append(future)
+        return await asyncio.gather(*futures)
+
+    async def _batcher(self) -> None:
+        """Collect queued puzzles into batches and start a solve task for each batch."""
+        loop = asyncio.get_running_loop()
+        while True:
+            batch = [await self._queue.get()]
+            deadline = loop.time() + self.batchWindow_ms / 1000.0
+            while len(batch) < self.batchSize:
+                if not self._queue.empty():
+                    batch.append(self._queue.get_nowait())
+                    continue
+                timeout = deadline - loop.time()
+                if timeout <= 0:
+                    break
+                try:
+                    batch.append(await asyncio.wait_for(self._queue.get(), timeout))
+                except TimeoutError:
+                    break
+
+            # Bound the batches on the pool, the queue is what absorbs bursts
+            await self._batchSlots.acquire()
+            self.numBatches += 1
+            self.numInFlight += len(batch)
+            task = asyncio.create_task(self._solveBatch(batch))
+            self._batchTasks.add(task)
+            task.add_done_callback(self._batchTasks.discard)
+
+    async def _solveBatch(self, batch: list[tuple[str, asyncio.Future]]) -> None:
+        """Solve one batch on the pool and hand every result to its waiting request."""
+        try:
+            results = await asyncio.wrap_future(
+                self.pool.submit([value for value, _ in batch], **self.solverOptions)
+            )
+            for (_, future), result in zip(batch, results):
+                result.pop("index", None)
+                if not future.done():
+                    future.set_result(result)
+        except Exception as err:
+            uiLogger.error(f"Batch failed: {err}")
+            for _, future in batch:
+                if not future.done():
+                    future.set_exception(err)
+        finally:
+            self.numInFlight -= len(batch)
+            self._batchSlots.release()
+
+    def stats(self) -> dict:
+        """Queue depth, counters and latency percentiles of the service."""
+        return {
+            "queueDepth": self._queue.qsize() if self._queue else 0,
+            "maxQueue": self.maxQueue,
+            "inFlight": self.numInFlight,
+            "numRequests": self.numRequests,
+            "numPuzzles": self.numPuzzles,
+            "numRejected": self.numRejected,
+            "numBatches": self.numBatches,
+            "latency_ms": latencyStats(list(self.latencies_ms)),
+        }
+
+    def health(self) -> dict:
+        """Runtime and worker status of the service."""
+        return {
+            "status": "ok" if self.pool else "starting",
+            "runtime": self.runtime,
+            "workers": self.pool.workers if self.pool else self.workers,
+            "workerInitTimes_ms": dict(self.pool.workerInitTimes_ms) if self.pool else {},
+        }
+
+    async def _route(self, method: str, path: str, body: bytes) -> tuple[HTTPStatus, object]:
+        """Dispatch one request. Returns the status and the JSON payload."""
+        path = path.split("?", 1)[0]
+        if path == "/stats":
+            return HTTPStatus.OK, self.stats()
+        if path == "/health":
+            return HTTPStatus.OK, self.health()
+        if path != "/solve":
+            return HTTPStatus.NOT_FOUND, {"error": f"Unknown path {path}"}
+        if method != "POST":
+            return HTTPStatus.METHOD_NOT_ALLOWED, {"error": "Use POST to solve puzzles"}
+
+        try:
+            request = json.loads(body or b"null")
+        except ValueError as err:
+            return HTTPStatus.BAD_REQUEST, {"error": f"Invalid JSON: {err}"}
+        if isinstance(request, dict):
+            request = request.get("puzzles", request.get("puzzle"))
+        isSingle = isinstance(request, str)
+        puzzles = [request] if isSingle else request
+        if not isinstance(puzzles, list) or not all(
+            isinstance(value, str) and len(value) == 81 for value in puzzles
+        ):
+            return HTTPStatus.BAD_REQUEST, {"error": "Expected 81 character puzzle strings"}
+
+        try:
+            results = await self.solvePuzzles(puzzles)
+        except QueueFullError as err:
+            self.numRejected += 1
+            return HTTPStatus.SERVICE_UNAVAILABLE, {"error": str(err)}
+        self.numPuzzles += len(puzzles)
+        return HTTPStatus.OK, results[0] if isSingle else {"results": results}
+
+    @staticmethod
+    async def _writeResponse(
+        writer: asyncio.StreamWriter, status: HTTPStatus, payload: object, keepAlive: bool
+    ) -> None:
+        """Send one JSON response."""
+        data = json.dumps(payload, default=str).encode()
+        writer.write(
+            (
+                f"HTTP/1.1 {status.value} {status.phrase}\r\n"
+                "Content-Type: application/json\r\n"
+                f"Content-Length: {len(data)}\r\n"
+                f"Connection: {'keep-alive' if keepAlive else 'close'}\r\n\r\n"
+            ).encode()
+            + data
+        )
+        await writer.drain()
+
+    async def _handleConnection(
+        self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter
+    ) -> None:
+        """Serve HTTP/1.1 requests on one connection until the client closes it."""
+        try:
+            while True:
+                requestLine = await reader.readline()
+                if not requestLine.strip():
+                    break
+                tStart = perf_counter()
+                requestLine = requestLine.decode("latin-1").strip()
+                requestParts = requestLine.split()
+                headers = {}
+                while (line := await reader.readline()) not in (b"\r\n", b"\n", b""):
+                    name, _, value = line.decode("latin-1").partition(":")
+                    headers[name.strip().lower()] = value.strip()
+                contentLength = headers.get("content-length", "0")
+                if len(requestParts) != 3:
+                    error = f"Malformed request line {requestLine!r}"
+                elif not (contentLength.isascii() and contentLength.isdigit()):
+                    error = f"Invalid Content-Length {contentLength!r}"
+                else:
+                    error = None
+                if error:
+                    # Without a request line or body length the next request can not be found
+                    self.numRequests += 1
+                    await self._writeResponse(
+                        writer, HTTPStatus.BAD_REQUEST, {"error": error}, keepAlive=False
+                    )
+                    break
+                method, path, version = requestParts
+                body = await reader.readexactly(int(contentLength))
+
+                self.numRequests += 1
+                try:
+                    status, payload = await self._route(method.upper(), path, body)
+                except Exception as err:
+                    # e.g. BrokenProcessPool from a failed batch, the connection stays usable
+                    uiLogger.error(f"Request {method} {path} failed: {err!r}")
+                    status = HTTPStatus.INTERNAL_SERVER_ERROR
+                    payload = {"error": f"Request failed: {err!r}"}
+                if path.startswith("/solve"):
+                    self.latencies_ms.append((perf_counter() - tStart) * 1000.0)
+
+                keepAlive = version == "HTTP/1.1" and headers.get("connection") != "close"
+                await self._writeResponse(writer, status, payload, keepAlive)
+                if not keepAlive:
+                    break
+        except (ConnectionError, asyncio.IncompleteReadError, ValueError) as err:
+            uiLogger.debug(f"Dropping connection: {err}")
+        finally:
+            writer.close()
+
+    async def serve(self, host: str = "127.0.0.1", port: int = 8080) -> None:
+        """Start the workers and serve requests until cancelled."""
+        self._queue = asyncio.Queue(maxsize=self.maxQueue)
+        loop = asyncio.get_running_loop()
+        pool = SolverPool(self.workers, self.runtime)
+        try:
+            await loop.run_in_executor(None, pool.warmup)
+            self.pool = pool
+            # Two batches per worker keeps every worker busy while the next batch is formed
+            self._batchSlots = asyncio.Semaphore(2 * pool.workers)
+            batcher = asyncio.create_task(self._batcher())
+            server = await asyncio.start_server(self._handleConnection, host, port)
+            uiLogger.info(f"Serving {self.runtime} solver on http://{host}:{port}")
+            try:
+                async with server:
+                    await server.serve_forever()
+            finally:
+                batcher.cancel()
+        finally:
+            self.pool = None
+            pool.close()
+
+
+def runServer(host: str = "127.0.0.1", port: int = 8080, **serverOptions) -> None:
+    """Run a PuzzleServer until interrupted. serverOptions go to PuzzleServer."""
+    try:
+        asyncio.run(PuzzleServer(**serverOptions).serve(host, port))
+    except KeyboardInterrupt:
+        uiLogger.info("Server stopped")
@@ -0,0 +1,227 @@
+"""
+Persistent on-disk store of puzzle solutions, shared by GUI sessions and batch runs.
+
+The store is an SQLite database in WAL mode keyed by the 81 character puzzle string. It keeps
+the solution and status of every puzzle and the latest metrics of each runtime that solved
+it. SudokuPuzzle.solve looks puzzles up here before solving them.
+
+Writes are buffered and committed together, once batchSize results are waiting or
+flushInterval_s passed since the last commit, so a large batch run commits a few times per
+second instead of once per puzzle. Whatever is still buffered is written when the process
+exits, worker processes included.
+
+The database lives in ~/.cache/sudokuSolver unless the SUDOKU_SOLVER_STORE environment
+variable names another file. Set it to an empty string to turn the store off.
+"""
+
+import logging
+import os
+import sqlite3
+from multiprocessing.util import Finalize
+from time import monotonic
+
+uiLogger = logging.getLogger("uiLogger")
+
+defaultStorePath: str = os.path.join(
+    os.path.expanduser("~"), ".cache", "sudokuSolver", "solutions.sqlite3"
+)
+
+_schema: str = """
+CREATE TABLE IF NOT EXISTS solutions (
+    puzzle      TEXT PRIMARY KEY,
+    solution    TEXT,
+    status      TEXT NOT NULL
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS runtimeStats (
+    puzzle          TEXT NOT NULL,
+    runtime         TEXT NOT NULL,
+    numRecursions   INTEGER,
+    numOperations   INTEGER,
+    duration_ms     REAL,
+    PRIMARY KEY (puzzle, runtime)
+) WITHOUT ROWID;
+"""
+
+
+class SolutionStore(object):
+    """Solutions and per-runtime metrics in an SQLite database, with batched writes.
+
+    Args:
+        path (str): Database file, created with its directory if missing.
+        batchSize (int): Results buffered before they are committed.
+        flushInterval_s (float): Longest time a result stays buffered, checked on every put.
+    """
+
+    def __init__(
+        self, path: str = defaultStorePath, batchSize: int = 256, flushInterval_s: float = 2.0
+    ):
+        self.path = path
+        self.batchSize = batchSize
+        self.flushInterval_s = flushInterval_s
+        # The connection belongs to the process that opened it, see solutionStore
+        self.pid = os.getpid()
+
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self._connection = sqlite3.connect(path, timeout=30.0)
+        self._connection.execute("PRAGMA journal_mode=WAL")
+        # WAL only needs a sync at checkpoints to stay consistent
+        self._connection.execute("PRAGMA synchronous=NORMAL")
+        self._connection.executescript(_schema)
+
+        # Puzzle to (solution, status), and (puzzle, runtime) to metrics, not committed yet
+        self._pendingSolutions: dict[str, tuple[str | None, str]] = {}
+        self._pendingStats: dict[tuple[str, str], tuple[int, int, float]] = {}
+        self._lastFlush = monotonic()
+        self.numHits: int = 0
+        self.numMisses: int = 0
+        self.numFlushes: int = 0
+
+        # Also runs at the exit of pool workers, where atexit handlers are skipped
+        self._finalizer = Finalize(
+            self,
+            SolutionStore._closeConnection,
+            args=(self._connection, self._pendingSolutions, self._pendingStats),
+            exitpriority=10,
+        )
+
+    def get(self, puzzleString: str, runtime: str | None = None) -> dict | None:
+        """
+        Look up a puzzle.
+
+        Args:
+            puzzleString (str): The puzzle as 81 characters, '.' for blanks.
+            runtime (str): Runtime whose metrics to return. The metrics of any runtime that
+                solved the puzzle are used if this one did not.
+
+        Returns:
+            dict | None: Result dictionary with the solution as an 81 character string or
+                False, the status, the metrics and "runtime", the runtime they belong to.
+                None if the puzzle is not in the store.
+        """
+        if puzzleString in self._pendingSolutions:
+            solution, status = self._pendingSolutions[puzzleString]
+        else:
+            row = self._connection.execute(
+                "SELECT solution, status FROM solutions WHERE puzzle = ?", (puzzleString,)
+            ).fetchone()
+            if row is None:
+                self.numMisses += 1
+                return None
+            solution, status = row
+        self.numHits += 1
+
+        result = {"solution": solution or False, "status": status}
+        metrics = {
+            key[1]: value for key, value in self._pendingStats.items() if key[0] == puzzleString
+        }
+        if runtime not in metrics:
+            metrics.update(
+                (row[0], row[1:])
+                for row in self._connection.execute(
+                    "SELECT runtime, numRecursions, numOperations, duration_ms "
+                    "FROM runtimeStats WHERE puzzle = ?",
+                    (puzzleString,),
+                )
+                if row[0] not in metrics
+            )
+        if metrics:
+            statsRuntime = runtime if runtime in metrics else next(iter(metrics))
+            numRecursions, numOperations, duration_ms = metrics[statsRuntime]
+            result.update(
+                runtime=statsRuntime,
+                numRecursions=numRecursions,
+                numOperations=numOperations,
+                duration_ms=duration_ms,
+            )
+        return result
+
+    def put(self, puzzleString: str, runtime: str, result: dict) -> None:
+        """Buffer one result whose solution is an 81 character string, or False."""
+        self._pendingSolutions[puzzleString] = (result["solution"] or None, result["status"])
+        self._pendingStats[(puzzleString, runtime)] = (
+            result.get("numRecursions"),
+            result.get("numOperations"),
+            result.get("duration_ms"),
+        )
+        if (
+            len(self._pendingStats) >= self.batchSize
+            or monotonic() - self._lastFlush >= self.flushInterval_s
+        ):
+            self.flush()
+
+    def flush(self) -> None:
+        """Commit every buffered result in one transaction."""
+        if self._pendingStats or self._pendingSolutions:
+            SolutionStore._writePending(
+                self._connection, self._pendingSolutions, self._pendingStats
+            )
+            self.numFlushes += 1
+        self._lastFlush = monotonic()
+
+    @staticmethod
+    def _writePending(
+        connection: sqlite3.Connection, pendingSolutions: dict, pendingStats: dict
+    ) -> None:
+        with connection:
+            connection.executemany(
+                "INSERT OR REPLACE INTO solutions (puzzle, solution, status) VALUES (?, ?, ?)",
+                [(puzzle, *value) for puzzle, value in pendingSolutions.items()],
+            )
+            connection.executemany(
+                "INSERT OR REPLACE INTO runtimeStats "
+                "(puzzle, runtime, numRecursions, numOperations, duration_ms) "
+                "VALUES (?, ?, ?, ?, ?)",
+                [(*key, *value) for key, value in pendingStats.items()],
+            )
+        pendingSolutions.clear()
+        pendingStats.clear()
+
+    @staticmethod
+    def _closeConnection(
+        connection: sqlite3.Connection, pendingSolutions: dict, pendingStats: dict
+    ) -> None:
+        try:
+            SolutionStore._writePending(connection, pendingSolutions, pendingStats)
+        except sqlite3.Error as err:
+            uiLogger.error(f"Failed to write pending solutions: {err}")
+        connection.close()
+
+    def close(self) -> None:
+        """Commit the buffered results and close the database."""
+        self._finalizer()
+
+    def stats(self) -> dict:
+        """Number of stored puzzles, buffered results and lookup counts."""
+        (numPuzzles,) = self._connection.execute("SELECT COUNT(*) FROM solutions").fetchone()
+        return {
+            "path": self.path,
+            "numPuzzles": numPuzzles,
+            "numPending": len(self._pendingStats),
+            "numHits": self.numHits,
+            "numMisses": self.numMisses,
+            "numFlushes": self.numFlushes,
+        }
+
+
+_store: SolutionStore | None = None
+# Path of a store that failed to open, so it is not retried for every puzzle
+_failedPath: str | None = None
+
+
+def solutionStore() -> SolutionStore | None:
+    """The store of this process, opened on first use. None when the store is turned off or can
+    not be opened.
+    """
+    global _store, _failedPath
+    if _store is None or _store.pid != os.getpid():
+        # A store inherited over fork must not be used, its connection belongs to the parent
+        path = os.environ.get("SUDOKU_SOLVER_STORE", defaultStorePath)
+        if not path or path == _failedPath:
+            return None
+        try:
+            _store = SolutionStore(path)
+        except (OSError, sqlite3.Error) as err:
+            uiLogger.warning(f"Solution store {path} is not available: {err}")
+            _failedPath = path
+            return None
+    return _store
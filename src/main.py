@@ -22,6 +22,34 @@ def main():
 
     # Set up logging
     inArgs = parseArgs()
+    if inArgs.command == "solve":
+        # Headless batch mode, PyQt is never imported on this path
+        setupLogging(loggingLevel=inArgs.loglevel, stream=sys.stderr)
+        sys.exit(solveCommand(inArgs))
+    if inArgs.command == "corpus":
+        from PuzzleCorpus import convertCsv
+
+        setupLogging(loggingLevel=inArgs.loglevel, stream=sys.stderr)
+        convertCsv(inArgs.input, inArgs.output, withComments=not inArgs.no_comments)
+        return
+    if inArgs.command == "daemon":
+        setupLogging(loggingLevel=inArgs.loglevel, stream=sys.stderr)
+        sys.exit(daemonCommand(inArgs))
+    if inArgs.command == "serve":
+        from PuzzleServer import runServer
+
+        setupLogging(loggingLevel=inArgs.loglevel)
+        runServer(
+            inArgs.host,
+            inArgs.port,
+            runtime=inArgs.runtime or inArgs.language,
+            workers=inArgs.workers or None,
+            batchSize=inArgs.batch_size,
+            batchWindow_ms=inArgs.batch_window_ms,
+            maxQueue=inArgs.max_queue,
+        )
+        return
+
     uiLogger = setupLogging(loggingLevel=inArgs.loglevel)
     uiLogger.info("Starting Sudoku Solver Application")
     uiLogger.debug("Setting up application environment")
@@ -59,10 +87,171 @@ def main():
     sys.exit(app.exec())
 
 
-def setupLogging(loggingLevel="INFO") -> logging.Logger:
+def solveCommand(inArgs: argparse.Namespace) -> int:
+    """Run the solve subcommand.
+    Solves every puzzle of the input with solveMany and writes one CSV row per puzzle. Only the
+    puzzle, runtime and solver modules are imported. Throughput and latency stats, and the
+    runtime init time of every worker, are printed to stderr at the end.
+    Args:
+        inArgs (argparse.Namespace): Parsed command line arguments.
+    Returns:
+        int: Exit code, 1 if any puzzle failed with an error.
+    """
+    import csv
+    import time
+
+    from PuzzleBatch import SolverPool, latencyStats, readPuzzles, readPuzzlesByScore, solveMany
+
+    runtime = inArgs.runtime or inArgs.language
+    tStart = time.perf_counter()
+    latencies_ms = []
+    numSolved = 0
+    numTimedOut = 0
+    numErrors = 0
+
+    # Budgets keep a pathological puzzle from pinning a worker
+    budgets = dict(timeLimit_ms=inArgs.time_limit_ms, maxNodes=inArgs.max_nodes)
+    solverOptions = {k: v for k, v in budgets.items() if v is not None}
+
+    # Score selections go through the score index of a corpus input
+    if inArgs.per_band is not None or inArgs.min_score is not None or inArgs.max_score is not None:
+        from PuzzleCorpus import defaultScoreBands, isCorpusFile
+
+        if not isCorpusFile(inArgs.input):
+            print(f"{inArgs.input} is not a corpus file, see the corpus command", file=sys.stderr)
+            return 1
+        scoreRange = (
+            inArgs.min_score if inArgs.min_score is not None else float("-inf"),
+            inArgs.max_score if inArgs.max_score is not None else float("inf"),
+        )
+        puzzles = readPuzzlesByScore(
+            inArgs.input,
+            scoreRange=scoreRange,
+            perBand=inArgs.per_band,
+            bands=inArgs.bands or defaultScoreBands,
+            seed=inArgs.seed,
+        )
+    else:
+        puzzles = readPuzzles(inArgs.input, inArgs.format)
+
+    # With more than one worker keep the pool, so the init time of its workers can be reported
+    pool = None
+    if inArgs.socket:
+        # A running daemon already has the runtime warm, see the daemon subcommand
+        from PuzzleClient import solveMany as solveOnDaemon
+
+        results = solveOnDaemon(puzzles, runtime, inArgs.socket, **solverOptions)
+    elif inArgs.workers != 1:
+        pool = SolverPool(inArgs.workers or None, runtime)
+        results = pool.solveMany(puzzles, ordered=inArgs.ordered, **solverOptions)
+    else:
+        results = solveMany(puzzles, workers=1, runtime=runtime, **solverOptions)
+
+    outFile = sys.stdout if inArgs.output == "-" else open(inArgs.output, "w", newline="")
+    try:
+        writer = csv.writer(outFile)
+        writer.writerow(["Index", "Solution", "NumRecursions", "Duration_ms", "Status"])
+        for result in results:
+            if "error" in result:
+                numErrors += 1
+                writer.writerow([result["index"], "", "", "", "error"])
+                continue
+            numSolved += bool(result["solution"])
+            numTimedOut += result.get("status") == "timeout"
+            latencies_ms.append(result["duration_ms"])
+            writer.writerow(
+                [
+                    result["index"],
+                    result["solution"] or "",
+                    result["numRecursions"],
+                    f"{result['duration_ms']:.3f}",
+                    result.get("status", ""),
+                ]
+            )
+    finally:
+        if outFile is not sys.stdout:
+            outFile.close()
+        if pool is not None:
+            pool.close()
+
+    elapsed = time.perf_counter() - tStart
+    numPuzzles = len(latencies_ms) + numErrors
+    stats = latencyStats(latencies_ms)
+    throughput = numPuzzles / elapsed if elapsed else 0.0
+    print(
+        f"{numPuzzles} puzzles ({numSolved} solved, {numTimedOut} timed out, {numErrors} errors) "
+        f"with {runtime} in {elapsed:.2f} s: {throughput:.1f} puzzles/s",
+        file=sys.stderr,
+    )
+    print(
+        "solve latency ms: "
+        + ", ".join(f"{name} {value:.3f}" for name, value in stats.items()),
+        file=sys.stderr,
+    )
+    if not inArgs.socket and pool is None:
+        from PuzzleCache import solutionCache
+        from PuzzleStore import solutionStore
+
+        print(
+            "solution cache: "
+            + ", ".join(f"{name} {value:g}" for name, value in solutionCache.stats().items()),
+            file=sys.stderr,
+        )
+        if store := solutionStore():
+            store.flush()
+            print(
+                "solution store: "
+                + ", ".join(f"{name} {value}" for name, value in store.stats().items()),
+                file=sys.stderr,
+            )
+    if pool is not None:
+        print(
+            "worker init ms: "
+            + ", ".join(f"{pid} {ms:.1f}" for pid, ms in pool.workerInitTimes_ms.items()),
+            file=sys.stderr,
+        )
+    return 1 if numErrors else 0
+
+
+def daemonCommand(inArgs: argparse.Namespace) -> int:
+    """Run the daemon subcommand.
+    Starts a solver daemon that keeps the runtimes warm, or with --status/--stop talks to one
+    that is already running.
+    Args:
+        inArgs (argparse.Namespace): Parsed command line arguments.
+    Returns:
+        int: Exit code, 1 if no daemon answered.
+    """
+    import json
+
+    from PuzzleClient import DaemonError, daemonStatus, defaultSocketPath, stopDaemon
+
+    socketPath = inArgs.socket or defaultSocketPath
+    try:
+        if inArgs.status:
+            print(json.dumps(daemonStatus(socketPath), indent=2))
+            return 0
+        if inArgs.stop:
+            stopDaemon(socketPath)
+            return 0
+    except DaemonError as err:
+        print(err, file=sys.stderr)
+        return 1
+
+    from PuzzleDaemon import SolverDaemon
+
+    SolverDaemon(socketPath, inArgs.runtimes).run()
+    return 0
+
+
+def setupLogging(loggingLevel="INFO", stream=sys.stdout) -> logging.Logger:
     """Set up logging for the application.
     This function configures the logging settings, including the format and level of logging.
     It creates a logger that can be used throughout the application.
+    Args:
+        loggingLevel (str): Name of the logging level.
+        stream: Stream the log is written to. The solve subcommand logs to stderr so its
+            results can go to stdout.
     Returns:
         logging.Logger: The configured logger instance.
     """
@@ -83,19 +272,30 @@ def setupLogging(loggingLevel="INFO") -> logging.Logger:
     logging.basicConfig(
         format=FORMAT,
         level=logging.__dict__[loggingLevel.upper()],
-        handlers=[logging.StreamHandler(sys.stdout)],
+        handlers=[logging.StreamHandler(stream)],
     )
     uiLogger = logging.getLogger("uiLogger")
     uiLogger.debug("Logging is set up")
     return uiLogger
 
 
+def _puzzleFormat(name: str) -> str:
+    """Argument type of --format. PuzzleFormats is only imported when the option is given."""
+    from PuzzleFormats import puzzleFormats
+
+    if name not in puzzleFormats:
+        raise argparse.ArgumentTypeError(f"invalid choice: {name} (choose from {puzzleFormats})")
+    return name
+
+
 def parseArgs() -> argparse.Namespace:
     """Parse command line arguments.
     This function is a placeholder for future command line argument parsing.
     Currently, it does not implement any functionality.
     """
 
+    from py2runtime import supportedRuntimes
+
     # Placeholder for command line argument parsing
     parser = argparse.ArgumentParser(
         description="Sudoku Solver Application",
@@ -104,15 +304,15 @@ def parseArgs() -> argparse.Namespace:
         allow_abbrev=True,
         prog="SudokuSolverApp",
         epilog="something something dark side",
-        usage="%(prog)s [options]",
+        usage="%(prog)s [options] [solve ... | serve ... | daemon ... | corpus ...]",
     )
     parser.add_argument(
         "-l",
         "--language",
         type=str,
         default="python",
-        choices=["python", "julia", "luajit", "lua"],
-        help="Set the runtime language for the solver (default: python). This option allows you to choose the programming language used for solving Sudoku puzzles. Supported languages are Python, Julia, LuaJIT, and Lua.",
+        choices=supportedRuntimes,
+        help="Set the runtime language for the solver (default: python). This option allows you to choose the programming language used for solving Sudoku puzzles. Supported languages are Python, Julia, LuaJIT, and Lua. pybits is the bitmask variant of the Python solver, pydlx the dancing links exact cover solver and pyparallel the Python solver searching the subtrees of a hard puzzle on several processes.",
     )
 
     parser.add_argument(
@@ -131,6 +331,186 @@ def parseArgs() -> argparse.Namespace:
         help="Show the application version and exit. This option displays the current version of the Sudoku Solver application and exits.",
     )
 
+    subparsers = parser.add_subparsers(
+        dest="command",
+        title="commands",
+        description="Without a command the GUI is started.",
+    )
+    solveParser = subparsers.add_parser(
+        "solve",
+        help="Solve puzzles from a file or stdin without starting the GUI.",
+        formatter_class=argparse.ArgumentDefaultsHelpFormatter,
+    )
+    solveParser.add_argument(
+        "-i",
+        "--input",
+        type=str,
+        default="-",
+        help="Puzzle file, one puzzle per line, CSV, JSONL, .sdk/.ss grids (gzip, xz or zstd compressed too) or a corpus file. - reads stdin.",
+    )
+    solveParser.add_argument(
+        "--format",
+        type=_puzzleFormat,
+        default=None,
+        help="Format of the input text, lines, csv, jsonl or grid. Detected from the file when "
+        "not given.",
+    )
+    solveParser.add_argument(
+        "-r",
+        "--runtime",
+        type=str,
+        default=None,
+        choices=supportedRuntimes,
+        help="Solver runtime. Defaults to the --language option.",
+    )
+    solveParser.add_argument(
+        "-w",
+        "--workers",
+        type=int,
+        default=1,
+        help="Number of worker processes. 1 solves in this process, 0 uses every CPU.",
+    )
+    solveParser.add_argument(
+        "-o",
+        "--output",
+        type=str,
+        default="-",
+        help="CSV file for the results. - writes to stdout.",
+    )
+    solveParser.add_argument(
+        "--ordered",
+        action="store_true",
+        help="Write results in input order instead of completion order.",
+    )
+    solveParser.add_argument(
+        "--time-limit-ms",
+        type=float,
+        default=None,
+        help="Give up on a puzzle after this many milliseconds, reported with status timeout.",
+    )
+    solveParser.add_argument(
+        "--max-nodes",
+        type=int,
+        default=None,
+        help="Give up on a puzzle after this many search nodes, reported with status timeout.",
+    )
+    solveParser.add_argument(
+        "--min-score",
+        type=float,
+        default=None,
+        help="Only solve the puzzles of a corpus input with at least this score.",
+    )
+    solveParser.add_argument(
+        "--max-score",
+        type=float,
+        default=None,
+        help="Only solve the puzzles of a corpus input with at most this score.",
+    )
+    solveParser.add_argument(
+        "--per-band",
+        type=int,
+        default=None,
+        help="Solve this many random puzzles of every score band of a corpus input.",
+    )
+    solveParser.add_argument(
+        "--bands",
+        type=lambda edges: tuple(float(edge) for edge in edges.split(",")),
+        default=None,
+        help="Comma separated score band edges for --per-band. Defaults to the bands of "
+        "PuzzleCorpus.defaultScoreBands.",
+    )
+    solveParser.add_argument("--seed", type=int, default=None, help="Seed of the --per-band draw.")
+    solveParser.add_argument(
+        "-s",
+        "--socket",
+        type=str,
+        default=None,
+        help="Solve on the solver daemon listening on this socket instead of in this process.",
+    )
+
+    serveParser = subparsers.add_parser(
+        "serve",
+        help="Run an HTTP/JSON solve service without starting the GUI.",
+        formatter_class=argparse.ArgumentDefaultsHelpFormatter,
+    )
+    serveParser.add_argument("--host", type=str, default="127.0.0.1", help="Address to bind.")
+    serveParser.add_argument("-p", "--port", type=int, default=8080, help="Port to listen on.")
+    serveParser.add_argument(
+        "-r",
+        "--runtime",
+        type=str,
+        default=None,
+        choices=supportedRuntimes,
+        help="Solver runtime. Defaults to the --language option.",
+    )
+    serveParser.add_argument(
+        "-w",
+        "--workers",
+        type=int,
+        default=0,
+        help="Number of worker processes, 0 uses every CPU.",
+    )
+    serveParser.add_argument(
+        "--batch-size", type=int, default=16, help="Most puzzles solved by a worker in one batch."
+    )
+    serveParser.add_argument(
+        "--batch-window-ms",
+        type=float,
+        default=2.0,
+        help="How long to wait for more requests to fill a batch.",
+    )
+    serveParser.add_argument(
+        "--max-queue",
+        type=int,
+        default=1024,
+        help="Most puzzles waiting for a worker. Requests beyond that get a 503.",
+    )
+
+    daemonParser = subparsers.add_parser(
+        "daemon",
+        help="Run a solver daemon that keeps the runtimes warm on a Unix domain socket.",
+        formatter_class=argparse.ArgumentDefaultsHelpFormatter,
+    )
+    daemonParser.add_argument(
+        "-s",
+        "--socket",
+        type=str,
+        default=None,
+        help="Path of the daemon socket. Defaults to PuzzleClient.defaultSocketPath.",
+    )
+    daemonParser.add_argument(
+        "-r",
+        "--runtimes",
+        nargs="+",
+        default=["python"],
+        choices=supportedRuntimes,
+        help="Runtimes to warm up at start. Others are warmed up on first use.",
+    )
+    daemonAction = daemonParser.add_mutually_exclusive_group()
+    daemonAction.add_argument(
+        "--status",
+        action="store_true",
+        help="Print the warmup and compile status of a running daemon and exit.",
+    )
+    daemonAction.add_argument("--stop", action="store_true", help="Stop a running daemon.")
+
+    corpusParser = subparsers.add_parser(
+        "corpus",
+        help="Convert a puzzles.csv style file to a packed, memory mapped corpus file.",
+        formatter_class=argparse.ArgumentDefaultsHelpFormatter,
+    )
+    corpusParser.add_argument("input", type=str, help="CSV file with ID, Puzzle and Score columns.")
+    corpusParser.add_argument(
+        "-o",
+        "--output",
+        type=str,
+        default=None,
+        help="Corpus file to write. Defaults to the input path with the .sdkc suffix.",
+    )
+    corpusParser.add_argument(
+        "--no-comments", action="store_true", help="Leave the Comment column out of the corpus."
+    )
+
     args = parser.parse_args()
     return args
 
@@ -10,12 +10,24 @@ Returns:
     None: no return values
 """
 
+import importlib
 import logging
 import os
 import sys
 
 uiLogger = logging.getLogger("uiLogger")
 
+# Runtimes whose solver is a python module and takes/returns plain python dicts, with the
+# module whose solve function they run
+pythonSolverModules: dict[str, str] = {
+    "python": "solver.PySolver",
+    "pybits": "solver.PyBitSolver",
+    "pydlx": "solver.PyDlxSolver",
+    "pyparallel": "solver.PyParallelSolver",
+}
+pythonRuntimes: list[str] = list(pythonSolverModules)
+supportedRuntimes: list[str] = ["luajit", "lua", "julia", *pythonRuntimes]
+
 
 class _Py2Runtime:
     def __init__(self, lang=None):
@@ -59,17 +71,16 @@ class _Py2Runtime:
             uiLogger.info(f"Using {self.lang} runtime")
             return
 
-        if lang.lower() not in ["luajit", "lua", "julia", "python"]:
-            raise ValueError(f"Invalid language: {lang}. Must be 'luajit','lua', or 'julia'.")
+        if lang.lower() not in supportedRuntimes:
+            raise ValueError(f"Invalid language: {lang}. Must be one of {supportedRuntimes}.")
         self._lang = lang.lower()
         uiLogger.info(f"Using {self.lang} runtime")
 
         if lang == "luajit" and self._lang not in self._version:
             import lupa.luajit21 as lupa
-            from lupa import LuaRuntime
 
-            # Get the lua runtime from lupa. Try to use luajit if possible
-            lua = LuaRuntime()
+            # The runtime of the luajit21 module, lupa.LuaRuntime is whichever lua lupa prefers
+            lua = lupa.LuaRuntime()
             uiLogger.info(f"Using {lua.lua_implementation} (compiled with {lupa.LUA_VERSION})")
             self._version["luajit"] = lupa.LUA_VERSION
 
@@ -81,18 +92,17 @@ class _Py2Runtime:
 
             uiLogger.debug("\tImporting defintions.lua as table object...")
 
-            self._definitionsModule["luajit"] = lua.require("src.solver.LDefinitions")[0]
+            # LuaJIT require returns the module only, not the module and its path
+            self._definitionsModule["luajit"] = lua.require("src.solver.LDefinitions")
 
             uiLogger.debug("\tImporting solver.lua as table object...")
-            self._solverModule["luajit"] = lua.require("src.solver.LSolver")[0]
+            self._solverModule["luajit"] = lua.require("src.solver.LSolver")
 
             uiLogger.info("\tLuaJit Runtime initialized")
         elif lang == "lua" and self._lang not in self._version:
             import lupa.lua54 as lupa
-            from lupa import LuaRuntime
 
-            # Get the lua runtime from lupa. Try to use luajit if possible
-            lua = LuaRuntime()
+            lua = lupa.LuaRuntime()
             uiLogger.info(f"Using {lua.lua_implementation} (compiled with {lupa.LUA_VERSION})")
             self._version["lua"] = lupa.LUA_VERSION
 
@@ -142,16 +152,19 @@ class _Py2Runtime:
 
             uiLogger.info("\tJulia Runtime initialized")
 
-        elif lang == "python" and self.lang not in self._version:
+        elif lang in pythonRuntimes and self.lang not in self._version:
             import solver.PySolver as pysolver
 
-            self._version["python"] = sys.version
+            solverModule = importlib.import_module(pythonSolverModules[lang])
+
+            self._version[lang] = sys.version
 
-            self._runtime["python"] = []
+            self._runtime[lang] = []
 
-            self._definitionsModule["python"] = pysolver
+            # Same square definitions for every python runtime, only the engine differs
+            self._definitionsModule[lang] = pysolver
 
-            self._solverModule["python"] = pysolver.solve
+            self._solverModule[lang] = solverModule.solve
 
     @staticmethod
     def relPath2ImportPath(relPath):
@@ -62,9 +62,10 @@ puzzle0::SudokuPuzzleT = Dict(sq => squareValue0 for sq in squares)
 end
 
 module JSolver
-export solve
+export solve, countSolutions, iterSolutions, PuzzleSearch, advance!, saveSearch, loadSearch
 
 using ..JDefinitions
+using Serialization
 
 
 
@@ -116,77 +117,174 @@ function getNextEntryPoint(puzzle::SudokuPuzzleT)
 end
 
 
-function solve(puzzle::SudokuPuzzleT)
-    # Make sure the puzzle is valid
-    function solveTheThing(puzzle::SudokuPuzzleT)
+# Remove the value of every solved square from its neighbors until nothing changes.
+# Is there a way to make this more julia-like? Probably
+# Returns the number of values eliminated
+function eliminationPass!(puzzle::SudokuPuzzleT)::Int
+    numEliminated = 0
+    didChange = true
+    while didChange == true && ~isPuzzleComplete(puzzle)
+        didChange = false
+        for solvedSquare in [k for (k, v) in puzzle if length(v) == 1]
+            solvedValue = first(puzzle[solvedSquare])
+
+            for nsq in neighbors[solvedSquare]
+                if solvedValue in puzzle[nsq] && length(puzzle[nsq]) > 1
+                    numEliminated+=1
+                    didChange = true
+                    puzzle[nsq] = delete!(puzzle[nsq], solvedValue)
+                end
+            end
+        end
+    end
+    return numEliminated
+end
 
-        isPuzzleSolved(puzzle) && return puzzle
+# True if two neighbors are both solved with the same value
+@inline function hasConflict(pzl::SudokuPuzzleT)::Bool
+    any(length(pzl[sq]) == 1 && any(nsq -> pzl[nsq] == pzl[sq], neighbors[sq]) for sq in squares)
+end
 
-        # Make a guess
-        puzzle = eliminationPass(puzzle)
+# One level of the search stack: the reduced puzzle, the square guessed there and the
+# values still to try for it
+mutable struct SearchFrame
+    puzzle::SudokuPuzzleT
+    entry::SquareT
+    values::Vector{Int}
+    nextIdx::Int
+end
 
-        isPuzzleSolved(puzzle) && return puzzle
-        !allFamiliesValid(puzzle) && return false
-        isPuzzleComplete(puzzle) && return false
-        nextEntry = getNextEntryPoint(puzzle)
-        nextEntry == false && return false
-        nextValues = sort(
-            collect(puzzle[nextEntry]), 
-            by=x -> count(==(x), reduce(vcat,collect.(values(puzzle)))), 
-            rev=true)
-        # Sort the next values by how often they occur in the puzzle, most frequent first
-        # This way we try the most frequent values first, which should lead to fewer branches
-        # and hopefully a faster solution
-        for nextValue in nextValues
-            
-            nextPuzzleGuess = deepcopy(puzzle)
-            !allFamiliesValid(nextPuzzleGuess) && continue
-            numRecursions += 1
-            nextPuzzleGuess[nextEntry] = Set(nextValue)
-            nextPuzzleGuess = solveTheThing(nextPuzzleGuess)
+# Depth first search with an explicit stack instead of recursion. advance! expands a bounded
+# number of nodes and returns, so a search can be paused, interleaved with others on one
+# thread and picked up again, also after saveSearch/loadSearch
+mutable struct PuzzleSearch
+    stack::Vector{SearchFrame}
+    pending::Union{SudokuPuzzleT,Nothing}
+    done::Bool
+    numNodes::Int
+    numRecursions::Int
+    numOperations::Int
+    bestSinglePass::Int
+end
+PuzzleSearch(puzzle::SudokuPuzzleT) = PuzzleSearch(SearchFrame[], deepcopy(puzzle), false, 0, 0, 0, 0)
+
+# Reduce one puzzle. Returns it if it is solved, otherwise pushes a frame for its guesses
+function expand!(search::PuzzleSearch, puzzle::SudokuPuzzleT)
+    numEliminated = eliminationPass!(puzzle)
+    search.numOperations += numEliminated
+    search.bestSinglePass = max(search.bestSinglePass, numEliminated)
+
+    hasConflict(puzzle) && return nothing
+    isPuzzleComplete(puzzle) && return isPuzzleSolved(puzzle) ? puzzle : nothing
+    !allFamiliesValid(puzzle) && return nothing
+
+    nextEntry = getNextEntryPoint(puzzle)
+    nextEntry == false && return nothing
+    # Sort the next values by how often they occur in the puzzle, most frequent first
+    # This way we try the most frequent values first, which should lead to fewer branches
+    allPuzzleValues = reduce(vcat, collect.(values(puzzle)))
+    nextValues = sort(collect(puzzle[nextEntry]), by=x -> count(==(x), allPuzzleValues), rev=true)
+    push!(search.stack, SearchFrame(puzzle, nextEntry, nextValues, 1))
+    return nothing
+end
 
-            nextPuzzleGuess == false && continue
-            isPuzzleSolved(nextPuzzleGuess) && return nextPuzzleGuess
+# Next guess that keeps every family valid, popping frames that ran out of values
+function nextGuess!(search::PuzzleSearch)
+    while !isempty(search.stack)
+        frame = search.stack[end]
+        while frame.nextIdx <= length(frame.values)
+            nextPuzzleGuess = deepcopy(frame.puzzle)
+            nextPuzzleGuess[frame.entry] = Set(frame.values[frame.nextIdx])
+            frame.nextIdx += 1
+            if allFamiliesValid(nextPuzzleGuess)
+                search.numRecursions += 1
+                return nextPuzzleGuess
+            end
         end
-        return false
+        pop!(search.stack)
     end
+    return nothing
+end
 
-    # Is there a way to make this more julia-like? Probably
-    function eliminationPass(puzzle::SudokuPuzzleT)::SudokuPuzzleT
-        numEliminated = 0
-        didChange = true
-        while didChange == true && ~isPuzzleComplete(puzzle)
-            didChange = false
-            for solvedSquare in [k for (k, v) in puzzle if length(v) == 1]
-                solvedValue = first(puzzle[solvedSquare])
-
-                for nsq in neighbors[solvedSquare]
-                    if solvedValue in puzzle[nsq] && length(puzzle[nsq]) > 1
-                        numEliminated+=1
-                        numOperations+=1
-                        didChange = true
-                        puzzle[nsq] = delete!(puzzle[nsq], solvedValue)
-                    end
-                end
-            end
+# Expand up to maxNodes puzzles (no limit if nothing). Returns the next solution, or nothing
+# if the slice ended first or the search is done
+function advance!(search::PuzzleSearch, maxNodes::Union{Int,Nothing}=nothing)
+    numNodes = 0
+    while !search.done && (maxNodes === nothing || numNodes < maxNodes)
+        puzzle = search.pending === nothing ? nextGuess!(search) : search.pending
+        search.pending = nothing
+        if puzzle === nothing
+            search.done = true
+            break
         end
-        bestSinglePass = max(bestSinglePass, numEliminated)
-        # Dont return a copy in this case, change in place
-        return puzzle
+        numNodes += 1
+        search.numNodes += 1
+        soln = expand!(search, puzzle)
+        soln === nothing || return soln
     end
+    return nothing
+end
+
+function saveSearch(filename::String, search::PuzzleSearch)
+    open(io -> serialize(io, search), filename, "w")
+end
+loadSearch(filename::String)::PuzzleSearch = open(deserialize, filename)
+
+# Count the solutions of the puzzle, stopping as soon as limit of them are found
+function countSolutions(puzzle::SudokuPuzzleT, limit::Int=2)::Int
+    search = PuzzleSearch(puzzle)
+    numSolutions = 0
+    while numSolutions < limit && advance!(search) !== nothing
+        numSolutions += 1
+    end
+    return numSolutions
+end
+
+# Lazily produce every solution of the puzzle. The search task only runs ahead of the
+# consumer by one solution, so iteration can stop at any time
+function iterSolutions(puzzle::SudokuPuzzleT)
+    search = PuzzleSearch(puzzle)
+    return Channel{Dict{String,String}}() do ch
+        while (soln = advance!(search)) !== nothing
+            put!(ch, Dict{String,String}(k => string(first(v)) for (k, v) in soln))
+        end
+    end
+end
 
-    numRecursions::Int  = 0
-	numOperations::Int  = 0
-    bestSinglePass = 0
+# Nodes expanded between checks of the solve budgets
+const nodesPerCheck = 16
+
+# Run the search to the next solution within the budgets. Returns the solution, or nothing,
+# and the status: "solved", "unsolvable", "timeout" (out of time or nodes) or "cancelled"
+function advanceWithin!(search::PuzzleSearch, timeLimit_ms, maxNodes, isCancelled)
+    deadline = timeLimit_ms === nothing ? nothing : time_ns() + round(Int, timeLimit_ms * 1e6)
+    while !search.done
+        isCancelled !== nothing && isCancelled() && return nothing, "cancelled"
+        deadline !== nothing && time_ns() >= deadline && return nothing, "timeout"
+        numNodes = maxNodes === nothing ? nodesPerCheck : min(nodesPerCheck, maxNodes - search.numNodes)
+        numNodes <= 0 && return nothing, "timeout"
+        soln = advance!(search, numNodes)
+        soln === nothing || return soln, "solved"
+    end
+    return nothing, "unsolvable"
+end
 
-	elapsedTime = @elapsed soln = solveTheThing(puzzle)
+# timeLimit_ms is wall clock time and maxNodes the most nodes to expand, nothing for no limit.
+# isCancelled is a function without arguments that returns true once the caller gives up
+function solve(puzzle::SudokuPuzzleT; timeLimit_ms=nothing, maxNodes=nothing, isCancelled=nothing)
+    search = PuzzleSearch(puzzle)
+	elapsedTime = @elapsed soln, status = advanceWithin!(search, timeLimit_ms, maxNodes, isCancelled)
 
-    soln = Dict{String,String}(k => string(first(soln[k])) for k in keys(soln))
+    if soln !== nothing
+        soln = Dict{String,String}(k => string(first(soln[k])) for k in keys(soln))
+    end
 	return Dict(
-        "solution" => soln,
-		"numRecursions"=>numRecursions,
-		"numOperations"=>numOperations,
-        "bestSinglePass"=>bestSinglePass,
+        "solution" => soln === nothing ? false : soln,
+        "status"=>status,
+        "numNodes"=>search.numNodes,
+		"numRecursions"=>search.numRecursions,
+		"numOperations"=>search.numOperations,
+        "bestSinglePass"=>search.bestSinglePass,
 		"duration_ms"=>elapsedTime*1000.0)
 end
 end
@@ -132,80 +132,196 @@ function solver.importPuzzle(startingValues)
     return startingPuzzle
 end
 
-function solver.solve(startingValues)
-
-    local result = {        ['solution'] = {},
-        ['duration_ms']    = 0.0,
-        ['bestSinglePass'] = 0,
-        ['numOperations']  = 0,
-        ['numRecursions']  = 0}
-    local function eliminationPass(thePuzzle)
-
-        local thisSinglePass = 0
-        local allNeighbors, neighborVals
-        local didChange = true
-        while (didChange==true) and (isPuzzleComplete(thePuzzle)==false)
+local function newResult()
+    return {['solution']       = {},
+            ['duration_ms']    = 0.0,
+            ['bestSinglePass'] = 0,
+            ['numOperations']  = 0,
+            ['numRecursions']  = 0,
+            ['numNodes']       = 0}
+end
+
+-- Returns the reduced puzzle, or -1 as soon as two neighbors hold the same value
+local function eliminationPass(thePuzzle, result)
+
+    local thisSinglePass = 0
+    local allNeighbors, neighborVals
+    local didChange = true
+    while (didChange==true) and (isPuzzleComplete(thePuzzle)==false)
+    do
+        didChange = false
+        for gridID,gridValues in pairs(thePuzzle)
         do
-            didChange = false
-            for gridID,gridValues in pairs(thePuzzle)
-            do
 
-                if #gridValues == 1
-                then
-                    allNeighbors = defs.getNeighbors(gridID)
-                    for neighborKey in pairs(allNeighbors)
-                    do
-                        neighborVals = thePuzzle[neighborKey]
-                        if #neighborVals > 1 and neighborVals:find(gridValues)
-                        then
-                            result.numOperations = result.numOperations+1
-                            thisSinglePass = thisSinglePass+1
-                            didChange = true
-                            thePuzzle[neighborKey] = neighborVals:gsub(gridValues,'')
-                        end
+            if #gridValues == 1
+            then
+                allNeighbors = defs.getNeighbors(gridID)
+                for neighborKey in pairs(allNeighbors)
+                do
+                    neighborVals = thePuzzle[neighborKey]
+                    if neighborVals == gridValues
+                    then
+                        -- Two neighbors fixed to the same value, nothing to solve here
+                        return -1
+                    end
+                    if #neighborVals > 1 and neighborVals:find(gridValues)
+                    then
+                        result.numOperations = result.numOperations+1
+                        thisSinglePass = thisSinglePass+1
+                        didChange = true
+                        thePuzzle[neighborKey] = neighborVals:gsub(gridValues,'')
                     end
                 end
             end
         end
-        result.bestSinglePass = math.max(thisSinglePass, result.bestSinglePass)
-        return thePuzzle
     end
-    local function solveTheThing(thePuzzle)
+    result.bestSinglePass = math.max(thisSinglePass, result.bestSinglePass)
+    return thePuzzle
+end
+
+-- Depth first search with an explicit stack instead of recursion. Every frame holds a reduced
+-- puzzle, the square being guessed there and the next guess to try, so the search can stop
+-- after any node and continue later with search.advance
+function solver.newSearch(startingValues)
 
-        thePuzzle = eliminationPass(thePuzzle)
+    local search = {['result']  = newResult(),
+                    ['stack']   = {},
+                    ['pending'] = solver.importPuzzle(startingValues),
+                    ['done']    = false}
+
+    -- Reduce one puzzle. Returns it if it is solved, otherwise pushes a frame for its guesses
+    local function expand(thePuzzle)
+
+        thePuzzle = eliminationPass(thePuzzle, search.result)
         if (isPuzzleComplete(thePuzzle)==true)
         then
-            return isPuzzleSolved(thePuzzle)==true and thePuzzle or -1
-        else
-            local nextPuzzleGuess
-            local entryPoint, nextGuesses = getNextEntryPoint(thePuzzle)
-            if entryPoint == nil then return -1 end
-            for _,nextGuess in ipairs(nextGuesses)
+            return isPuzzleSolved(thePuzzle)==true and thePuzzle or nil
+        end
+
+        local entryPoint, nextGuesses = getNextEntryPoint(thePuzzle)
+        if entryPoint ~= nil
+        then
+            table.insert(search.stack, {['puzzle']     = thePuzzle,
+                                        ['entryPoint'] = entryPoint,
+                                        ['guesses']    = nextGuesses,
+                                        ['nextGuess']  = 1})
+        end
+        return nil
+    end
+
+    -- Next guess that keeps every family valid, popping frames that ran out of guesses
+    local function nextGuess()
+
+        local stack = search.stack
+        while #stack > 0
+        do
+            local frame = stack[#stack]
+            while frame.nextGuess <= #frame.guesses
             do
-                nextPuzzleGuess = myFuns.copyTable(thePuzzle)
-                nextPuzzleGuess[entryPoint] = nextGuess
+                local nextPuzzleGuess = myFuns.copyTable(frame.puzzle)
+                nextPuzzleGuess[frame.entryPoint] = frame.guesses[frame.nextGuess]
+                frame.nextGuess = frame.nextGuess+1
                 if allFamiliesValid(nextPuzzleGuess) then
-                    result.numRecursions = result.numRecursions+1
-                    nextPuzzleGuess = solveTheThing(myFuns.copyTable(nextPuzzleGuess))
-                    if nextPuzzleGuess and (isPuzzleSolved(nextPuzzleGuess)==true)
-                    then
-                        return nextPuzzleGuess
-                    end
+                    search.result.numRecursions = search.result.numRecursions+1
+                    return nextPuzzleGuess
                 end
             end
-            return -1 -- if it gets here, didnt find the soln
+            table.remove(stack)
         end
+        return nil
     end
 
-    local myPuzzle = solver.importPuzzle(startingValues)
-    local startTime = os.clock()
-    local theSolution = solveTheThing( myPuzzle )
-    result.duration_ms = (os.clock()-startTime)*1000
-    result.solution    = theSolution
+    -- Expand up to maxNodes puzzles (no limit if nil). Returns the next solution, or nil if
+    -- the slice ended first or the search is done
+    function search.advance(maxNodes)
+
+        local numNodes = 0
+        while (search.done==false) and (maxNodes == nil or numNodes < maxNodes)
+        do
+            local thePuzzle = search.pending or nextGuess()
+            search.pending = nil
+            if thePuzzle == nil
+            then
+                search.done = true
+                break
+            end
+            numNodes = numNodes+1
+            search.result.numNodes = search.result.numNodes+1
+            local theSolution = expand(thePuzzle)
+            if theSolution then return theSolution end
+        end
+        return nil
+    end
+
+    return search
+end
+
+-- Nodes expanded between checks of the solve budgets
+local nodesPerCheck = 16
+
+-- Solve within optional budgets: timeLimit_ms of wall clock time, maxNodes expanded puzzles and
+-- an isCancelled function that returns true once the caller gives up. Any of them may be nil.
+-- Plain lua has no wall clock finer than os.time seconds, so the caller passes clock_ms, a
+-- function returning wall clock milliseconds. Without it os.clock cpu time is used instead.
+-- result.status is "solved", "unsolvable", "timeout" (out of time or nodes) or "cancelled"
+function solver.solve(startingValues, timeLimit_ms, maxNodes, isCancelled, clock_ms)
+
+    clock_ms = clock_ms or function() return os.clock()*1000 end
+    local search = solver.newSearch(startingValues)
+    local result = search.result
+    local startTime = clock_ms()
+    local theSolution = nil
+    local status = "unsolvable"
+    while search.done==false
+    do
+        local numNodes = nodesPerCheck
+        if maxNodes ~= nil then numNodes = math.min(numNodes, maxNodes-result.numNodes) end
+        if isCancelled ~= nil and isCancelled()
+        then
+            status = "cancelled"
+            break
+        elseif numNodes <= 0 or
+               (timeLimit_ms ~= nil and clock_ms()-startTime >= timeLimit_ms)
+        then
+            status = "timeout"
+            break
+        end
+        theSolution = search.advance(numNodes)
+        if theSolution
+        then
+            status = "solved"
+            break
+        end
+    end
+    result.duration_ms = clock_ms()-startTime
+    result.solution    = theSolution or -1
+    result.status      = status
 
     return result
 end
 
+-- Iterator over every solution of the puzzle. The search only advances when the next
+-- solution is asked for, so callers can stop at any time.
+-- Returns the iterator and the result table holding the metrics of the search so far.
+function solver.iterSolutions(startingValues)
+
+    local search = solver.newSearch(startingValues)
+    return function() return search.advance() end, search.result
+end
+
+-- Count the solutions of the puzzle, stopping as soon as limit of them are found (default 2)
+function solver.countSolutions(startingValues, limit)
+
+    limit = limit or 2
+    local numSolutions = 0
+    for _ in solver.iterSolutions(startingValues)
+    do
+        numSolutions = numSolutions+1
+        if numSolutions >= limit then break end
+    end
+    return numSolutions
+end
+
 function solver.puzzleString2puzzle(puzzleStr)
 
     local pzlVals   = myFuns.string2Table(puzzleStr)
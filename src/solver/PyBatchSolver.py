@@ -0,0 +1,171 @@
+# -*- coding: utf-8 -*-
+# Sudoku Solver
+# Batch variant of PyBitSolver. N puzzles are held as an (N, 81) uint16 array of candidate masks
+# and naked plus hidden singles are propagated for all of them at once with numpy. Only the
+# puzzles still open afterwards go through PyBitSolver.solveMasks, one at a time.
+# numpy is an optional dependency, install it with the "batch" extra.
+
+from collections.abc import Iterable
+from time import process_time as ttoc
+
+import numpy as np
+
+from .PyBitSolver import (
+    allValuesMask,
+    familyIndices,
+    maskCount,
+    maskValues,
+    peerIndices,
+    solveMasks,
+)
+
+# Same index tables as PyBitSolver, as arrays so they can be used for fancy indexing
+peerTable: np.ndarray = np.array(peerIndices, dtype=np.intp)  # (81, 20)
+familyTable: np.ndarray = np.array(familyIndices, dtype=np.intp)  # (27, 9)
+squareFamilyTable: np.ndarray = np.array(
+    [[famIdx for famIdx, fam in enumerate(familyIndices) if sqIdx in fam] for sqIdx in range(81)],
+    dtype=np.intp,
+)  # (81, 3)
+maskCountTable: np.ndarray = np.array(maskCount, dtype=np.uint8)
+maskDigitTable: np.ndarray = np.array(
+    [vals[0] if len(vals) == 1 else 0 for vals in maskValues], dtype=np.uint8
+)
+valueBits: np.ndarray = np.left_shift(1, np.arange(9)).astype(np.uint16)
+
+
+def puzzleStringsToMasks(puzzleStrings: Iterable[str]) -> np.ndarray:
+    """Convert 81 character puzzle strings into candidate masks.
+    Args:
+            puzzleStrings (Iterable[str]): Puzzles with digits for givens and '.' or '0' for blanks.
+    Returns:
+            np.ndarray: (N, 81) uint16 masks ordered the same as PySolver.squares.
+    """
+    text = "".join(puzzleStrings).replace(".", "0").encode("ascii")
+    if len(text) % 81:
+        raise ValueError("Every puzzle string must have 81 characters.")
+    digits = np.frombuffer(text, dtype=np.uint8).reshape(-1, 81).astype(np.int16) - ord("0")
+    givenMasks = valueBits[np.clip(digits - 1, 0, 8)]
+    return np.where((digits >= 1) & (digits <= 9), givenMasks, np.uint16(allValuesMask))
+
+
+def solutionStrings(solution: np.ndarray) -> list[str]:
+    """Convert a solution array from solveBatch into 81 character strings, '.' where unsolved."""
+    text = np.where(solution > 0, solution + ord("0"), ord(".")).astype(np.uint8)
+    return [row.tobytes().decode("ascii") for row in text]
+
+
+def _propagationRound(masks: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+    """One round of naked and hidden singles over a block of puzzles.
+    Args:
+            masks (np.ndarray): (k, 81) candidate masks.
+    Returns:
+            tuple: The reduced (k, 81) masks and a (k,) bool array, True where a puzzle has no
+                solution left.
+    """
+    # Naked singles: remove every fixed value from its peers
+    isFixed = maskCountTable[masks] == 1
+    fixedMasks = np.where(isFixed, masks, np.uint16(0))
+    peerFixed = np.bitwise_or.reduce(fixedMasks[:, peerTable], axis=2)
+    isDead = (isFixed & ((masks & peerFixed) != 0)).any(axis=1)
+    masks = np.where(isFixed, masks, masks & ~peerFixed)
+
+    # Hidden singles: a value with a single place in a family goes there
+    hasValue = (masks[:, :, None] & valueBits) != 0
+    familyCounts = hasValue[:, familyTable, :].sum(axis=2)
+    isDead |= (familyCounts == 0).any(axis=(1, 2))
+    uniqueMasks = ((familyCounts == 1) * valueBits).sum(axis=2).astype(np.uint16)
+    hiddenMasks = np.bitwise_or.reduce(uniqueMasks[:, squareFamilyTable], axis=2) & masks
+    hiddenMasks = np.where(maskCountTable[masks] > 1, hiddenMasks, np.uint16(0))
+    # A square can not be the only place for two different values
+    isDead |= (maskCountTable[hiddenMasks] > 1).any(axis=1)
+    masks = np.where(hiddenMasks != 0, hiddenMasks, masks)
+
+    isDead |= (masks == 0).any(axis=1)
+    return masks, isDead
+
+
+def propagateSingles(masks: np.ndarray) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """Propagate naked and hidden singles for every puzzle until none of them changes.
+    Puzzles drop out of the loop as soon as they stop changing or run into a contradiction.
+    Args:
+            masks (np.ndarray): (N, 81) candidate masks. Not modified.
+    Returns:
+            tuple: The reduced (N, 81) masks, an (N,) bool array that is True for puzzles without
+                solution and the (N,) number of propagation rounds each puzzle took.
+    """
+    masks = masks.copy()
+    isDead = np.zeros(len(masks), dtype=bool)
+    numRounds = np.zeros(len(masks), dtype=np.int32)
+    rows = np.arange(len(masks))
+    while rows.size:
+        before = masks[rows]
+        after, rowIsDead = _propagationRound(before)
+        masks[rows] = after
+        isDead[rows] = rowIsDead
+        numRounds[rows] += 1
+        rows = rows[~rowIsDead & (after != before).any(axis=1)]
+    return masks, isDead, numRounds
+
+
+def solveBatch(puzzles: np.ndarray | Iterable[str], chunkSize: int = 4096) -> dict:
+    """
+    Solve many puzzles at once. Singles are propagated vectorized across the whole chunk and
+    only the puzzles that are still open are searched with PyBitSolver.solveMasks.
+
+    Args:
+        puzzles (np.ndarray | Iterable[str]): (N, 81) candidate masks or 81 character strings.
+        chunkSize (int): Number of puzzles propagated together, bounds the temporary arrays.
+
+    Returns:
+        dict: Arrays over the N puzzles instead of N result dictionaries.
+            solution: (N, 81) uint8 digits, 0 everywhere for puzzles without solution.
+            isSolved: (N,) bool.
+            numPropagationRounds: (N,) int32 vectorized rounds before searching.
+            numRecursions: (N,) int32 guesses made by the search, 0 if propagation solved it.
+            numOperations: (N,) int32 candidates eliminated by propagation and search together.
+            searchDuration_ms: (N,) float64 time spent searching that puzzle.
+            duration_ms: float, time for the whole batch.
+    """
+    tStart = ttoc()
+    if not isinstance(puzzles, np.ndarray):
+        puzzles = puzzleStringsToMasks(puzzles)
+    puzzles = puzzles.astype(np.uint16, copy=False)
+    numPuzzles = len(puzzles)
+
+    masks = np.empty_like(puzzles)
+    isDead = np.zeros(numPuzzles, dtype=bool)
+    numPropagationRounds = np.zeros(numPuzzles, dtype=np.int32)
+    for first in range(0, numPuzzles, chunkSize):
+        chunk = slice(first, first + chunkSize)
+        chunkResult = propagateSingles(puzzles[chunk])
+        masks[chunk], isDead[chunk], numPropagationRounds[chunk] = chunkResult
+    numOperations = (
+        maskCountTable[puzzles].sum(axis=1, dtype=np.int32)
+        - maskCountTable[masks].sum(axis=1, dtype=np.int32)
+    )
+
+    # Whatever propagation could not finish goes through the per-puzzle search
+    numRecursions = np.zeros(numPuzzles, dtype=np.int32)
+    searchDuration_ms = np.zeros(numPuzzles, dtype=np.float64)
+    isOpen = ~isDead & (maskCountTable[masks] > 1).any(axis=1)
+    for idx in np.flatnonzero(isOpen):
+        result = solveMasks(masks[idx].tolist())
+        numRecursions[idx] = result["numRecursions"]
+        numOperations[idx] += result["numOperations"]
+        searchDuration_ms[idx] = result["duration_ms"]
+        if result["solution"]:
+            masks[idx] = result["solution"]
+        else:
+            isDead[idx] = True
+
+    isSolved = ~isDead
+    solution = np.where(isSolved[:, None], maskDigitTable[masks], np.uint8(0))
+    return {
+        "solution": solution,
+        "isSolved": isSolved,
+        "numPropagationRounds": numPropagationRounds,
+        "numRecursions": numRecursions,
+        "numOperations": numOperations,
+        "searchDuration_ms": searchDuration_ms,
+        "duration_ms": (ttoc() - tStart) * 1000.0,
+    }
@@ -0,0 +1,241 @@
+# -*- coding: utf-8 -*-
+# Sudoku Solver
+# Bitmask variant of PySolver. Every square is stored as a nine bit integer where bit (v - 1) is
+# set while v is still a possible value. Peers and families are precomputed as integer index
+# tables from the definitions in PySolver, so the search never touches square name strings.
+
+from time import process_time as ttoc
+
+from .PySolver import (
+    BudgetExceeded,
+    SolveBudget,
+    SudokuPuzzleT,
+    families,
+    neighbors,
+    squares,
+)
+
+type SquareMaskT = int
+type PuzzleMasksT = list[SquareMaskT]
+type IndexTableT = tuple[tuple[int, ...], ...]
+
+allValuesMask: SquareMaskT = 0x1FF
+squareIndex: dict[str, int] = {sq: idx for idx, sq in enumerate(squares)}
+peerIndices: IndexTableT = tuple(tuple(squareIndex[n] for n in neighbors[sq]) for sq in squares)
+familyIndices: IndexTableT = tuple(tuple(squareIndex[sq] for sq in fam) for fam in families)
+squareFamilyIndices: tuple[IndexTableT, ...] = tuple(
+    tuple(fam for fam in familyIndices if idx in fam) for idx in range(81)
+)
+
+# Lookup tables indexed by mask so counting and unpacking never loops over bits
+maskCount: tuple[int, ...] = tuple(bin(mask).count("1") for mask in range(512))
+maskValues: tuple[tuple[int, ...], ...] = tuple(
+    tuple(val for val in range(1, 10) if mask & (1 << (val - 1))) for mask in range(512)
+)
+
+
+def valueMask(val: int) -> SquareMaskT:
+    """Return the single bit mask for a square value 1-9."""
+    return 1 << (val - 1)
+
+
+def puzzleToMasks(pzl: SudokuPuzzleT) -> PuzzleMasksT:
+    """Convert a PySolver style puzzle dictionary into a list of 81 masks.
+    Args:
+            pzl (SudokuPuzzleT): Dictionary of square ID to list of possible values.
+    Returns:
+            PuzzleMasksT: Masks ordered the same as PySolver.squares.
+    """
+    masks = [allValuesMask] * 81
+    for sq, sqValues in pzl.items():
+        mask = 0
+        for val in sqValues:
+            mask |= valueMask(int(val))
+        masks[squareIndex[sq]] = mask
+    return masks
+
+
+def masksToSolution(masks: PuzzleMasksT) -> dict[str, str]:
+    """Convert solved masks into the square ID to value string dictionary used for display."""
+    return {sq: str(maskValues[masks[idx]][0]) for idx, sq in enumerate(squares)}
+
+
+def allFamiliesValid(masks: PuzzleMasksT) -> bool:
+    """Check every family can still place all nine values."""
+    for fam in familyIndices:
+        famMask = 0
+        for idx in fam:
+            famMask |= masks[idx]
+        if famMask != allValuesMask:
+            return False
+    return True
+
+
+def squareFamiliesValid(masks: PuzzleMasksT, idx: int) -> bool:
+    """Check the families of one square can still place all nine values. After a guess only
+    the families of the guessed square can have lost a value.
+    """
+    for fam in squareFamilyIndices[idx]:
+        famMask = 0
+        for famIdx in fam:
+            famMask |= masks[famIdx]
+        if famMask != allValuesMask:
+            return False
+    return True
+
+
+def _getNextEntryPoint(masks: PuzzleMasksT):
+    """Get the next entry point for solving the puzzle.
+    Same policy as PySolver._getNextEntryPoint: pick the value that occurs most often among the
+    unsolved squares, then the square holding that value with the fewest remaining possible values.
+    Args:
+            masks (PuzzleMasksT): The puzzle as a list of masks.
+    Returns:
+            tuple: (square index, ordered guesses) or (False, False) if no square is open.
+    """
+    valueCount = [0] * 10
+    for mask in masks:
+        if maskCount[mask] > 1:
+            for val in maskValues[mask]:
+                valueCount[val] += 1
+    if not any(valueCount):
+        return (False, False)
+
+    mostFrequentUnsolved = valueCount.index(max(valueCount[1:]), 1)
+    mostFrequentMask = valueMask(mostFrequentUnsolved)
+
+    nextSquareChoice = False
+    bestValueCount = 10
+    for idx, mask in enumerate(masks):
+        count = maskCount[mask]
+        if 1 < count < bestValueCount and mask & mostFrequentMask:
+            nextSquareChoice = idx
+            bestValueCount = count
+            if count == 2:
+                break
+
+    nextSquareChoiceValues = sorted(
+        maskValues[masks[nextSquareChoice]], key=valueCount.__getitem__, reverse=True
+    )
+    return nextSquareChoice, nextSquareChoiceValues
+
+
+def solveMasks(masks: PuzzleMasksT, budget: SolveBudget | None = None) -> dict:
+    """
+    Solve a puzzle given as 81 masks using constraint propagation and backtracking.
+
+    Args:
+        masks (PuzzleMasksT): Candidate masks ordered as PySolver.squares. Modified in place.
+        budget (SolveBudget): Limits checked before every node. None for no limits.
+
+    Returns:
+        dict: Same metrics and status as PySolver.solve, with the solution as a list of masks or
+            False.
+    """
+
+    numNodes: int = 0
+    numRecursions: int = 0
+    numOperations: int = 0
+    bestSinglePass: int = 0
+
+    def _solveTheThing(pzl: PuzzleMasksT, fixedQueue: list[int]) -> PuzzleMasksT | bool:
+        """Recursively solve the masks, fixedQueue holds squares whose value was just fixed."""
+        nonlocal numNodes, numRecursions
+        if budget is not None:
+            budget.check(numNodes)
+        numNodes += 1
+
+        if not _eliminationPass(pzl, fixedQueue) or not allFamiliesValid(pzl):
+            return False
+
+        nextEntry, nextValues = _getNextEntryPoint(pzl)
+        if nextEntry is False:
+            # Every square is down to one value and every family is complete
+            return pzl
+
+        for nextValue in nextValues:
+            nextPuzzleGuess = pzl[:]
+            nextPuzzleGuess[nextEntry] = valueMask(nextValue)
+            if not squareFamiliesValid(nextPuzzleGuess, nextEntry):
+                continue
+            # Only guesses that leave the puzzle valid count, the same as PySolver
+            numRecursions += 1
+            nextPuzzleGuess = _solveTheThing(nextPuzzleGuess, [nextEntry])
+            if nextPuzzleGuess:
+                return nextPuzzleGuess
+        return False
+
+    def _eliminationPass(pzl: PuzzleMasksT, fixedQueue: list[int]) -> bool:
+        """Remove each fixed value from its peers until no new square gets fixed.
+        Returns False as soon as any square runs out of possible values.
+        """
+        nonlocal bestSinglePass
+        nonlocal numOperations
+        singlePassCount = 0
+        isValid = True
+        while fixedQueue:
+            solvedSquare = fixedQueue.pop()
+            solvedMask = pzl[solvedSquare]
+            for peer in peerIndices[solvedSquare]:
+                peerMask = pzl[peer]
+                if peerMask & solvedMask:
+                    peerMask &= ~solvedMask
+                    if not peerMask:
+                        isValid = False
+                        break
+                    pzl[peer] = peerMask
+                    singlePassCount += 1
+                    if maskCount[peerMask] == 1:
+                        fixedQueue.append(peer)
+            if not isValid:
+                break
+
+        numOperations += singlePassCount
+        bestSinglePass = max(bestSinglePass, singlePassCount)
+        return isValid
+
+    tStart = ttoc()
+    status = None
+    try:
+        solution = _solveTheThing(
+            masks, [idx for idx, mask in enumerate(masks) if maskCount[mask] == 1]
+        )
+    except BudgetExceeded as stop:
+        solution, status = False, stop.status
+    duration_ms = (ttoc() - tStart) * 1000.0
+    return {
+        "solution": solution,
+        "status": status or ("solved" if solution else "unsolvable"),
+        "numNodes": numNodes,
+        "bestSinglePass": bestSinglePass,
+        "numOperations": numOperations,
+        "numRecursions": numRecursions,
+        "duration_ms": duration_ms,
+    }
+
+
+def solve(
+    puzzle: SudokuPuzzleT,
+    timeLimit_ms: float | None = None,
+    maxNodes: int | None = None,
+    cancelToken=None,
+) -> dict:
+    """
+    Solve the given sudoku puzzle with the bitmask engine.
+
+    Args:
+        puzzle (dict): A dictionary representing the sudoku puzzle, where keys are square IDs and values are possible values.
+        timeLimit_ms (float): Wall clock milliseconds the solve may take. None for no limit.
+        maxNodes (int): Most search nodes to expand. None for no limit.
+        cancelToken: Object with an is_set() method, e.g. a threading.Event, that stops the solve.
+
+    Returns:
+        dict: Result dictionary matching PySolver.solve. The solution is False if no solution exists.
+    """
+    budget = None
+    if timeLimit_ms is not None or maxNodes is not None or cancelToken is not None:
+        budget = SolveBudget(timeLimit_ms, maxNodes, cancelToken)
+    result = solveMasks(puzzleToMasks(puzzle), budget)
+    if result["solution"]:
+        result["solution"] = masksToSolution(result["solution"])
+    return result
@@ -0,0 +1,238 @@
+# -*- coding: utf-8 -*-
+# Sudoku Solver
+# Exact cover variant of PySolver using Knuth's Algorithm X with dancing links.
+#
+# Every (square, value) pair is a row that covers four of 324 columns:
+#   0-80    the square holds a value
+#   81-161  the row holds the value
+#   162-242 the column holds the value
+#   243-323 the cell holds the value
+# The links are kept in flat integer lists. Headers are nodes 0-323, the root is node 324.
+
+from time import process_time as ttoc
+
+from .PySolver import BudgetExceeded, SolveBudget, SudokuPuzzleT, squares
+
+numColumns: int = 324
+rootNode: int = numColumns
+
+
+def _rowColumns(sqIdx: int, valIdx: int) -> tuple[int, int, int, int]:
+    """Return the four constraint columns covered by putting value valIdx + 1 in square sqIdx."""
+    row, col = divmod(sqIdx, 9)
+    cell = (row // 3) * 3 + col // 3
+    return (
+        sqIdx,
+        81 + row * 9 + valIdx,
+        162 + col * 9 + valIdx,
+        243 + cell * 9 + valIdx,
+    )
+
+
+def _buildLinks() -> tuple[list[int], ...]:
+    """Build the full 729 row by 324 column link structure.
+    Returns:
+            tuple: left, right, up, down, column and row id lists plus the column sizes.
+    """
+    left = list(range(-1, numColumns))
+    right = list(range(1, numColumns + 2))
+    left[0] = rootNode
+    right[rootNode] = 0
+    up = list(range(numColumns + 1))
+    down = list(range(numColumns + 1))
+    column = list(range(numColumns + 1))
+    rowID = [-1] * (numColumns + 1)
+    size = [0] * numColumns
+
+    for sqIdx in range(81):
+        for valIdx in range(9):
+            first = len(left)
+            for offset, col in enumerate(_rowColumns(sqIdx, valIdx)):
+                node = first + offset
+                # Link horizontally in a circle of four
+                left.append(first + (offset - 1) % 4)
+                right.append(first + (offset + 1) % 4)
+                # Link at the bottom of the column
+                up.append(up[col])
+                down.append(col)
+                down[up[col]] = node
+                up[col] = node
+                column.append(col)
+                rowID.append(sqIdx * 9 + valIdx)
+                size[col] += 1
+    return left, right, up, down, column, rowID, size
+
+
+# Built once, every solve works on its own copy
+_linksTemplate = _buildLinks()
+# First node of every row so givens can be selected directly
+_rowFirstNode: list[int] = [numColumns + 1 + rowIdx * 4 for rowIdx in range(729)]
+
+
+def solve(
+    puzzle: SudokuPuzzleT,
+    timeLimit_ms: float | None = None,
+    maxNodes: int | None = None,
+    cancelToken=None,
+) -> dict:
+    """
+    Solve the given sudoku puzzle as an exact cover problem with dancing links.
+
+    Args:
+        puzzle (dict): A dictionary representing the sudoku puzzle, where keys are square IDs and values are possible values.
+        timeLimit_ms (float): Wall clock milliseconds the solve may take. None for no limit.
+        maxNodes (int): Most search nodes to expand. None for no limit.
+        cancelToken: Object with an is_set() method, e.g. a threading.Event, that stops the solve.
+
+    Returns:
+        dict: Result dictionary matching PySolver.solve. numRecursions counts the rows tried in
+            columns with more than one row left, the guesses, so it means the same as for
+            PySolver. numNodes counts the search calls, numOperations the node unlinks and
+            bestSinglePass the unlinks made while placing the given squares. The solution is
+            False if no solution exists.
+    """
+    left, right, up, down, column, rowID, size = (links[:] for links in _linksTemplate)
+    budget = None
+    if timeLimit_ms is not None or maxNodes is not None or cancelToken is not None:
+        budget = SolveBudget(timeLimit_ms, maxNodes, cancelToken)
+
+    numNodes: int = 0
+    numRecursions: int = 0
+    numOperations: int = 0
+    bestSinglePass: int = 0
+
+    def _cover(col: int) -> None:
+        nonlocal numOperations
+        right[left[col]] = right[col]
+        left[right[col]] = left[col]
+        rowNode = down[col]
+        while rowNode != col:
+            node = right[rowNode]
+            while node != rowNode:
+                down[up[node]] = down[node]
+                up[down[node]] = up[node]
+                size[column[node]] -= 1
+                numOperations += 1
+                node = right[node]
+            rowNode = down[rowNode]
+
+    def _uncover(col: int) -> None:
+        rowNode = up[col]
+        while rowNode != col:
+            node = left[rowNode]
+            while node != rowNode:
+                size[column[node]] += 1
+                down[up[node]] = node
+                up[down[node]] = node
+                node = left[node]
+            rowNode = up[rowNode]
+        right[left[col]] = col
+        left[right[col]] = col
+
+    def _removeRow(rowNode: int) -> None:
+        """Unlink a single row from its columns, used for values ruled out by the input."""
+        node = rowNode
+        while True:
+            down[up[node]] = down[node]
+            up[down[node]] = up[node]
+            size[column[node]] -= 1
+            node = right[node]
+            if node == rowNode:
+                break
+
+    def _solveTheThing(solutionRows: list[int]) -> bool:
+        """Recursively pick the column with the fewest rows and try each of its rows.
+        Args:
+                solutionRows (list[int]): Row ids chosen so far, extended in place.
+        Returns:
+                bool: True once every column is covered.
+        """
+        nonlocal numNodes, numRecursions
+        if budget is not None:
+            budget.check(numNodes)
+        numNodes += 1
+        if right[rootNode] == rootNode:
+            return True
+
+        # Column with the fewest remaining rows
+        col = right[rootNode]
+        bestCol = col
+        bestSize = size[col]
+        while col != rootNode and bestSize > 1:
+            if size[col] < bestSize:
+                bestCol = col
+                bestSize = size[col]
+            col = right[col]
+        if bestSize == 0:
+            return False
+
+        _cover(bestCol)
+        rowNode = down[bestCol]
+        while rowNode != bestCol:
+            # A column with one row left is forced, not a guess
+            if bestSize > 1:
+                numRecursions += 1
+            solutionRows.append(rowID[rowNode])
+            node = right[rowNode]
+            while node != rowNode:
+                _cover(column[node])
+                node = right[node]
+
+            if _solveTheThing(solutionRows):
+                return True
+
+            solutionRows.pop()
+            node = left[rowNode]
+            while node != rowNode:
+                _uncover(column[node])
+                node = left[node]
+            rowNode = down[rowNode]
+        _uncover(bestCol)
+        return False
+
+    tStart = ttoc()
+    sqValues = [[int(val) for val in puzzle.get(sq, range(1, 10))] for sq in squares]
+    solutionRows = []
+    isValid = True
+    coveredColumns = [False] * numColumns
+    for sqIdx in range(81):
+        if len(sqValues[sqIdx]) == 1:
+            valIdx = sqValues[sqIdx][0] - 1
+            rowColumns = _rowColumns(sqIdx, valIdx)
+            if any(coveredColumns[col] for col in rowColumns):
+                # Two given squares need the same constraint
+                isValid = False
+                break
+            for col in rowColumns:
+                coveredColumns[col] = True
+                _cover(col)
+            solutionRows.append(sqIdx * 9 + valIdx)
+
+    # Values ruled out by the input, unless covering a given already unlinked the row
+    for sqIdx in range(81):
+        if isValid and len(sqValues[sqIdx]) > 1:
+            for valIdx in range(9):
+                if valIdx + 1 not in sqValues[sqIdx] and not any(
+                    coveredColumns[col] for col in _rowColumns(sqIdx, valIdx)
+                ):
+                    _removeRow(_rowFirstNode[sqIdx * 9 + valIdx])
+    bestSinglePass = numOperations
+
+    status = None
+    try:
+        solution = isValid and _solveTheThing(solutionRows)
+    except BudgetExceeded as stop:
+        solution, status = False, stop.status
+    if solution:
+        solvedValues = {rowIdx // 9: str(rowIdx % 9 + 1) for rowIdx in solutionRows}
+        solution = {sq: solvedValues[sqIdx] for sqIdx, sq in enumerate(squares)}
+    duration_ms = (ttoc() - tStart) * 1000.0
+    return {
+        "solution": solution,
+        "status": status or ("solved" if solution else "unsolvable"),
+        "numNodes": numNodes,
+        "bestSinglePass": bestSinglePass,
+        "numOperations": numOperations,
+        "numRecursions": numRecursions,
+        "duration_ms": duration_ms,
+    }
@@ -0,0 +1,281 @@
+# -*- coding: utf-8 -*-
+# Sudoku Solver
+# Parallel variant of PySolver for single hard puzzles. The search tree is expanded down to a
+# frontier of open nodes at the branch points _getNextEntryPoint picks, and the subtrees under
+# the frontier are searched by a pool of worker processes. Every subtree is its own task on the
+# shared task queue of the pool, so an idle worker picks up the next subtree as soon as it is
+# done with its own. The first solution found cancels every other subtree of the same solve,
+# several solves can share a pool. Time limits, node limits and cancel tokens of the caller are
+# checked by the main process before every node of the frontier expansion and while it waits for
+# the subtrees, which then stop at their next check of the cancel flag.
+
+import multiprocessing
+import os
+import threading
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from time import perf_counter
+
+from .PySolver import BudgetExceeded, PuzzleSearch, SolveBudget, SudokuPuzzleT, defaultRules
+
+# Most solves that can run on one pool at the same time, each holds one cancel flag
+maxConcurrentSolves: int = 64
+
+# Seconds between checks of the budgets while waiting for subtrees
+budgetPollInterval: float = 0.01
+
+# Cancel flags shared with the workers of the pool, set once a solve found its solution so its
+# running subtrees stop early. Every solve leases its own flag
+_cancelFlags = None
+
+
+class _PoolLease(object):
+    """A worker pool with one cancel flag per solve running on it."""
+
+    def __init__(self, workers: int):
+        self.cancelFlags = multiprocessing.Array("b", maxConcurrentSolves, lock=False)
+        self.executor = ProcessPoolExecutor(
+            max_workers=workers, initializer=_initWorker, initargs=(self.cancelFlags,)
+        )
+        self._freeSlots = list(range(maxConcurrentSolves))
+        self._slotsLeft = threading.BoundedSemaphore(maxConcurrentSolves)
+        self._lock = threading.Lock()
+
+    def acquire(self) -> int:
+        """Lease a cleared cancel flag, waiting while every flag is in use."""
+        self._slotsLeft.acquire()
+        with self._lock:
+            slot = self._freeSlots.pop()
+        self.cancelFlags[slot] = 0
+        return slot
+
+    def release(self, slot: int) -> None:
+        with self._lock:
+            self._freeSlots.append(slot)
+        self._slotsLeft.release()
+
+
+# Worker count to its pool, kept alive across solves
+_pools: dict[int, _PoolLease] = {}
+_poolsLock = threading.Lock()
+
+
+def _initWorker(cancelFlags) -> None:
+    global _cancelFlags
+    _cancelFlags = cancelFlags
+
+
+class _CancelFlag(object):
+    """Cancel token of a worker, set through the cancel flag its solve leased."""
+
+    def __init__(self, slot: int):
+        self.slot = slot
+
+    def is_set(self) -> bool:
+        return bool(_cancelFlags[self.slot])
+
+
+def _searchSubtree(
+    subPuzzle: SudokuPuzzleT,
+    rules: tuple[str],
+    policy: str,
+    nodesPerCheck: int,
+    slot: int,
+    timeLimit_ms: float | None = None,
+    maxNodes: int | None = None,
+    cancelToken=None,
+) -> dict:
+    """Search one frontier node, checking the budgets and the cancel flag every nodesPerCheck
+    nodes. In a worker process the cancel flag is the cancel token.
+    """
+    if cancelToken is None and _cancelFlags is not None:
+        cancelToken = _CancelFlag(slot)
+    search = PuzzleSearch(subPuzzle, rules, policy)
+    solution, status = search.runWithin(timeLimit_ms, maxNodes, cancelToken, nodesPerCheck)
+    return dict(search.result(solution or False, 0.0, status), pid=os.getpid())
+
+
+def _addSubResult(result: dict, subResult: dict) -> None:
+    """Add the metrics of a subtree to the result of the whole solve."""
+    workerNodes = result["workerNodes"]
+    workerNodes[subResult["pid"]] = workerNodes.get(subResult["pid"], 0) + subResult["numNodes"]
+    result["numNodes"] += subResult["numNodes"]
+    result["numRecursions"] += subResult["numRecursions"]
+    result["numOperations"] += subResult["numOperations"]
+    result["bestSinglePass"] = max(result["bestSinglePass"], subResult["bestSinglePass"])
+    for name, hits in subResult["ruleHits"].items():
+        result["ruleHits"][name] += hits
+    for name, duration_ms in subResult["ruleDuration_ms"].items():
+        result["ruleDuration_ms"][name] += duration_ms
+
+
+def _getPool(workers: int) -> _PoolLease:
+    with _poolsLock:
+        if workers not in _pools:
+            _pools[workers] = _PoolLease(workers)
+        return _pools[workers]
+
+
+def shutdown() -> None:
+    """Stop the worker pools kept between solves."""
+    with _poolsLock:
+        while _pools:
+            _, pool = _pools.popitem()
+            pool.executor.shutdown(cancel_futures=True)
+
+
+def solve(
+    puzzle: SudokuPuzzleT,
+    rules=defaultRules,
+    policy: str = "mostFrequent",
+    frontierDepth: int = 3,
+    workers: int | None = None,
+    nodesPerCheck: int = 50,
+    timeLimit_ms: float | None = None,
+    maxNodes: int | None = None,
+    cancelToken=None,
+) -> dict:
+    """
+    Solve the given sudoku puzzle by searching the subtrees below a frontier in parallel.
+
+    Args:
+        puzzle (dict): A dictionary representing the sudoku puzzle, where keys are square IDs and values are possible values.
+        rules (iterable): Names from propagationRules to apply before guessing.
+        policy (str): Branching policy from branchPolicies.
+        frontierDepth (int): Number of guess levels expanded before handing out subtrees. Deeper
+            frontiers give more and smaller subtrees, which balances the workers better.
+        workers (int): Number of worker processes. Defaults to the number of CPUs.
+        nodesPerCheck (int): Nodes a worker expands between checks of the cancel event.
+        timeLimit_ms (float): Wall clock milliseconds the solve may take. None for no limit.
+        maxNodes (int): Most search nodes to expand. None for no limit. Subtrees running at the
+            same time can each go up to the nodes left when they started, so the total may
+            overshoot a little.
+        cancelToken: Object with an is_set() method, e.g. a threading.Event, that stops the solve.
+
+    Returns:
+        dict: Result dictionary matching PySolver.solve. The metrics add up the frontier
+            expansion and every subtree that was searched, numRecursions included, so they count
+            the subtrees other workers searched next to the one holding the solution too.
+            frontierNodes and frontierRecursions hold the share of the frontier expansion and
+            workerNodes the nodes every worker pid searched. numSubtrees, frontierDepth and
+            workers are added. duration_ms is wall time.
+    """
+    tStart = perf_counter()
+    budget = SolveBudget(timeLimit_ms, maxNodes, cancelToken)
+    deadline = budget.deadline
+    rules = tuple(rules)
+    workers = workers or os.cpu_count() or 1
+    search = PuzzleSearch(puzzle, rules, policy)
+    stopStatus = None
+    try:
+        solution, subPuzzles = search.splitFrontier(frontierDepth, budget)
+    except BudgetExceeded as err:
+        # Out of budget before the frontier was reached, no subtree gets searched
+        solution, subPuzzles, stopStatus = None, [], err.status
+    result = search.result(solution or False, 0.0)
+    result.update(
+        frontierNodes=result["numNodes"], frontierRecursions=result["numRecursions"], workerNodes={}
+    )
+
+    def _budgetStatus() -> str | None:
+        if cancelToken is not None and cancelToken.is_set():
+            return "cancelled"
+        if maxNodes is not None and result["numNodes"] >= maxNodes:
+            return "timeout"
+        if deadline is not None and perf_counter() >= deadline:
+            return "timeout"
+        return None
+
+    def _nodesLeft() -> int | None:
+        return None if maxNodes is None else max(maxNodes - result["numNodes"], 0)
+
+    subtreeTimedOut = False
+    if not solution and subPuzzles:
+        if workers == 1:
+            for subPuzzle in subPuzzles:
+                stopStatus = _budgetStatus()
+                if stopStatus:
+                    break
+                subResult = _searchSubtree(
+                    subPuzzle,
+                    rules,
+                    policy,
+                    nodesPerCheck,
+                    0,
+                    None if deadline is None else (deadline - perf_counter()) * 1000.0,
+                    _nodesLeft(),
+                    cancelToken,
+                )
+                _addSubResult(result, subResult)
+                if subResult["solution"]:
+                    result["solution"] = subResult["solution"]
+                    break
+                subtreeTimedOut |= subResult["status"] == "timeout"
+        else:
+            pool = _getPool(workers)
+            slot = pool.acquire()
+            hasBudget = deadline is not None or maxNodes is not None or cancelToken is not None
+            pending = set()
+            try:
+                # Each subtree may use the nodes left when the solve starts, the main process
+                # stops them all once their sum reaches maxNodes
+                pending = {
+                    pool.executor.submit(
+                        _searchSubtree,
+                        subPuzzle,
+                        rules,
+                        policy,
+                        nodesPerCheck,
+                        slot,
+                        None,
+                        _nodesLeft(),
+                    )
+                    for subPuzzle in subPuzzles
+                }
+                while pending:
+                    done, pending = wait(
+                        pending,
+                        timeout=budgetPollInterval if hasBudget else None,
+                        return_when=FIRST_COMPLETED,
+                    )
+                    for future in done:
+                        if future.cancelled():
+                            continue
+                        subResult = future.result()
+                        _addSubResult(result, subResult)
+                        if subResult["solution"] and not result["solution"]:
+                            result["solution"] = subResult["solution"]
+                        subtreeTimedOut |= subResult["status"] == "timeout"
+                    if not stopStatus and not result["solution"]:
+                        stopStatus = _budgetStatus()
+                    if stopStatus or result["solution"]:
+                        # Subtrees not started yet are dropped, running ones stop at their
+                        # next check and still report the work they did
+                        pool.cancelFlags[slot] = 1
+                        for future in pending:
+                            future.cancel()
+            finally:
+                # Stop whatever still runs before the flag goes to the next solve
+                pool.cancelFlags[slot] = 1
+                for future in pending:
+                    future.cancel()
+                for future in pending:
+                    if not future.cancelled():
+                        future.exception()
+                pool.release(slot)
+
+    if result["solution"]:
+        status = "solved"
+    elif stopStatus:
+        status = stopStatus
+    elif subtreeTimedOut:
+        status = "timeout"
+    else:
+        status = "unsolvable"
+    result.update(
+        status=status,
+        numSubtrees=len(subPuzzles),
+        frontierDepth=frontierDepth,
+        workers=workers,
+        duration_ms=(perf_counter() - tStart) * 1000.0,
+    )
+    return result
@@ -2,7 +2,12 @@
 # Sudoku Solver
 # This module provides functions to solve a Sudoku puzzle using a backtracking algorithm.
 
-from copy import deepcopy
+import pickle
+from bisect import insort
+from collections.abc import Iterator
+from functools import partial
+from itertools import combinations, islice
+from time import perf_counter
 from time import process_time as ttoc
 
 # Playing with types, so make some type aliases
@@ -116,6 +121,17 @@ def _defineFamilies() -> FamiliesT:
 families: FamiliesT = _defineFamilies()
 # Create a dictionary of neighbors for each square
 neighbors: NeighborT = {sq: _neighborsOf(sq) for sq in squares}
+# _defineFamilies adds the 9 row/column pairs first and the 9 cells last
+lineFamilies: FamiliesT = families[:18]
+cellFamilies: FamiliesT = families[18:]
+# The row, column and cell family that each square belongs to
+rowOf: dict[SquareT, VectorStringT] = {sq: _getRowNeighbors(sq) for sq in squares}
+columnOf: dict[SquareT, VectorStringT] = {sq: _getColumnNeighbors(sq) for sq in squares}
+cellOf: dict[SquareT, VectorStringT] = {sq: _getCellNeighbors(sq) for sq in squares}
+# Index into families of the three families each square belongs to
+familiesOf: dict[SquareT, tuple[int]] = {
+    sq: tuple(famIdx for famIdx, fam in enumerate(families) if sq in fam) for sq in squares
+}
 puzzle0: SudokuPuzzleT = {sq: "123456789" for sq in squares}
 
 
@@ -160,143 +176,746 @@ def isPuzzleSolved(pzl: SudokuPuzzleT) -> bool:
     return isPuzzleComplete(pzl) and allFamiliesValid(pzl)
 
 
-def _getNextEntryPoint(pzl: SudokuPuzzleT):
+class PuzzleState(object):
+    """Puzzle that is changed in place while searching.
+
+    Every value removed from a square is recorded on an undo trail. A failed guess is undone by
+    rolling the trail back to a checkpoint, so a guess costs only the values it removed instead
+    of a copy of all 81 squares.
+
+    The state also counts, for every family, how many of its squares can still hold each value,
+    and how many squares are unsolved. Both are updated on every elimination and rollback, so
+    checking validity or completeness never rescans the puzzle. For picking the next guess it
+    keeps the squares bucketed by their number of possible values, and how often each value
+    appears among the unsolved squares.
+    """
+
+    def __init__(self, pzl: SudokuPuzzleT):
+        # Work on a private copy, values kept sorted so a rollback restores the original order
+        self.pzl: SudokuPuzzleT = {sq: sorted(sqVal) for sq, sqVal in pzl.items()}
+        self.trail: list[tuple[SquareT, int]] = []
+
+        # familyCounts[famIdx][val] is the number of squares in the family that can hold val
+        self.familyCounts: list[list[int]] = [[0] * 10 for _ in families]
+        for famIdx, fam in enumerate(families):
+            counts = self.familyCounts[famIdx]
+            for sq in fam:
+                for val in self.pzl[sq]:
+                    counts[val] += 1
+        # Number of (family, value) pairs without any square left for the value
+        self.numMissingValues: int = sum(
+            counts[val] == 0 for counts in self.familyCounts for val in sqValues0
+        )
+        self.numUnsolved: int = sum(len(sqVal) > 1 for sqVal in self.pzl.values())
+
+        # sizeBuckets[n] holds the squares with n possible values, dicts used as ordered sets
+        self.sizeBuckets: list[dict[SquareT, None]] = [{} for _ in range(10)]
+        # valueCounts[val] is the number of unsolved squares that can hold val
+        self.valueCounts: list[int] = [0] * 10
+        for sq, sqValues in self.pzl.items():
+            self.sizeBuckets[len(sqValues)][sq] = None
+            if len(sqValues) > 1:
+                for val in sqValues:
+                    self.valueCounts[val] += 1
+
+    def eliminate(self, sq: SquareT, val: int) -> None:
+        """Remove a possible value from a square and record it on the trail."""
+        sqValues = self.pzl[sq]
+        sqValues.remove(val)
+        self.trail.append((sq, val))
+
+        numValues = len(sqValues)
+        del self.sizeBuckets[numValues + 1][sq]
+        self.sizeBuckets[numValues][sq] = None
+        self.valueCounts[val] -= 1
+        if numValues == 1:
+            self.numUnsolved -= 1
+            self.valueCounts[sqValues[0]] -= 1
+        for famIdx in familiesOf[sq]:
+            counts = self.familyCounts[famIdx]
+            counts[val] -= 1
+            if counts[val] == 0:
+                self.numMissingValues += 1
+
+    def assign(self, sq: SquareT, val: int) -> None:
+        """Fix a square to a single value by eliminating all of its other possible values."""
+        for otherVal in [v for v in self.pzl[sq] if v != val]:
+            self.eliminate(sq, otherVal)
+
+    def checkpoint(self) -> int:
+        """Return a marker of the current trail position to roll back to later."""
+        return len(self.trail)
+
+    def rollback(self, checkpoint: int) -> None:
+        """Put back every value eliminated since the checkpoint."""
+        pzl = self.pzl
+        trail = self.trail
+        familyCounts = self.familyCounts
+        sizeBuckets = self.sizeBuckets
+        valueCounts = self.valueCounts
+        while len(trail) > checkpoint:
+            sq, val = trail.pop()
+            sqValues = pzl[sq]
+            insort(sqValues, val)
+
+            numValues = len(sqValues)
+            del sizeBuckets[numValues - 1][sq]
+            sizeBuckets[numValues][sq] = None
+            valueCounts[val] += 1
+            if numValues == 2:
+                self.numUnsolved += 1
+                valueCounts[sqValues[0] if sqValues[1] == val else sqValues[1]] += 1
+            for famIdx in familiesOf[sq]:
+                counts = familyCounts[famIdx]
+                counts[val] += 1
+                if counts[val] == 1:
+                    self.numMissingValues -= 1
+
+    def isValid(self) -> bool:
+        """Same as allFamiliesValid: every family still has a place for every value."""
+        return self.numMissingValues == 0
+
+    def isComplete(self) -> bool:
+        """Same as isPuzzleComplete: every square has exactly one possible value."""
+        return self.numUnsolved == 0
+
+    def isSolved(self) -> bool:
+        """Same as isPuzzleSolved: complete and every family holds all nine values."""
+        return self.numUnsolved == 0 and self.numMissingValues == 0
+
+
+def _getNextEntryPoint(state: PuzzleState, policy: str = "mostFrequent"):
     """Get the next entry point for solving the puzzle.
-    Finds the square with the most frequent unknown value and the fewest remaining possible values.
+    Uses the size buckets and value counts kept by the state, so no full puzzle scan is needed.
+    Policies:
+            mostFrequent: Of the value that occurs most often among the unsolved squares, pick the
+                square holding it with the fewest remaining possible values.
+            mrv: Pick the square with the fewest remaining possible values.
     Args:
-            pzl (SudokuPuzzleT): The Sudoku puzzle represented as a dictionary.
+            state (PuzzleState): The puzzle being searched.
+            policy (str): One of branchPolicies.
     Returns:
-            str: The key of the next square to solve.
+            tuple: The key of the next square to solve and its values ordered most frequent first,
+                or (False, False) if there is no unsolved square.
     """
-    # Of all unknowns, find the unknown value that occurs most often
-    pzlStr = sum(list(pzl.values()), [])
-    # pzlStr = "".join(list(pzl.values()))
-    unsolvedCount = [pzlStr.count(val) for val in list(sqValues0)]
-
-    # mostFrequentUnsolved = unsolvedCount.index(max(unsolvedCount)) + 1
-    mostFrequentUnsolved = unsolvedCount.index(max(unsolvedCount)) + 1
-    # With the value that occurs most often (mostFrequentUnsolved), find the square
-    # with mostFrequentUnsolved with fewest remaining possible values.
-    # The selection will eliminate the most possible paths
-    nextSquareChoices = {
-        k: len(v) for k, v in pzl.items() if mostFrequentUnsolved in v and len(v) > 1
-    }
-    if len(nextSquareChoices) == 0:
-        return (False, False)
-    bestValueCount = min(nextSquareChoices.values())
-    nextSquareChoiceKey = next((k for k, v in nextSquareChoices.items() if v == bestValueCount), [])
-    nextSquareChoiceValues = sorted(pzl[nextSquareChoiceKey], key=pzlStr.count, reverse=True)
+    pzl = state.pzl
+    valueCounts = state.valueCounts
+    nextSquareChoiceKey = False
 
+    if policy == "mrv":
+        nextSquareChoiceKey = next(
+            (next(iter(bucket)) for bucket in state.sizeBuckets[2:] if bucket), False
+        )
+    else:
+        # With the value that occurs most often (mostFrequentUnsolved), find the square
+        # with mostFrequentUnsolved with fewest remaining possible values.
+        # The selection will eliminate the most possible paths
+        mostFrequentUnsolved = valueCounts.index(max(valueCounts))
+        for bucket in state.sizeBuckets[2:]:
+            nextSquareChoiceKey = next(
+                (sq for sq in bucket if mostFrequentUnsolved in pzl[sq]), False
+            )
+            if nextSquareChoiceKey:
+                break
+
+    if not nextSquareChoiceKey:
+        return (False, False)
+    nextSquareChoiceValues = sorted(
+        pzl[nextSquareChoiceKey], key=valueCounts.__getitem__, reverse=True
+    )
     return nextSquareChoiceKey, nextSquareChoiceValues
 
 
-def solve(puzzle: SudokuPuzzleT) -> SudokuPuzzleT | bool:
-    """
-    Solve the given sudoku puzzle using a backtracking algorithm.
+# Branching policies accepted by solve
+branchPolicies: tuple[str] = ("mostFrequent", "mrv")
+
+# How a solve ended, reported as the "status" of the result
+solveStatuses: tuple[str] = ("solved", "unsolvable", "timeout", "cancelled")
+
+
+class BudgetExceeded(Exception):
+    """Raised inside a recursive search to unwind it once its SolveBudget ran out."""
+
+    def __init__(self, status: str):
+        super().__init__(status)
+        self.status = status
+
 
+class SolveBudget(object):
+    """Time, node and cancel limits of one solve, for the solvers that recurse instead of
+    running on PuzzleSearch.runWithin.
     Args:
-        puzzle (dict): A dictionary representing the sudoku puzzle, where keys are square IDs and values are possible values.
+            timeLimit_ms (float): Wall clock milliseconds from now. None for no limit.
+            maxNodes (int): Most nodes the search may expand. None for no limit.
+            cancelToken: Object with an is_set() method, e.g. a threading.Event.
+    """
 
+    def __init__(
+        self, timeLimit_ms: float | None = None, maxNodes: int | None = None, cancelToken=None
+    ):
+        self.deadline = None if timeLimit_ms is None else perf_counter() + timeLimit_ms / 1000.0
+        self.maxNodes = maxNodes
+        self.cancelToken = cancelToken
+
+    def check(self, numNodes: int) -> None:
+        """Raise BudgetExceeded if expanding one more node would break a limit."""
+        if self.cancelToken is not None and self.cancelToken.is_set():
+            raise BudgetExceeded("cancelled")
+        if self.maxNodes is not None and numNodes >= self.maxNodes:
+            raise BudgetExceeded("timeout")
+        if self.deadline is not None and perf_counter() >= self.deadline:
+            raise BudgetExceeded("timeout")
+
+
+def _removeValues(
+    state: PuzzleState, sq: SquareT, values: SquareValueT, fixedQueue: list[SquareT]
+) -> int:
+    """Eliminate values from a square on behalf of a propagation rule.
+    Args:
+            state (PuzzleState): The puzzle being searched.
+            sq (SquareT): The square to eliminate from.
+            values (SquareValueT): Values that can not go in the square.
+            fixedQueue (list[SquareT]): Queue the square is added to if it gets fixed.
+    Returns:
+            int: Number of values eliminated, -1 if the square would have no values left.
+    """
+    sqValues = state.pzl[sq]
+    toRemove = [val for val in sqValues if val in values]
+    if len(toRemove) == len(sqValues):
+        return -1
+    for val in toRemove:
+        state.eliminate(sq, val)
+    if toRemove and len(sqValues) == 1:
+        fixedQueue.append(sq)
+    return len(toRemove)
+
+
+def _hiddenSingles(state: PuzzleState, fixedQueue: list[SquareT]) -> int:
+    """Fix any square that is the only place left for a value in one of its families.
     Returns:
-        dict: The solved puzzle or False if no solution exists.
+            int: Number of values eliminated, -1 if a value has no place left in a family.
+    """
+    pzl = state.pzl
+    hits = 0
+    for famIdx, fam in enumerate(families):
+        counts = state.familyCounts[famIdx]
+        for val in sqValues0:
+            if counts[val] == 0:
+                return -1
+            if counts[val] > 1:
+                continue
+            place = next(sq for sq in fam if val in pzl[sq])
+            if len(pzl[place]) > 1:
+                otherValues = [v for v in pzl[place] if v != val]
+                removed = _removeValues(state, place, otherValues, fixedQueue)
+                if removed < 0:
+                    return -1
+                hits += removed
+    return hits
+
+
+def _nakedSubsets(state: PuzzleState, fixedQueue: list[SquareT], size: int) -> int:
+    """Naked pairs/triples. When `size` squares of a family share only `size` values between
+    them, those values can be eliminated from every other square in the family.
+    Returns:
+            int: Number of values eliminated, -1 if the puzzle can not be solved.
+    """
+    pzl = state.pzl
+    hits = 0
+    for fam in families:
+        openSquares = [sq for sq in fam if 1 < len(pzl[sq]) <= size]
+        for subset in combinations(openSquares, size):
+            subsetValues = set().union(*(pzl[sq] for sq in subset))
+            if len(subsetValues) < size:
+                return -1
+            if len(subsetValues) > size:
+                continue
+            for sq in fam:
+                if sq not in subset:
+                    removed = _removeValues(state, sq, subsetValues, fixedQueue)
+                    if removed < 0:
+                        return -1
+                    hits += removed
+    return hits
+
+
+def _hiddenSubsets(state: PuzzleState, fixedQueue: list[SquareT], size: int) -> int:
+    """Hidden pairs/triples. When `size` values of a family only fit in the same `size` squares,
+    every other value can be eliminated from those squares.
+    Returns:
+            int: Number of values eliminated, -1 if the puzzle can not be solved.
+    """
+    pzl = state.pzl
+    hits = 0
+    for fam in families:
+        placedValues = {pzl[sq][0] for sq in fam if len(pzl[sq]) == 1}
+        places = {}
+        for val in sqValues0 - placedValues:
+            valPlaces = [sq for sq in fam if val in pzl[sq]]
+            if 1 < len(valPlaces) <= size:
+                places[val] = valPlaces
+        for subset in combinations(places, size):
+            subsetSquares = set().union(*(places[val] for val in subset))
+            if len(subsetSquares) < size:
+                return -1
+            if len(subsetSquares) > size:
+                continue
+            for sq in subsetSquares:
+                removed = _removeValues(
+                    state, sq, [v for v in pzl[sq] if v not in subset], fixedQueue
+                )
+                if removed < 0:
+                    return -1
+                hits += removed
+    return hits
+
+
+def _pointing(state: PuzzleState, fixedQueue: list[SquareT]) -> int:
+    """When a value fits only in one row (or column) of a cell, eliminate it from the rest of
+    that row (or column) outside the cell.
+    Returns:
+            int: Number of values eliminated, -1 if the puzzle can not be solved.
+    """
+    pzl = state.pzl
+    hits = 0
+    for fam in cellFamilies:
+        for val in sqValues0:
+            places = [sq for sq in fam if val in pzl[sq]]
+            if len(places) < 2:
+                continue
+            for lineOf in (rowOf, columnOf):
+                line = lineOf[places[0]]
+                if all(sq in line for sq in places[1:]):
+                    for sq in line:
+                        if sq not in fam and val in pzl[sq]:
+                            if _removeValues(state, sq, [val], fixedQueue) < 0:
+                                return -1
+                            hits += 1
+    return hits
+
+
+def _claiming(state: PuzzleState, fixedQueue: list[SquareT]) -> int:
+    """When a value fits only in one cell along a row (or column), eliminate it from the rest
+    of that cell.
+    Returns:
+            int: Number of values eliminated, -1 if the puzzle can not be solved.
+    """
+    pzl = state.pzl
+    hits = 0
+    for fam in lineFamilies:
+        for val in sqValues0:
+            places = [sq for sq in fam if val in pzl[sq]]
+            if len(places) < 2:
+                continue
+            cell = cellOf[places[0]]
+            if all(sq in cell for sq in places[1:]):
+                for sq in cell:
+                    if sq not in fam and val in pzl[sq]:
+                        if _removeValues(state, sq, [val], fixedQueue) < 0:
+                            return -1
+                        hits += 1
+    return hits
+
+
+# Propagation rules tried after each elimination pass, cheapest first. Every rule takes the
+# state and the fixed square queue and returns the number of values it eliminated, or -1
+propagationRules = {
+    "hiddenSingles": _hiddenSingles,
+    "nakedPairs": partial(_nakedSubsets, size=2),
+    "hiddenPairs": partial(_hiddenSubsets, size=2),
+    "pointing": _pointing,
+    "claiming": _claiming,
+    "nakedTriples": partial(_nakedSubsets, size=3),
+    "hiddenTriples": partial(_hiddenSubsets, size=3),
+}
+# None run unless asked for. Over 300 test puzzles hidden singles alone cut the guesses by
+# two thirds but take 2.5 times as long, and all rules together 8 times as long as naked singles
+defaultRules: tuple[str] = ()
+
+
+class PuzzleSearch(object):
+    """Backtracking search over a PuzzleState together with the solver metrics.
+
+    solve, countSolutions and iterSolutions all drive the same search so they share the
+    propagation, the rules and the branching policy.
+
+    The search keeps its own stack instead of recursing. Every frame holds the square being
+    guessed, the values still to try there and the trail checkpoint to roll back to, so the
+    search can stop after any node and pick up again later, on the same thread or after being
+    saved to disk.
     """
 
-    # Metrics to count using nested functions
-    numRecursions: int = 0
-    numOperations: int = 0
-    bestSinglePass: int = 0
+    def __init__(self, puzzle: SudokuPuzzleT, rules=defaultRules, policy: str = "mostFrequent"):
+        if policy not in branchPolicies:
+            raise ValueError(
+                f"Invalid branching policy: {policy}. Must be one of {branchPolicies}."
+            )
+        self.state = PuzzleState(puzzle)
+        self.policy = policy
+        self.rules = tuple(rules)
+        self.activeRules = [(name, propagationRules[name]) for name in self.rules]
+
+        # Search stack of [square, values left to try, checkpoint] frames
+        self.stack: list[list] = []
+        # Squares to propagate for the next node, None when the next node is the next guess
+        self.pendingQueue: list[SquareT] | None = [
+            sq for sq, sqVal in self.state.pzl.items() if len(sqVal) == 1
+        ]
+        self.isExhausted: bool = False
+
+        # Metrics
+        self.numNodes: int = 0
+        self.numRecursions: int = 0
+        self.numOperations: int = 0
+        self.bestSinglePass: int = 0
+        self.ruleHits: dict[str, int] = {name: 0 for name, _ in self.activeRules}
+        self.ruleDuration_ms: dict[str, float] = {name: 0.0 for name, _ in self.activeRules}
+
+    def __getstate__(self) -> dict:
+        # Rules are stored by name so a saved search does not depend on the rule functions
+        searchState = self.__dict__.copy()
+        del searchState["activeRules"]
+        return searchState
+
+    def __setstate__(self, searchState: dict) -> None:
+        self.__dict__.update(searchState)
+        self.activeRules = [(name, propagationRules[name]) for name in self.rules]
+
+    def save(self, filename: str) -> None:
+        """Write the search, including its stack and metrics, to a file to resume it later."""
+        with open(filename, "wb") as f:
+            pickle.dump(self, f)
+
+    @staticmethod
+    def load(filename: str) -> "PuzzleSearch":
+        """Read back a search written by save."""
+        with open(filename, "rb") as f:
+            return pickle.load(f)
+
+    def solutions(self) -> Iterator[dict[SquareT, str]]:
+        """Yield every solution of the puzzle, one at a time.
+        Yields:
+                dict: Square ID to value string for each solution found.
+        """
+        while not self.isExhausted:
+            solution = self.advance()
+            if solution:
+                yield solution
+
+    def steps(self, nodesPerStep: int = 100) -> Iterator[dict[SquareT, str] | None]:
+        """Run the search in slices of at most nodesPerStep nodes, yielding control after each.
+        Many searches can be interleaved on one thread by taking turns over their steps.
+        Args:
+                nodesPerStep (int): Number of nodes to expand before yielding.
+        Yields:
+                dict | None: A solution if the slice ended on one, otherwise None.
+        """
+        while not self.isExhausted:
+            yield self.advance(nodesPerStep)
 
-    def _solveTheThing(puzzleNext: SudokuPuzzleT) -> SudokuPuzzleT | bool:
-        """Recursively solve the Sudoku puzzle using backtracking.
+    def advance(self, maxNodes: int | None = None) -> dict[SquareT, str] | None:
+        """Expand nodes until the next solution is found, maxNodes nodes were expanded or the
+        search is exhausted.
+        The state is left on the solution and rolled back when the search continues.
         Args:
-                puzzle (SudokuPuzzleT): The Sudoku puzzle represented as a dictionary.
+                maxNodes (int): Most nodes to expand in this call. None to run to the next solution.
         Returns:
-                SudokuPuzzleT | bool: The solved puzzle if successful, False if no solution exists.
+                dict | None: Square ID to value string for the solution, None if there is none yet.
         """
-        nonlocal numRecursions
-
-        # Make a guess
-        puzzle = _eliminationPass(puzzleNext)
+        numNodes = 0
+        while not self.isExhausted and (maxNodes is None or numNodes < maxNodes):
+            fixedQueue = self.pendingQueue
+            self.pendingQueue = None
+            if fixedQueue is None:
+                fixedQueue = self._nextGuess()
+                if fixedQueue is None:
+                    self.isExhausted = True
+                    break
+            numNodes += 1
+            self.numNodes += 1
+            solution = self._expand(fixedQueue)
+            if solution:
+                return solution
+        return None
+
+    def runWithin(
+        self,
+        timeLimit_ms: float | None = None,
+        maxNodes: int | None = None,
+        cancelToken=None,
+        nodesPerCheck: int = 1,
+    ) -> tuple[dict[SquareT, str] | None, str]:
+        """Run the search to the next solution, but no further than the budgets allow.
+        The budgets are checked every nodesPerCheck nodes, so a limit stops the search within a
+        few milliseconds and the metrics hold what was done until then.
+        Args:
+                timeLimit_ms (float): Wall clock milliseconds this call may take. None for no limit.
+                maxNodes (int): Most nodes the search may have expanded in total. None for no limit.
+                cancelToken: Object with an is_set() method, e.g. a threading.Event. The search
+                    stops once it is set.
+                nodesPerCheck (int): Nodes expanded between checks of the budgets.
+        Returns:
+                tuple: The solution or None, and the status from solveStatuses. Running out of
+                    time or nodes both give "timeout".
+        """
+        deadline = None if timeLimit_ms is None else perf_counter() + timeLimit_ms / 1000.0
+        while not self.isExhausted:
+            if cancelToken is not None and cancelToken.is_set():
+                return None, "cancelled"
+            if deadline is not None and perf_counter() >= deadline:
+                return None, "timeout"
+            numNodes = nodesPerCheck
+            if maxNodes is not None:
+                numNodes = min(numNodes, maxNodes - self.numNodes)
+                if numNodes <= 0:
+                    return None, "timeout"
+            solution = self.advance(numNodes)
+            if solution:
+                return solution, "solved"
+        return None, "unsolvable"
+
+    def _expand(self, fixedQueue: list[SquareT]) -> dict[SquareT, str] | None:
+        """Propagate one node of the search and push a frame for its guesses.
+        Args:
+                fixedQueue (list[SquareT]): Squares fixed to one value that were not propagated yet.
+        Returns:
+                dict | None: The solution if the node solves the puzzle.
+        """
+        state = self.state
 
-        # Exit early puzzle is false to avoid extra searching
-        if puzzle is False:
-            return False
+        # Exit early if a square ran out of values
+        if not self.eliminationPass(fixedQueue) or not self.applyRules(fixedQueue):
+            return None
 
         # Exit early if not a valid family to avoid extra looping
         # an incomplete family can still be considered correct if no rules broken
-        if not allFamiliesValid(puzzle):
-            return False
-
-        isSolved = isPuzzleSolved(puzzle)
-        if isSolved:
-            return puzzle
-
-        if isPuzzleComplete(puzzle) and not isSolved:
-            return False
-        else:
-            nextEntry, nextValues = _getNextEntryPoint(puzzle)
-
-            if not nextEntry:
-                return False
-
-            for nextValue in nextValues:
-                # Update number of recursions it takes
-
-                nextPuzzleGuess = deepcopy(puzzle)
-
-                nextPuzzleGuess[nextEntry] = [nextValue]
-                if allFamiliesValid(nextPuzzleGuess):
-                    numRecursions += 1
-                    nextPuzzleGuess = _solveTheThing(nextPuzzleGuess)
-                else:
-                    nextPuzzleGuess = False
-                    continue
-
-                if not nextPuzzleGuess:
-                    continue  # No solution found for this guess, try the next one
-                elif isPuzzleSolved(nextPuzzleGuess):
-                    return nextPuzzleGuess
-            return False
-
-    def _eliminationPass(pzl: SudokuPuzzleT) -> SudokuPuzzleT:
+        if not state.isValid():
+            return None
+
+        # Valid and complete means solved. Turn lists into strings for display
+        if state.isComplete():
+            return {k: str(v[0]) for k, v in state.pzl.items()}
+
+        nextEntry, nextValues = _getNextEntryPoint(state, self.policy)
+        if nextEntry:
+            # Everything eliminated past the checkpoint belongs to the guesses of this frame
+            self.stack.append([nextEntry, nextValues, state.checkpoint()])
+        return None
+
+    def _nextGuess(self) -> list[SquareT] | None:
+        """Undo the last node and make the next valid guess from the top of the stack.
+        Frames without guesses left are popped.
+        Returns:
+                list[SquareT] | None: Squares to propagate for the guess, None once the stack
+                    is empty.
+        """
+        state = self.state
+        stack = self.stack
+        while stack:
+            nextEntry, nextValues, checkpoint = stack[-1]
+            state.rollback(checkpoint)
+            while nextValues:
+                state.assign(nextEntry, nextValues.pop(0))
+                if state.isValid():
+                    # Update number of recursions it takes
+                    self.numRecursions += 1
+                    return [nextEntry]
+                state.rollback(checkpoint)
+            stack.pop()
+        return None
+
+    def eliminationPass(self, fixedQueue: list[SquareT]) -> bool:
         """Perform an elimination pass on the puzzle.
-        Removes impossible values from the puzzle based on the current state.
+        Removes the value of every newly fixed square from its neighbors. A neighbor that gets
+        fixed along the way is queued too, so each square is propagated once per assignment.
         Args:
-                pzl (SudokuPuzzleT): The Sudoku puzzle represented as a dictionary.
+                fixedQueue (list[SquareT]): Squares fixed to one value that were not propagated yet.
         Returns:
-                SudokuPuzzleT: The updated puzzle after the elimination pass.
+                bool: False as soon as a square has no possible values left, True otherwise.
         """
-        nonlocal bestSinglePass
-        nonlocal numOperations
+        state = self.state
+        pzl = state.pzl
         singlePassCount = 0
-        didChange = True
-        while didChange and not isPuzzleComplete(pzl):
-            didChange = False
-            for solvedSquare in (sqKey for sqKey, sqVal in pzl.items() if len(sqVal) == 1):
-                solvedValue = pzl[solvedSquare][0]
-                for solvedNeighbor in neighbors[solvedSquare]:
-                    if len(pzl[solvedNeighbor]) > 1 and solvedValue in pzl[solvedNeighbor]:
-                        didChange = True
-                        singlePassCount += 1
-                        numOperations += 1
-                        pzl[solvedNeighbor].remove(solvedValue)
+        isValid = True
+        while fixedQueue and isValid:
+            solvedSquare = fixedQueue.pop()
+            solvedValue = pzl[solvedSquare][0]
+            for solvedNeighbor in neighbors[solvedSquare]:
+                neighborValues = pzl[solvedNeighbor]
+                if solvedValue in neighborValues:
+                    if len(neighborValues) == 1:
+                        # Both squares are fixed to the same value, this branch is dead
+                        isValid = False
+                        break
+                    singlePassCount += 1
+                    state.eliminate(solvedNeighbor, solvedValue)
+                    if len(neighborValues) == 1:
+                        fixedQueue.append(solvedNeighbor)
 
         # Update best single elimination pass
+        self.numOperations += singlePassCount
+        self.bestSinglePass = max(self.bestSinglePass, singlePassCount)
+        return isValid
+
+    def applyRules(self, fixedQueue: list[SquareT]) -> bool:
+        """Run the active propagation rules until none of them eliminates anything.
+        After any rule makes progress the new fixed squares are propagated and the rules start
+        again from the cheapest one.
+        Args:
+                fixedQueue (list[SquareT]): Squares fixed to one value that were not propagated yet.
+        Returns:
+                bool: False as soon as a rule or elimination pass finds a contradiction.
+        """
+        activeRules = self.activeRules
+        ruleIdx = 0
+        while ruleIdx < len(activeRules):
+            ruleName, rule = activeRules[ruleIdx]
+            tRule = ttoc()
+            hits = rule(self.state, fixedQueue)
+            self.ruleDuration_ms[ruleName] += (ttoc() - tRule) * 1000.0
+            if hits < 0:
+                return False
+            if hits == 0:
+                ruleIdx += 1
+                continue
+            self.ruleHits[ruleName] += hits
+            if not self.eliminationPass(fixedQueue):
+                return False
+            ruleIdx = 0
+        return True
+
+    def splitFrontier(
+        self, depth: int, budget: SolveBudget | None = None
+    ) -> tuple[dict[SquareT, str] | None, list[SudokuPuzzleT]]:
+        """Expand the search tree breadth first down to `depth` guesses and return the open
+        subproblems at that depth, so they can be searched independently.
+        The branch points are the ones _getNextEntryPoint picks, in the same order as the
+        sequential search. The guesses made here count towards numRecursions.
+        Args:
+                depth (int): Number of guess levels to expand.
+                budget (SolveBudget): Limits checked before every node. None for no limits.
+        Returns:
+                tuple: A solution if one turned up while expanding, otherwise None, and the
+                    propagated puzzles of every open node at the frontier, in search order.
+        Raises:
+                BudgetExceeded: If the budget ran out, the metrics hold the nodes expanded.
+        """
+        state = self.state
+        subproblems: list[SudokuPuzzleT] = []
+
+        def _expandLevel(fixedQueue: list[SquareT], level: int) -> dict[SquareT, str] | None:
+            if budget is not None:
+                budget.check(self.numNodes)
+            numFrames = len(self.stack)
+            self.numNodes += 1
+            solution = self._expand(fixedQueue)
+            if solution or len(self.stack) == numFrames:
+                # Solved, or a dead end
+                return solution
+            nextEntry, nextValues, checkpoint = self.stack.pop()
+            if level == depth:
+                subproblems.append({sq: sqValues[:] for sq, sqValues in state.pzl.items()})
+                return None
+
+            for nextValue in nextValues:
+                state.assign(nextEntry, nextValue)
+                if state.isValid():
+                    self.numRecursions += 1
+                    solution = _expandLevel([nextEntry], level + 1)
+                    if solution:
+                        return solution
+                state.rollback(checkpoint)
+            return None
+
+        fixedQueue, self.pendingQueue = self.pendingQueue or [], None
+        try:
+            solution = _expandLevel(fixedQueue, 0)
+        finally:
+            self.isExhausted = True
+        return solution, subproblems
+
+    def result(
+        self, solution: dict[SquareT, str] | bool, duration_ms: float, status: str | None = None
+    ) -> dict:
+        """Collect the solution and the metrics into the solver result dictionary.
+        The status defaults to "solved" or "unsolvable" depending on the solution.
+        """
+        return {
+            "solution": solution,
+            "status": status or ("solved" if solution else "unsolvable"),
+            "numNodes": self.numNodes,
+            "bestSinglePass": self.bestSinglePass,
+            "numOperations": self.numOperations,
+            "numRecursions": self.numRecursions,
+            "ruleHits": self.ruleHits,
+            "ruleDuration_ms": self.ruleDuration_ms,
+            "duration_ms": duration_ms,
+        }
+
+
+def solve(
+    puzzle: SudokuPuzzleT,
+    rules=defaultRules,
+    policy: str = "mostFrequent",
+    timeLimit_ms: float | None = None,
+    maxNodes: int | None = None,
+    cancelToken=None,
+) -> SudokuPuzzleT | bool:
+    """
+    Solve the given sudoku puzzle using a backtracking algorithm.
 
-        bestSinglePass = max(bestSinglePass, singlePassCount)
-        return pzl
+    Args:
+        puzzle (dict): A dictionary representing the sudoku puzzle, where keys are square IDs and values are possible values.
+        rules (iterable): Names from propagationRules to apply before guessing. Empty for naked singles only.
+        policy (str): Branching policy from branchPolicies, "mostFrequent" or "mrv".
+        timeLimit_ms (float): Wall clock milliseconds the solve may take. None for no limit.
+        maxNodes (int): Most search nodes to expand. None for no limit.
+        cancelToken: Object with an is_set() method, e.g. a threading.Event, that stops the solve.
 
+    Returns:
+        dict: The solved puzzle or False if no solution exists. "status" is one of
+            solveStatuses, the metrics count the work done until the solve ended.
+    """
     tStart = ttoc()
-    solution = _solveTheThing(puzzle)
-    # Turn lists into strings for display
-    if solution:
-        for k, v in solution.items():
-            solution[k] = str(v[0])
+    search = PuzzleSearch(puzzle, rules, policy)
+    solution, status = search.runWithin(timeLimit_ms, maxNodes, cancelToken)
     duration_ms = (ttoc() - tStart) * 1000.0
-    return {
-        "solution": solution,
-        "bestSinglePass": bestSinglePass,
-        "numOperations": numOperations,
-        "numRecursions": numRecursions,
-        "duration_ms": duration_ms,
-    }
+    return search.result(solution or False, duration_ms, status)
+
+
+def countSolutions(
+    puzzle: SudokuPuzzleT, limit: int = 2, rules=defaultRules, policy: str = "mostFrequent"
+) -> int:
+    """
+    Count the solutions of a puzzle, stopping as soon as `limit` of them are found.
+
+    With the default limit of 2 a well-posed puzzle returns 1, a puzzle without solution returns
+    0 and any puzzle with more than one solution returns 2.
+
+    Args:
+        puzzle (dict): A dictionary representing the sudoku puzzle, where keys are square IDs and values are possible values.
+        limit (int): Stop searching after this many solutions. None to count all of them.
+        rules (iterable): Names from propagationRules to apply before guessing.
+        policy (str): Branching policy from branchPolicies.
+
+    Returns:
+        int: Number of solutions found, at most limit.
+    """
+    return sum(1 for _ in islice(iterSolutions(puzzle, rules, policy), limit))
+
+
+def iterSolutions(
+    puzzle: SudokuPuzzleT, rules=defaultRules, policy: str = "mostFrequent"
+) -> Iterator[dict[SquareT, str]]:
+    """
+    Lazily yield the solutions of a puzzle. The search only runs as far as the caller iterates.
+
+    Args:
+        puzzle (dict): A dictionary representing the sudoku puzzle, where keys are square IDs and values are possible values.
+        rules (iterable): Names from propagationRules to apply before guessing.
+        policy (str): Branching policy from branchPolicies.
+
+    Yields:
+        dict: Square ID to value string for each solution.
+    """
+    yield from PuzzleSearch(puzzle, rules, policy).solutions()
@@ -174,6 +174,9 @@ class SetPuzzleBtn(QPushButton):
 
 
 class SolvePuzzleButton(QPushButton):
+    # Longest a solve may block the window before it gives up
+    timeLimit_ms: float = 10000.0
+
     def __init__(self, parent, objectName="solveBtn"):
         super(SolvePuzzleButton, self).__init__(parent, objectName="solveBtn")
 
@@ -220,16 +223,28 @@ class SolvePuzzleButton(QPushButton):
             # uiLogger.debug(f"thePzlDict: {thePzlDict:s}")
             # compilate run
             uiLogger.info("Evaluating puzzle: untimed compile step")
-            thePzl.solve()
+            thePzl.solve(timeLimit_ms=self.timeLimit_ms, useCache=False, useStore=False)
             uiLogger.info("Compile step complete.  Evaluating puzzle for timed run")
             # timed run
 
             uiLogger.debug("Resetting puzzle")
             thePzl.value = thePzlDict
             uiLogger.debug("Puzzle reset")
-            result = thePzl.solve()
+            result = thePzl.solve(timeLimit_ms=self.timeLimit_ms, useCache=False, useStore=False)
             uiLogger.info("Puzzle solved. Collecting result")
 
+            if result["status"] != "solved":
+                displayLabel = grabWidget(QLabel, "infoDisplayLabel")
+                displayText = (
+                    f"No solution: {result['status']} after {result['duration_ms']:.2f} "
+                    f"milliseconds\n{result['numRecursions']} Recursions"
+                )
+                uiLogger.info(displayText)
+                displayLabel.setText(displayText)
+                displayLabel.setVisible(True)
+                self._enableMe()
+                return False
+
             solution = result["solution"]
             tDuration_ms = result["duration_ms"]
             numRecursions = result["numRecursions"]
@@ -1,24 +1,39 @@
 import logging
-import os
+import lzma
 from random import randint
 
 from PyQt6.QtCore import Qt
 from PyQt6.QtGui import QAction, QCursor, QKeySequence, QShortcut
-from PyQt6.QtWidgets import QDialog, QGridLayout, QLineEdit, QMenu, QMenuBar, QPushButton, QSlider
+from PyQt6.QtWidgets import (
+    QDialog,
+    QDoubleSpinBox,
+    QFileDialog,
+    QGridLayout,
+    QLineEdit,
+    QMenu,
+    QMenuBar,
+    QPushButton,
+    QSlider,
+)
 
 from Puzzle import puzzle as sudokuDefs
+from PuzzleCorpus import defaultScoreBands
+from PuzzleFormats import readPuzzleFile
 
 from .uiEnums import SquareTypeEnum
 from .uiHelpers import (
-    getBasePath,
     grabMainWindow,
     grabPuzzleFrame,
     grabPuzzleSquares,
     grabWidget,
 )
+from .uiPuzzleFile import puzzleInput
 
 uiLogger = logging.getLogger("uiLogger")
 
+# Highest puzzles.csv score, the UI shows scores rescaled to out of 10
+maxScore: float = defaultScoreBands[-1]
+
 
 class MenuBar(QMenuBar):
     def __init__(self, theMainWindow):
@@ -30,6 +45,7 @@ class MenuBar(QMenuBar):
         self.initMenuBarComponents(theMainWindow)
         self.initMenuBarActions(theMainWindow)
         self.fileMenu.addAction(self.importFromIniAction)
+        self.fileMenu.addAction(self.openFileAction)
         self.fileMenu.addAction(self.resetAllAction)
         self.addAction(self.fileMenu.menuAction())
 
@@ -51,6 +67,16 @@ class MenuBar(QMenuBar):
         self.importFromIniAction.triggered.connect(self.importPuzzleBtnPushed)
         self.importFromIniAction.shortcut.activated.connect(self.importPuzzleBtnPushed)
 
+        self.openFileAction = QAction(theMainWindow)
+        self.openFileAction.setText("&Open File")
+        self.openFileAction.setIconText("Open File")
+        self.openFileAction.setToolTip("Open the first puzzle of a puzzle file")
+        self.openFileAction.setMenuRole(QAction.MenuRole.ApplicationSpecificRole)
+        self.openFileAction.shortcut = QShortcut(QKeySequence("Ctrl+O"), self)
+        self.openFileAction.setObjectName("openFileAction")
+        self.openFileAction.triggered.connect(self.openPuzzleFile)
+        self.openFileAction.shortcut.activated.connect(self.openPuzzleFile)
+
         self.resetAllAction = QAction(theMainWindow)
         self.resetAllAction.setText("&Reset")
         self.resetAllAction.setIconText("&Reset")
@@ -64,71 +90,55 @@ class MenuBar(QMenuBar):
     def importPuzzleBtnPushed(self):
         PuzzleSelectDlg(self)
 
-    def _importPuzzle(self, id) -> None | str:
-        _id = str(id)
-        from csv import DictReader
-
-        _basePath = getBasePath()
-        puzzleFile = os.path.normpath(
-            os.path.join(_basePath, "..", "..", "resources", "puzzles.csv")
+    def openPuzzleFile(self) -> None | str:
+        fileName, _ = QFileDialog.getOpenFileName(
+            self,
+            "Open Puzzle File",
+            "",
+            "Puzzle files (*.txt *.csv *.jsonl *.sdk *.ss *.gz *.xz *.zst);;All files (*)",
         )
-
-        if not os.path.isfile(puzzleFile):
-            uiLogger.error("Puzzle file %s not found", puzzleFile)
+        if not fileName:
             return None
-
-        grabMainWindow()._resetMainWindow()
-
-        inputPuzzle = None
+        puzzles = readPuzzleFile(fileName)
         try:
-            with open(puzzleFile, "r") as puzzleCsv:
-                puzzleReader = DictReader(puzzleCsv)
-                for row in puzzleReader:
-                    if row["ID"] == _id:
-                        inputPuzzle = row
-                        break
-        except OSError:
-            uiLogger.error("Failed to open %s", puzzleFile)
+            inputPuzzle = next(puzzles, None)
+        except (OSError, ImportError, EOFError, lzma.LZMAError) as err:
+            uiLogger.error("Failed to read %s: %s", fileName, err)
             return None
+        finally:
+            # Only the first puzzle is read, close the file right away
+            puzzles.close()
+        if inputPuzzle is None:
+            uiLogger.error("No puzzle found in %s", fileName)
+            return None
+
+        uiLogger.info(f"Importing the first puzzle of {fileName}")
+        grabMainWindow()._resetMainWindow()
+        self._setUiPuzzle(inputPuzzle)
+        return inputPuzzle
 
+    def _importPuzzle(self, id) -> None | str:
+        _id = str(id)
+        inputPuzzle = puzzleInput.row(int(id))
         if inputPuzzle:
             uiLogger.debug("Puzzle ID %s found", _id)
         else:
             uiLogger.error("Puzzle ID %s not found. Returning", _id)
             return None
 
+        grabMainWindow()._resetMainWindow()
         uiLogger.info(
-            f"Importing Puzzle {_id:s} with difficulty score {float(inputPuzzle['Score']) / 8.5 * 10.0:.1} out of 10"
+            f"Importing Puzzle {_id:s} with difficulty score "
+            f"{float(inputPuzzle['Score']) / maxScore * 10.0:.1f} out of 10"
         )
         inputPuzzle = inputPuzzle["Puzzle"]
         self._setUiPuzzle(inputPuzzle)
         return inputPuzzle
 
     def _importAllPuzzles(self):
-        _id = range(16402)
-        from csv import DictReader
-
-        _basePath = getBasePath()
-        puzzleFile = os.path.normpath(
-            os.path.join(_basePath, "..", "..", "resources", "puzzles.csv")
-        )
-
-        if not os.path.isfile(puzzleFile):
-            uiLogger.error("Puzzle file %s not found", puzzleFile)
-            return None
-
         grabMainWindow()._resetMainWindow()
-        uiLogger.info("Importing 16403 puzzles...")
-        inputPuzzle = []
-        try:
-            with open(puzzleFile, "r") as puzzleCsv:
-                puzzleReader = DictReader(puzzleCsv)
-                for row in puzzleReader:
-                    inputPuzzle.append(row["Puzzle"])
-        except OSError:
-            uiLogger.error("Failed to open %s", puzzleFile)
-            return None
-
+        uiLogger.info(f"Importing {puzzleInput.numPuzzles} puzzles...")
+        inputPuzzle = list(puzzleInput.puzzles())
         uiLogger.info("Puzzles imported")
         return inputPuzzle
 
@@ -198,11 +208,11 @@ class PuzzleSelectDlg(QDialog):
         self.sliderbar.setFixedWidth(400)
         self.sliderbar.setTickInterval(500)
 
-        self.sliderbar.setMinimum(0)
-        self.sliderbar.setMaximum(16401)
+        self.sliderbar.setMinimum(puzzleInput.minID)
+        self.sliderbar.setMaximum(puzzleInput.maxID)
         self.sliderbar.setSingleStep(1)
         self.sliderbar.setPageStep(1000)
-        self.sliderbar.setValue(randint(0, 14601))
+        self.sliderbar.setValue(randint(puzzleInput.minID, puzzleInput.maxID))
         self.sliderbar.setTickPosition(QSlider.TickPosition.TicksAbove)
         self.sliderbar.valueChanged.connect(self.update)
 
@@ -215,6 +225,27 @@ class PuzzleSelectDlg(QDialog):
         self.selectionlabel.setInputMethodHints(Qt.InputMethodHint.ImhDigitsOnly)
         self.selectionlabel.setCursor(QCursor(Qt.CursorShape.IBeamCursor))
 
+        # Random puzzle with a score in the range, looked up in the score index
+        self.minScoreBox = QDoubleSpinBox(self)
+        self.minScoreBox.setRange(0.0, 10.0)
+        self.minScoreBox.setSingleStep(0.5)
+        self.minScoreBox.setDecimals(1)
+        self.minScoreBox.setValue(0.0)
+        self.minScoreBox.setToolTip("Lowest difficulty score out of 10")
+
+        self.maxScoreBox = QDoubleSpinBox(self)
+        self.maxScoreBox.setRange(0.0, 10.0)
+        self.maxScoreBox.setSingleStep(0.5)
+        self.maxScoreBox.setDecimals(1)
+        self.maxScoreBox.setValue(10.0)
+        self.maxScoreBox.setToolTip("Highest difficulty score out of 10")
+
+        self.scoreBtn = QPushButton("Random", self)
+        self.scoreBtn.setContentsMargins(0, 0, 0, 0)
+        self.scoreBtn.setFlat(True)
+        self.scoreBtn.setToolTip("Pick a random puzzle with a score in the range")
+        self.scoreBtn.clicked.connect(self._randomInScoreRange)
+
         self.okButton = QPushButton("OK", self)
         self.okButton.setContentsMargins(0, 0, 0, 0)
         self.okButton.setFlat(True)
@@ -234,6 +265,9 @@ class PuzzleSelectDlg(QDialog):
         self.layout.addWidget(self.leftpagebtn, 0, 8, 1, 1, Qt.AlignmentFlag.AlignCenter)
         self.layout.addWidget(self.selectionlabel, 0, 2, 4, 1, Qt.AlignmentFlag.AlignTop)
         self.layout.addWidget(self.okButton, 1, 2, 4, 1, Qt.AlignmentFlag.AlignCenter)
+        self.layout.addWidget(self.minScoreBox, 5, 0, 1, 2, Qt.AlignmentFlag.AlignCenter)
+        self.layout.addWidget(self.scoreBtn, 5, 2, 1, 1, Qt.AlignmentFlag.AlignCenter)
+        self.layout.addWidget(self.maxScoreBox, 5, 7, 1, 2, Qt.AlignmentFlag.AlignCenter)
 
         self.setLayout(self.layout)
         self.show()
@@ -242,38 +276,29 @@ class PuzzleSelectDlg(QDialog):
         self.sliderbar.setValue(int(value))
         self.selectionlabel.setText(str(self.sliderbar.value()))
 
+    def _randomInScoreRange(self):
+        low, high = self.minScoreBox.value(), self.maxScoreBox.value()
+        # The score index holds the raw scores
+        puzzleID = puzzleInput.randomIDByScore(low / 10.0 * maxScore, high / 10.0 * maxScore)
+        if puzzleID is None:
+            uiLogger.warning(f"No puzzle with a score from {low:.1f} to {high:.1f} out of 10")
+            return
+        self.sliderbar.setValue(puzzleID)
+
     def _addOne(self):
-        self.sliderbar.setValue(min(self.sliderbar.value() + 1, 16402))
+        self.sliderbar.setValue(min(self.sliderbar.value() + 1, puzzleInput.maxID))
 
     def _loseOne(self):
-        self.sliderbar.setValue(max(self.sliderbar.value() - 1, 0))
+        self.sliderbar.setValue(max(self.sliderbar.value() - 1, puzzleInput.minID))
 
     def _addOneT(self):
-        self.sliderbar.setValue(min(self.sliderbar.value() + 1000, 16402))
+        self.sliderbar.setValue(min(self.sliderbar.value() + 1000, puzzleInput.maxID))
 
     def _loseOneT(self):
-        self.sliderbar.setValue(max(self.sliderbar.value() - 1000, 0))
+        self.sliderbar.setValue(max(self.sliderbar.value() - 1000, puzzleInput.minID))
 
 
 def _readPuzzleCsv():
-    from csv import DictReader
-
-    _basePath = getBasePath()
-    puzzleFile = os.path.normpath(os.path.join(_basePath, "..", "..", "resources", "puzzles.csv"))
-
-    if not os.path.isfile(puzzleFile):
-        uiLogger.error("Puzzle file %s not found", puzzleFile)
-        return None
-
-    inputPuzzle = []
-    try:
-        with open(puzzleFile, "r") as puzzleCsv:
-            puzzleReader = DictReader(puzzleCsv)
-            for row in puzzleReader:
-                inputPuzzle.append(row["Puzzle"])
-    except OSError:
-        uiLogger.error("Failed to open %s", puzzleFile)
-        return None
-
+    inputPuzzle = list(puzzleInput.puzzles())
     uiLogger.info("Puzzles imported")
     return inputPuzzle
@@ -1,6 +1,12 @@
 import logging
 import os
-from functools import cache
+from array import array
+from bisect import bisect_left, bisect_right
+from collections.abc import Iterator
+from csv import DictReader, reader
+from random import choice
+
+from PuzzleCorpus import PuzzleCorpus, convertCsv, corpusSuffix
 
 from .uiHelpers import getBasePath
 
@@ -9,50 +15,183 @@ __all__ = ["puzzleInput"]
 
 
 class PuzzleInputFile(object):
-    puzzleIDs = None
-    puzzleDifficulty = None
-    puzzles = None
-    puzzleComment = None
+    """Lazy view of resources/puzzles.csv.
+
+    Nothing is read when the object is created. The first lookup opens the packed corpus next to
+    the CSV, converting it first if it is missing or older than the CSV, which only reads the
+    corpus header. If no corpus can be written the CSV is scanned once for the byte offset of
+    every row. Rows and puzzles are only built when they are asked for.
+
+    Args:
+        puzzleFile (str): CSV file with ID, Puzzle, Score and Comment columns.
+    """
+
     basePath = getBasePath()
     puzzleFile = os.path.normpath(os.path.join(basePath, "..", "..", "resources", "puzzles.csv"))
 
-    def __init__(self):
-        uiLogger.debug("Initializing PuzzleInputFile and importing puzzles")
-        self.puzzleIDs, self.puzzleDifficulty, self.puzzles, self.puzzleComment = (
-            self._readPuzzleCsv()
-        )
-        ids = list(map(int, self.puzzleIDs))
-        self.minID = min(ids)
-        self.maxID = max(ids)
-        self.numPuzzles = len(ids)
-
-    @cache
-    def _readPuzzleCsv(self):
-        from csv import DictReader
-
-        if not os.path.isfile(self.puzzleFile):
-            uiLogger.error("Puzzle file %s not found", self.puzzleFile)
-            return None
+    def __init__(self, puzzleFile: str | None = None):
+        if puzzleFile is not None:
+            self.puzzleFile = puzzleFile
+        self.corpusFile = os.path.splitext(self.puzzleFile)[0] + corpusSuffix
+        self._isIndexed = False
+        self._corpus: PuzzleCorpus | None = None
+        # CSV fallback: header, byte offset of every row and the sorted IDs with their rows
+        self._csvHeader: list[str] | None = None
+        self._csvOffsets: array | None = None
+        self._sortedIDs: array | None = None
+        self._sortedRows: array | None = None
+        # CSV fallback of the score index, built on the first score query
+        self._scoreIndex: tuple[array, array] | None = None
 
-        puzzleIDs = []
-        puzzleDifficulty = []
-        inputPuzzle = []
-        puzzleComment = []
+    def _index(self) -> None:
+        if self._isIndexed:
+            return
+        self._isIndexed = True
         try:
-            with open(self.puzzleFile, "r") as puzzleCsv:
-                puzzleReader = DictReader(puzzleCsv)
-                for row in puzzleReader:
-                    puzzleIDs.append(row["ID"])
-                    inputPuzzle.append(row["Puzzle"])
-                    puzzleDifficulty.append(row["Score"])
-                    puzzleComment.append(row["Comment"])
-
-        except OSError:
-            uiLogger.error("Failed to open %s", self.puzzleFile)
+            if os.path.isfile(self.puzzleFile) and (
+                not os.path.isfile(self.corpusFile)
+                or os.path.getmtime(self.corpusFile) < os.path.getmtime(self.puzzleFile)
+            ):
+                uiLogger.info("Converting %s to %s", self.puzzleFile, self.corpusFile)
+                convertCsv(self.puzzleFile, self.corpusFile)
+            self._corpus = PuzzleCorpus(self.corpusFile)
+            return
+        except (OSError, ValueError, KeyError) as err:
+            uiLogger.warning("Puzzle corpus %s not available: %s", self.corpusFile, err)
+        self._indexCsv()
+
+    def _indexCsv(self) -> None:
+        """Record the byte offset and ID of every row. Rows are single lines, the puzzles.csv
+        comments do not hold line breaks.
+        """
+        self._csvOffsets = array("Q")
+        puzzleIDs = array("q")
+        try:
+            with open(self.puzzleFile, "rb") as puzzleCsv:
+                self._csvHeader = next(reader([puzzleCsv.readline().decode()]))
+                idColumn = self._csvHeader.index("ID")
+                offset = puzzleCsv.tell()
+                for line in puzzleCsv:
+                    if line.strip():
+                        self._csvOffsets.append(offset)
+                        puzzleIDs.append(int(line.split(b",", idColumn + 1)[idColumn]))
+                    offset += len(line)
+        except (OSError, StopIteration, ValueError) as err:
+            uiLogger.error("Failed to index %s: %s", self.puzzleFile, err)
+            self._csvOffsets = array("Q")
+            puzzleIDs = array("q")
+
+        order = sorted(range(len(puzzleIDs)), key=puzzleIDs.__getitem__)
+        self._sortedIDs = array("q", (puzzleIDs[i] for i in order))
+        self._sortedRows = array("Q", order)
+        uiLogger.info("Indexed %d puzzles of %s", len(puzzleIDs), self.puzzleFile)
+
+    @property
+    def numPuzzles(self) -> int:
+        self._index()
+        return len(self._corpus) if self._corpus is not None else len(self._csvOffsets)
+
+    @property
+    def minID(self) -> int:
+        self._index()
+        if self._corpus is not None:
+            return self._corpus.minID
+        return self._sortedIDs[0] if self._sortedIDs else 0
+
+    @property
+    def maxID(self) -> int:
+        self._index()
+        if self._corpus is not None:
+            return self._corpus.maxID
+        return self._sortedIDs[-1] if self._sortedIDs else 0
+
+    def indexOf(self, puzzleID: int) -> int | None:
+        """Row number of a puzzle ID, None if there is no such puzzle."""
+        self._index()
+        if self._corpus is not None:
+            return self._corpus.indexOf(puzzleID)
+        pos = bisect_left(self._sortedIDs, puzzleID)
+        if pos < len(self._sortedIDs) and self._sortedIDs[pos] == puzzleID:
+            return self._sortedRows[pos]
+        return None
+
+    def _row(self, index: int) -> dict[str, str]:
+        if self._corpus is not None:
+            return {
+                "ID": str(self._corpus.puzzleID(index)),
+                "Puzzle": self._corpus.puzzle(index),
+                "Score": f"{self._corpus.score(index):g}",
+                "Comment": self._corpus.comment(index),
+            }
+        with open(self.puzzleFile, "r", newline="") as puzzleCsv:
+            puzzleCsv.seek(self._csvOffsets[index])
+            return next(DictReader([puzzleCsv.readline()], fieldnames=self._csvHeader))
+
+    def row(self, puzzleID: int) -> dict[str, str] | None:
+        """The CSV row of a puzzle ID as a dict of strings, None if there is no such puzzle."""
+        index = self.indexOf(puzzleID)
+        return None if index is None else self._row(index)
+
+    def puzzle(self, puzzleID: int) -> str | None:
+        """The puzzle with this ID as an 81 character string, None if there is no such puzzle."""
+        index = self.indexOf(puzzleID)
+        if index is None:
             return None
+        if self._corpus is not None:
+            return self._corpus.puzzle(index)
+        return self._row(index)["Puzzle"]
+
+    def rows(self, start: int = 0, stop: int | None = None) -> Iterator[dict[str, str]]:
+        """Yield the rows start to stop, in file order, one at a time."""
+        self._index()
+        stop = self.numPuzzles if stop is None else min(stop, self.numPuzzles)
+        if self._corpus is not None:
+            for index in range(start, stop):
+                yield self._row(index)
+            return
+        if start >= stop:
+            return
+        with open(self.puzzleFile, "r", newline="") as puzzleCsv:
+            puzzleCsv.seek(self._csvOffsets[start])
+            rowReader = DictReader(puzzleCsv, fieldnames=self._csvHeader)
+            for _, row in zip(range(start, stop), rowReader):
+                yield row
+
+    def puzzles(self, start: int = 0, stop: int | None = None) -> Iterator[str]:
+        """Yield the puzzle strings of rows start to stop, one at a time."""
+        self._index()
+        if self._corpus is not None:
+            yield from self._corpus.puzzles(start, stop)
+        else:
+            for row in self.rows(start, stop):
+                yield row["Puzzle"]
+
+    def _csvScoreIndex(self) -> tuple[array, array]:
+        """Scores sorted and the ID of each, for when there is no corpus to index."""
+        if self._scoreIndex is None:
+            scored = sorted((float(row["Score"] or 0.0), int(row["ID"])) for row in self.rows())
+            self._scoreIndex = (
+                array("d", (score for score, _ in scored)),
+                array("q", (puzzleID for _, puzzleID in scored)),
+            )
+        return self._scoreIndex
+
+    def idsByScore(self, low: float, high: float) -> list[int]:
+        """IDs of the puzzles with a score in [low, high], easiest first."""
+        self._index()
+        if self._corpus is not None:
+            return [self._corpus.puzzleID(i) for i in self._corpus.scoreIndex().indices(low, high)]
+        scores, puzzleIDs = self._csvScoreIndex()
+        return puzzleIDs[bisect_left(scores, low) : bisect_right(scores, high)].tolist()
 
-        uiLogger.info("All Puzzles imported")
-        return puzzleIDs, puzzleDifficulty, inputPuzzle, puzzleComment
+    def randomIDByScore(self, low: float, high: float) -> int | None:
+        """ID of a random puzzle with a score in [low, high], None if there is none."""
+        self._index()
+        if self._corpus is not None:
+            indices = self._corpus.scoreIndex().indices(low, high)
+            return self._corpus.puzzleID(choice(indices)) if len(indices) else None
+        puzzleIDs = self.idsByScore(low, high)
+        return choice(puzzleIDs) if puzzleIDs else None
 
 
 puzzleInput = PuzzleInputFile()
@@ -7,6 +7,7 @@ from PyQt6.QtCore import Qt
 from PyQt6.QtGui import QCursor, QIcon
 from PyQt6.QtWidgets import (
     QDialog,
+    QDoubleSpinBox,
     QFrame,
     QGridLayout,
     QLabel,
@@ -329,12 +330,33 @@ class PuzzleSelectDlg(QDialog):
         self.selectionlabel.setInputMethodHints(Qt.InputMethodHint.ImhDigitsOnly)
         self.selectionlabel.setCursor(QCursor(Qt.CursorShape.IBeamCursor))
 
+        # Random puzzle with a score in the range, looked up in the score index
+        self.minScoreBox = QDoubleSpinBox(self)
+        self.minScoreBox.setRange(0.0, 10.0)
+        self.minScoreBox.setSingleStep(0.5)
+        self.minScoreBox.setDecimals(1)
+        self.minScoreBox.setValue(0.0)
+        self.minScoreBox.setToolTip("Lowest difficulty score")
+
+        self.maxScoreBox = QDoubleSpinBox(self)
+        self.maxScoreBox.setRange(0.0, 10.0)
+        self.maxScoreBox.setSingleStep(0.5)
+        self.maxScoreBox.setDecimals(1)
+        self.maxScoreBox.setValue(10.0)
+        self.maxScoreBox.setToolTip("Highest difficulty score")
+
+        self.scoreBtn = QPushButton("Random", self)
+        self.scoreBtn.setContentsMargins(0, 0, 0, 0)
+        self.scoreBtn.setFlat(True)
+        self.scoreBtn.setToolTip("Pick a random puzzle with a score in the range")
+        self.scoreBtn.clicked.connect(self._randomInScoreRange)
+
         self.okButton = QPushButton("OK", self)
         self.okButton.setContentsMargins(0, 0, 0, 0)
         self.okButton.setFlat(True)
         self.okButton.setFixedWidth(20)
         self.okButton.clicked.connect(
-            lambda state: _setUiPuzzle(puzzleInput.puzzles[self.sliderbar.value()])
+            lambda state: _setUiPuzzle(puzzleInput.puzzle(self.sliderbar.value()))
         )
         self.okButton.clicked.connect(self.close)
         self.okButton.clicked.connect(grabPuzzleFrame().toggleLock)
@@ -348,6 +370,9 @@ class PuzzleSelectDlg(QDialog):
         self.layout.addWidget(self.leftpagebtn, 0, 8, 1, 1, Qt.AlignmentFlag.AlignCenter)
         self.layout.addWidget(self.selectionlabel, 0, 2, 4, 1, Qt.AlignmentFlag.AlignTop)
         self.layout.addWidget(self.okButton, 1, 2, 4, 1, Qt.AlignmentFlag.AlignCenter)
+        self.layout.addWidget(self.minScoreBox, 5, 0, 1, 2, Qt.AlignmentFlag.AlignCenter)
+        self.layout.addWidget(self.scoreBtn, 5, 2, 1, 1, Qt.AlignmentFlag.AlignCenter)
+        self.layout.addWidget(self.maxScoreBox, 5, 7, 1, 2, Qt.AlignmentFlag.AlignCenter)
 
         self.setLayout(self.layout)
         self.show()
@@ -357,17 +382,25 @@ class PuzzleSelectDlg(QDialog):
         self.sliderbar.setValue(int(value))
         self.selectionlabel.setText(str(self.sliderbar.value()))
 
+    def _randomInScoreRange(self):
+        low, high = self.minScoreBox.value(), self.maxScoreBox.value()
+        puzzleID = puzzleInput.randomIDByScore(low, high)
+        if puzzleID is None:
+            uiLogger.warning(f"No puzzle with a score from {low:.1f} to {high:.1f}")
+            return
+        self.sliderbar.setValue(puzzleID)
+
     def _addOne(self):
-        self.sliderbar.setValue(min(self.sliderbar.value() + 1, 16402))
+        self.sliderbar.setValue(min(self.sliderbar.value() + 1, puzzleInput.maxID))
 
     def _loseOne(self):
-        self.sliderbar.setValue(max(self.sliderbar.value() - 1, 0))
+        self.sliderbar.setValue(max(self.sliderbar.value() - 1, puzzleInput.minID))
 
     def _addOneT(self):
-        self.sliderbar.setValue(min(self.sliderbar.value() + 1000, 16402))
+        self.sliderbar.setValue(min(self.sliderbar.value() + 1000, puzzleInput.maxID))
 
     def _loseOneT(self):
-        self.sliderbar.setValue(max(self.sliderbar.value() - 1000, 0))
+        self.sliderbar.setValue(max(self.sliderbar.value() - 1000, puzzleInput.minID))
 
 
 def _setUiPuzzle(dotPuzzle) -> None:
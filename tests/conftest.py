@@ -0,0 +1,36 @@
+"""
+Puzzles shared by the tests. The tests import the modules from src/ like the application does,
+and run with the persistent solution store turned off so they never read or write the store in
+the home directory.
+"""
+
+import os
+
+# Set before any module opens the store, worker processes inherit it
+os.environ["SUDOKU_SOLVER_STORE"] = ""
+
+import pytest
+
+# Puzzles with exactly one solution, from resources/samples.ini and AI Escargot
+solvablePuzzles: dict[str, str] = {
+    "easy": ".15.7....4..8..75...8..9.169641.7.3..8239.5..5....4.9..2.41.8....17.39.4...92..65",
+    "hard": "..9..763.........5...5.1.48.....682.....18.....47..1..4.596..8.763.......2.37.51.",
+    "evil": "..9..1.7....4...6.5....29.4.3...5.....62..1.8.......4.......7..6...1......18..2.9",
+    "escargot": "1....7.9..3..2...8..96..5....53..9...1..8...26....4...3......1..4......7..7...3..",
+}
+
+# Puzzles without a solution, one breaks a rule outright and one only after propagation
+contradictoryPuzzles: dict[str, str] = {
+    "duplicate": "11" + "." * 79,
+    "noValueLeft": ".23456789" + "1" + "." * 71,
+}
+
+
+@pytest.fixture(params=sorted(solvablePuzzles))
+def solvablePuzzle(request) -> str:
+    return solvablePuzzles[request.param]
+
+
+@pytest.fixture(params=sorted(contradictoryPuzzles))
+def contradictoryPuzzle(request) -> str:
+    return contradictoryPuzzles[request.param]
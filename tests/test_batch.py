@@ -0,0 +1,151 @@
+"""Batches solved on a pool of worker processes, with results streamed or in shared memory."""
+
+import os
+from itertools import cycle, islice
+
+import pytest
+from conftest import contradictoryPuzzles, solvablePuzzles
+from Puzzle import SudokuPuzzle
+from PuzzleBatch import (
+    STATUS_SOLVED,
+    STATUS_TIMEOUT,
+    STATUS_UNSOLVABLE,
+    SharedBatchResults,
+    SolverPool,
+    solveMany,
+    solveManyShared,
+)
+
+# Hard ones first, so with two workers the easy ones tend to finish before them
+puzzleStrings: list[str] = [
+    solvablePuzzles["escargot"],
+    solvablePuzzles["evil"],
+    contradictoryPuzzles["noValueLeft"],
+    solvablePuzzles["hard"],
+    solvablePuzzles["easy"],
+    contradictoryPuzzles["duplicate"],
+] * 3
+
+
+def _solutionString(puzzleString: str) -> str | bool:
+    puzzle = SudokuPuzzle(value=puzzleString)
+    result = puzzle.solve(useCache=False, useStore=False)
+    return result["solution"] and "".join(result["solution"][sq] for sq in puzzle.squares)
+
+
+expectedSolutions: list[str | bool] = [_solutionString(pzl) for pzl in puzzleStrings]
+
+
+@pytest.mark.parametrize("workers", [1, 2])
+def testOrdered(workers):
+    results = list(
+        solveMany(puzzleStrings, workers=workers, ordered=True, chunkSize=2, useCache=False)
+    )
+    assert [result["index"] for result in results] == list(range(len(puzzleStrings)))
+    assert [result["solution"] for result in results] == expectedSolutions
+
+
+def testUnordered():
+    results = list(solveMany(puzzleStrings, workers=2, chunkSize=1, useCache=False))
+    assert sorted(result["index"] for result in results) == list(range(len(puzzleStrings)))
+    for result in results:
+        assert result["solution"] == expectedSolutions[result["index"]]
+
+
+@pytest.mark.parametrize("ordered", [False, True])
+def testInputIsReadLazily(ordered):
+    numRead = 0
+
+    def _endless():
+        nonlocal numRead
+        for puzzleString in cycle(puzzleStrings):
+            numRead += 1
+            yield puzzleString
+
+    chunkSize, maxInFlight = 2, 3
+    with SolverPool(workers=2) as pool:
+        results = pool.solveMany(_endless(), ordered, chunkSize, maxInFlight, useCache=False)
+        for numYielded, _ in enumerate(islice(results, 10), 1):
+            # Chunks are only read while fewer than maxInFlight are submitted or held back, and
+            # every chunk yielded in full frees one place
+            numChunksYielded = (numYielded - 1) // chunkSize
+            assert numRead <= (maxInFlight + numChunksYielded) * chunkSize
+        results.close()
+
+
+def testWorkerInitTimes():
+    with SolverPool(workers=2) as pool:
+        initTimes = pool.warmup()
+        assert len(initTimes) == 2
+        assert os.getpid() not in initTimes
+        assert all(initTime_ms > 0.0 for initTime_ms in initTimes.values())
+        results = list(pool.solveMany(puzzleStrings, chunkSize=1, useCache=False))
+        assert len(results) == len(puzzleStrings)
+        # Solve times do not include bringing the runtime up, which the workers did once
+        assert pool.workerInitTimes_ms == initTimes
+
+
+def testSharedResultsLayout():
+    numPuzzles = 3
+    with SharedBatchResults(numPuzzles) as results:
+        assert SharedBatchResults.recordSize == 98
+        assert results.shm.size >= numPuzzles * SharedBatchResults.recordSize
+        columns = {
+            "duration_ms": ("d", 8),
+            "numRecursions": ("i", 4),
+            "numOperations": ("i", 4),
+            "status": ("B", 1),
+            "solutions": ("B", 81),
+        }
+        offset = 0
+        for column, (fmt, width) in columns.items():
+            view = getattr(results, column)
+            assert view.format == fmt
+            assert view.nbytes == numPuzzles * width
+            # Every column is a view of the block itself, aligned for its type
+            assert view.obj is results.shm.buf.obj
+            assert offset % view.itemsize == 0
+            offset += view.nbytes
+
+        solution = _solutionString(solvablePuzzles["easy"])
+        result = {"solution": solution, "numRecursions": 7, "numOperations": 9, "duration_ms": 1.5}
+        results.write(1, result)
+        attached = SharedBatchResults(numPuzzles, results.name)
+        try:
+            assert attached.solution(1) == solution
+            assert attached.numRecursions[1] == 7
+            assert attached.duration_ms[1] == 1.5
+            assert attached.solution(0) is None
+            attached.numOperations[2] = 4
+            assert results.numOperations[2] == 4
+        finally:
+            attached.close()
+
+
+@pytest.mark.parametrize("workers", [1, 2])
+def testSolveManyShared(workers):
+    sharedResults = solveManyShared(puzzleStrings, workers=workers, chunkSize=4, useCache=False)
+    with sharedResults as results:
+        assert results.numPuzzles == len(puzzleStrings)
+        for index, expected in enumerate(expectedSolutions):
+            assert results.solution(index) == (expected or None)
+            assert results.status[index] == (STATUS_SOLVED if expected else STATUS_UNSOLVABLE)
+            assert results.duration_ms[index] > 0.0
+
+    hardPuzzles = [solvablePuzzles["escargot"]] * 4
+    sharedResults = solveManyShared(hardPuzzles, workers=workers, maxNodes=1, useCache=False)
+    with sharedResults as results:
+        assert list(results.status) == [STATUS_TIMEOUT] * 4
+
+
+def testCancel():
+    hardPuzzles = [solvablePuzzles["escargot"]] * 50
+    with SolverPool(workers=1) as pool:
+        plain = pool.submit(hardPuzzles[:1], useCache=False)
+        cancelled = pool.submit(hardPuzzles, cancellable=True, useCache=False)
+        pool.cancel()
+        assert {result["status"] for result in cancelled.result()} == {"cancelled"}
+        assert plain.result()[0]["status"] == "solved"
+        # Only chunks submitted before cancel are cancelled
+        later = pool.submit(hardPuzzles[:1], cancellable=True, useCache=False)
+        assert later.result()[0]["status"] == "solved"
@@ -0,0 +1,109 @@
+"""Solves bounded by time, search nodes or a cancel token report why they stopped."""
+
+import threading
+from time import perf_counter, sleep
+
+import pytest
+from conftest import solvablePuzzles
+from Puzzle import SudokuPuzzle
+from PuzzleBatch import SolverPool
+from PuzzleCache import solutionCache
+from py2runtime import pythonRuntimes
+from solver import PyParallelSolver
+
+# Needs guesses with every solver, so a budget of one node is always too small
+hardPuzzle: str = solvablePuzzles["escargot"]
+
+
+@pytest.fixture(autouse=True, scope="module")
+def _stopParallelPools():
+    yield
+    PyParallelSolver.shutdown()
+
+
+def _solve(runtime: str, **budgets) -> dict:
+    puzzle = SudokuPuzzle(lang=runtime, value=hardPuzzle)
+    return puzzle.solve(useCache=False, useStore=False, **budgets)
+
+
+@pytest.mark.parametrize("runtime", pythonRuntimes)
+def testGenerousBudgetsSolve(runtime):
+    result = _solve(runtime, timeLimit_ms=60000, maxNodes=10**7, cancelToken=threading.Event())
+    assert result["status"] == "solved"
+    assert result["solution"]
+
+
+@pytest.mark.parametrize("runtime", pythonRuntimes)
+def testNodeLimitTimesOut(runtime):
+    result = _solve(runtime, maxNodes=1)
+    assert result["status"] == "timeout"
+    assert result["solution"] is False
+    assert result["numNodes"] >= 1
+
+
+@pytest.mark.parametrize("runtime", pythonRuntimes)
+def testTimeLimitTimesOut(runtime):
+    result = _solve(runtime, timeLimit_ms=0)
+    assert result["status"] == "timeout"
+    assert result["solution"] is False
+
+
+@pytest.mark.parametrize("runtime", pythonRuntimes)
+def testCancelTokenCancels(runtime):
+    cancelToken = threading.Event()
+    cancelToken.set()
+    result = _solve(runtime, cancelToken=cancelToken)
+    assert result["status"] == "cancelled"
+    assert result["solution"] is False
+
+
+class _SlowToken(object):
+    """Cancel token that is never set but sleeps on every check, which takes wall clock time
+    and next to no cpu time.
+    """
+
+    def is_set(self) -> bool:
+        sleep(0.02)
+        return False
+
+
+@pytest.mark.parametrize("runtime", ["lua", "luajit"])
+def testLuaTimeLimitIsWallClock(runtime):
+    pytest.importorskip("lupa")
+    tStart = perf_counter()
+    # The second check is past the limit, lua solves the puzzle in a few more nodes than that
+    result = _solve(runtime, timeLimit_ms=30, cancelToken=_SlowToken())
+    assert result["status"] == "timeout"
+    assert 30 <= result["duration_ms"] <= (perf_counter() - tStart) * 1000.0
+
+
+@pytest.mark.parametrize("workers", [1, 2])
+def testParallelFrontierIsBounded(workers):
+    # A deep frontier takes many nodes to expand, the budgets stop the expansion itself
+    result = _solve("pyparallel", maxNodes=5, frontierDepth=8, workers=workers)
+    assert result["status"] == "timeout"
+    assert result["numNodes"] == 5
+    assert result["numSubtrees"] == 0
+    cancelToken = threading.Event()
+    cancelToken.set()
+    result = _solve("pyparallel", cancelToken=cancelToken, frontierDepth=8, workers=workers)
+    assert result["status"] == "cancelled"
+    assert result["numNodes"] == 0
+
+
+@pytest.mark.parametrize("runtime", ["python", "pybits"])
+def testPoolPassesBudgets(runtime):
+    with SolverPool(workers=1, runtime=runtime) as pool:
+        results = list(pool.solveMany([hardPuzzle] * 2, ordered=True, maxNodes=1))
+        assert [result["status"] for result in results] == ["timeout", "timeout"]
+        results = list(pool.solveMany([hardPuzzle], timeLimit_ms=60000))
+        assert results[0]["status"] == "solved"
+
+
+def testUnfinishedSolvesAreNotCached():
+    solutionCache.clear()
+    SudokuPuzzle(value=hardPuzzle).solve(maxNodes=1, useStore=False)
+    assert len(solutionCache) == 0
+    SudokuPuzzle(value=hardPuzzle).solve(useStore=False)
+    assert len(solutionCache) == 1
+    solutionCache.clear()
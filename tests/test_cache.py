@@ -0,0 +1,103 @@
+"""Canonical forms map every symmetric copy of a puzzle to one cache entry."""
+
+import pytest
+from conftest import solvablePuzzles
+from Puzzle import SudokuPuzzle
+from PuzzleCache import SolutionCache, canonicalForm, fromCanonical, solutionCache
+
+
+def _relabel(puzzleString: str, labels: str = "912345678") -> str:
+    return puzzleString.translate(str.maketrans("123456789", labels))
+
+
+def _transpose(puzzleString: str) -> str:
+    return "".join(puzzleString[9 * col + row] for row in range(9) for col in range(9))
+
+
+def _swapBands(puzzleString: str) -> str:
+    return puzzleString[27:54] + puzzleString[:27] + puzzleString[54:]
+
+
+def _swapStacks(puzzleString: str) -> str:
+    rows = [puzzleString[9 * row : 9 * row + 9] for row in range(9)]
+    return "".join(row[6:] + row[3:6] + row[:3] for row in rows)
+
+
+symmetries = {
+    "relabel": _relabel,
+    "transpose": _transpose,
+    "bands": _swapBands,
+    "stacks": _swapStacks,
+    "all": lambda pzl: _relabel(_swapStacks(_swapBands(_transpose(pzl))), "987654321"),
+}
+
+
+def _solutionString(puzzleString: str) -> str:
+    puzzle = SudokuPuzzle(value=puzzleString)
+    result = puzzle.solve(useCache=False, useStore=False)
+    return "".join(result["solution"][sq] for sq in puzzle.squares)
+
+
+@pytest.fixture
+def emptyCache():
+    solutionCache.clear()
+    yield solutionCache
+    solutionCache.clear()
+
+
+def testCanonicalFormRoundTrips(solvablePuzzle):
+    canonical, transform = canonicalForm(solvablePuzzle)
+    assert len(canonical) == 81
+    assert fromCanonical(canonical, transform) == solvablePuzzle
+
+
+@pytest.mark.parametrize("symmetry", sorted(symmetries))
+def testSymmetricCopiesShareTheCanonicalForm(symmetry, solvablePuzzle):
+    copy = symmetries[symmetry](solvablePuzzle)
+    assert copy != solvablePuzzle
+    canonical, transform = canonicalForm(copy)
+    assert canonical == canonicalForm(solvablePuzzle)[0]
+    assert fromCanonical(canonical, transform) == copy
+
+
+@pytest.mark.parametrize("symmetry", sorted(symmetries))
+def testCacheAnswersSymmetricCopies(symmetry):
+    puzzleString = solvablePuzzles["hard"]
+    cache = SolutionCache()
+    cache.put(puzzleString, {"solution": _solutionString(puzzleString), "status": "solved"})
+
+    copy = symmetries[symmetry](puzzleString)
+    hit = cache.get(copy)
+    assert hit["status"] == "solved"
+    assert hit["solution"] == symmetries[symmetry](_solutionString(puzzleString))
+    assert cache.stats()["numHits"] == 1
+
+
+def testCacheEvictsTheLeastRecentlyUsed():
+    cache = SolutionCache(maxSize=2)
+    easy, hard, evil = (solvablePuzzles[name] for name in ("easy", "hard", "evil"))
+    for puzzleString in (easy, hard):
+        cache.put(puzzleString, {"solution": False, "status": "unsolvable"})
+    assert cache.get(easy) is not None
+    cache.put(evil, {"solution": False, "status": "unsolvable"})
+    assert cache.get(hard) is None
+    assert cache.get(easy) is not None
+    assert cache.stats()["numEvictions"] == 1
+
+
+def testSolveUsesTheCache(emptyCache):
+    puzzleString = solvablePuzzles["evil"]
+    first = SudokuPuzzle(value=puzzleString).solve(useStore=False)
+    assert "cacheHit" not in first
+
+    copy = _relabel(_transpose(puzzleString))
+    puzzle = SudokuPuzzle(value=copy)
+    hit = puzzle.solve(useStore=False)
+    assert hit["cacheHit"]
+    assert hit["runtime"] == "python"
+    assert "".join(hit["solution"][sq] for sq in puzzle.squares) == _solutionString(copy)
+
+
+def testSolverOptionsSkipTheCache(emptyCache):
+    SudokuPuzzle(value=solvablePuzzles["easy"]).solve(useStore=False, rules=("hiddenSingles",))
+    assert len(emptyCache) == 0
@@ -0,0 +1,161 @@
+"""Packed puzzle corpus files converted from puzzles.csv style files."""
+
+import csv
+import os
+import sys
+
+import pytest
+from conftest import solvablePuzzles
+from PuzzleCorpus import (
+    FLAG_CONSECUTIVE_IDS,
+    PuzzleCorpus,
+    buildScoreIndex,
+    convertCsv,
+    defaultScoreBands,
+    isCorpusFile,
+)
+
+
+def _rows(puzzleIDs: list[int]) -> list[dict[str, str]]:
+    """One row per ID, cycling through the sample puzzles with blanks written as 0."""
+    puzzles = list(solvablePuzzles.values())
+    return [
+        {
+            "ID": str(puzzleID),
+            "Puzzle": puzzles[num % len(puzzles)].replace(".", "0"),
+            "Score": f"{(num * 37 % 85) / 10:.1f}",
+            "Comment": f"row {num}" if num % 3 else "",
+        }
+        for num, puzzleID in enumerate(puzzleIDs)
+    ]
+
+
+def _writeCsv(path, rows: list[dict[str, str]]) -> str:
+    with open(path, "w", newline="") as csvFile:
+        writer = csv.DictWriter(csvFile, fieldnames=["ID", "Puzzle", "Score", "Comment"])
+        writer.writeheader()
+        writer.writerows(rows)
+    return str(path)
+
+
+consecutiveIDs: list[int] = list(range(100, 140))
+# Out of order and with gaps, so the corpus needs its ID index
+gappedIDs: list[int] = [7, 3, 250, 12, 11, 99999, 40, 41, 1000, 5]
+
+
+@pytest.fixture(params=["consecutive", "gapped"])
+def corpusRows(request, tmp_path):
+    rows = _rows(consecutiveIDs if request.param == "consecutive" else gappedIDs)
+    corpusPath = convertCsv(_writeCsv(tmp_path / "puzzles.csv", rows))
+    with PuzzleCorpus(corpusPath) as corpus:
+        yield corpus, rows
+
+
+def testConvertWritesEveryRow(corpusRows):
+    corpus, rows = corpusRows
+    assert isCorpusFile(corpus.path)
+    assert corpus.path.endswith(".sdkc")
+    assert len(corpus) == len(rows)
+    for index, row in enumerate(rows):
+        assert corpus.puzzleID(index) == int(row["ID"])
+        assert corpus.puzzle(index) == row["Puzzle"].replace("0", ".")
+        assert corpus.score(index) == pytest.approx(float(row["Score"]), abs=1e-6)
+        assert corpus.comment(index) == row["Comment"]
+    assert list(corpus) == [row["Puzzle"].replace("0", ".") for row in rows]
+
+
+def testByID(corpusRows):
+    corpus, rows = corpusRows
+    puzzleIDs = [int(row["ID"]) for row in rows]
+    assert bool(corpus.flags & FLAG_CONSECUTIVE_IDS) == (puzzleIDs == consecutiveIDs)
+    for index, row in enumerate(rows):
+        assert corpus.indexOf(int(row["ID"])) == index
+        assert corpus.byID(int(row["ID"])) == row["Puzzle"].replace("0", ".")
+    assert corpus.minID == min(puzzleIDs)
+    assert corpus.maxID == max(puzzleIDs)
+    for missingID in (min(puzzleIDs) - 1, max(puzzleIDs) + 1, 0, 6, 42):
+        if missingID not in puzzleIDs:
+            assert corpus.indexOf(missingID) is None
+            assert corpus.byID(missingID) is None
+
+
+def testConvertWithoutComments(tmp_path):
+    csvPath = _writeCsv(tmp_path / "puzzles.csv", _rows(gappedIDs))
+    with PuzzleCorpus(convertCsv(csvPath, str(tmp_path / "bare.sdkc"), False)) as corpus:
+        assert [corpus.comment(index) for index in range(len(corpus))] == [""] * len(gappedIDs)
+
+
+def testFailedConvertLeavesNoFile(tmp_path):
+    rows = _rows(consecutiveIDs)
+    rows[5]["ID"] = "not a number"
+    csvPath = _writeCsv(tmp_path / "puzzles.csv", rows)
+    with pytest.raises(ValueError):
+        convertCsv(csvPath)
+    assert sorted(os.listdir(tmp_path)) == ["puzzles.csv"]
+
+
+def testRejectsOtherFiles(tmp_path):
+    csvPath = _writeCsv(tmp_path / "puzzles.csv", _rows(consecutiveIDs))
+    assert not isCorpusFile(csvPath)
+    with pytest.raises(ValueError):
+        PuzzleCorpus(csvPath)
+
+
+@pytest.fixture(params=["numpy", "noNumpy"])
+def scoredCorpus(request, tmp_path, monkeypatch):
+    if request.param == "noNumpy":
+        monkeypatch.setitem(sys.modules, "numpy", None)
+    else:
+        pytest.importorskip("numpy")
+    corpusPath = convertCsv(_writeCsv(tmp_path / "puzzles.csv", _rows(gappedIDs * 5)))
+    with PuzzleCorpus(corpusPath) as corpus:
+        yield corpus
+
+
+def _scores(corpus: PuzzleCorpus) -> list[float]:
+    """Scores as written to the CSV, the corpus stores them as float32."""
+    return [round(corpus.score(i), 4) for i in range(len(corpus))]
+
+
+@pytest.mark.parametrize("low, high", [(0.0, 8.5), (2.0, 4.0), (3.7, 3.7), (6.5, 8.5), (5, 1)])
+def testScoreRanges(scoredCorpus, low, high):
+    corpus = scoredCorpus
+    index = corpus.scoreIndex()
+    expected = [i for i, score in enumerate(_scores(corpus)) if low <= score <= high]
+    found = list(index.indices(low, high))
+    assert sorted(found) == expected
+    assert index.count(low, high) == len(expected)
+    foundScores = [corpus.score(i) for i in found]
+    assert foundScores == sorted(foundScores)
+    assert list(corpus.byScore(low, high)) == [corpus.puzzle(i) for i in found]
+
+
+def testScoreSample(scoredCorpus):
+    corpus = scoredCorpus
+    index = corpus.scoreIndex()
+    samples = index.sample(3, seed=5)
+    assert samples == index.sample(3, seed=5)
+    assert list(samples) == list(zip(defaultScoreBands, defaultScoreBands[1:]))
+    for bandIdx, ((low, high), records) in enumerate(samples.items()):
+        # Only the last band includes its upper edge
+        isLastBand = bandIdx == len(samples) - 1
+        inBand = [
+            i
+            for i, score in enumerate(_scores(corpus))
+            if low <= score < high or (isLastBand and score == high)
+        ]
+        assert len(records) == min(3, len(inBand))
+        assert len(set(records)) == len(records)
+        assert set(records) <= set(inBand)
+    numSampled = sum(min(2, len(records)) for records in index.sample(len(corpus)).values())
+    assert len(list(corpus.sampleByScore(2, seed=1))) == numSampled
+
+
+def testScoreIndexIsRebuiltWhenStale(tmp_path):
+    csvPath = _writeCsv(tmp_path / "puzzles.csv", _rows(consecutiveIDs))
+    with PuzzleCorpus(convertCsv(csvPath)) as corpus:
+        buildScoreIndex(corpus)
+    corpusPath = convertCsv(_writeCsv(csvPath, _rows(gappedIDs)))
+    with PuzzleCorpus(corpusPath) as corpus:
+        assert len(corpus.scoreIndex()) == len(gappedIDs)
+        assert corpus.scoreIndex().count(0.0, 8.5) == len(gappedIDs)
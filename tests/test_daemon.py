@@ -0,0 +1,90 @@
+"""Round trips to a solver daemon on a Unix domain socket."""
+
+import os
+import threading
+import time
+
+import pytest
+from conftest import contradictoryPuzzles, solvablePuzzles
+from Puzzle import SudokuPuzzle
+from PuzzleClient import DaemonError, daemonStatus, request, solveMany, solvePuzzles, stopDaemon
+from PuzzleDaemon import SolverDaemon
+
+
+@pytest.fixture
+def socketPath(tmp_path):
+    """Path of a daemon running on a background thread, stopped after the test."""
+    path = str(tmp_path / "daemon.sock")
+    daemonThread = threading.Thread(target=SolverDaemon(path, ["python"]).run, daemon=True)
+    daemonThread.start()
+    deadline = time.monotonic() + 30.0
+    while True:
+        try:
+            if daemonStatus(path)["runtimes"]["python"]["state"] == "ready":
+                break
+        except DaemonError:
+            pass
+        assert time.monotonic() < deadline, "Solver daemon did not come up"
+        time.sleep(0.01)
+    yield path
+    if os.path.exists(path):
+        stopDaemon(path)
+    daemonThread.join(10.0)
+
+
+def _solutionString(puzzleString: str) -> str:
+    puzzle = SudokuPuzzle(value=puzzleString)
+    result = puzzle.solve(useCache=False, useStore=False)
+    return "".join(result["solution"][sq] for sq in puzzle.squares)
+
+
+def testStatus(socketPath):
+    status = daemonStatus(socketPath)
+    assert status["pid"] == os.getpid()
+    assert status["socket"] == socketPath
+    python = status["runtimes"]["python"]
+    # The python solvers are interpreted, their first solve only loads modules
+    assert python["compiled"] is False
+    assert python["compile_ms"] >= 0.0
+    assert python["warmSolve_ms"] > 0.0
+    assert python["numSolved"] == 0
+
+
+def testSolve(socketPath):
+    puzzleStrings = [solvablePuzzles["hard"], contradictoryPuzzles["duplicate"]]
+    results = solvePuzzles(puzzleStrings, "python", socketPath, useCache=False)
+    assert [result["status"] for result in results] == ["solved", "unsolvable"]
+    assert results[0]["solution"] == _solutionString(puzzleStrings[0])
+    results = list(solveMany(puzzleStrings * 2, "python", socketPath, chunkSize=3))
+    assert [result["index"] for result in results] == [0, 1, 2, 3]
+    assert daemonStatus(socketPath)["runtimes"]["python"]["numSolved"] == 6
+
+
+@pytest.mark.parametrize("runtime", ["luajit", "lua"])
+def testLuaIsWarmedOnFirstUse(socketPath, runtime):
+    pytest.importorskip("lupa")
+    results = solvePuzzles([solvablePuzzles["easy"]], runtime, socketPath, useCache=False)
+    assert results[0]["solution"] == _solutionString(solvablePuzzles["easy"])
+    status = daemonStatus(socketPath)["runtimes"][runtime]
+    assert status["state"] == "ready"
+    # Only LuaJIT compiles the solver to machine code
+    assert status["compiled"] is (runtime == "luajit")
+
+
+def testBadRequests(socketPath):
+    with pytest.raises(DaemonError, match="Unknown op"):
+        request({"op": "explode"}, socketPath)
+    with pytest.raises(DaemonError, match="Invalid runtime"):
+        solvePuzzles([solvablePuzzles["easy"]], "cobol", socketPath)
+    # The daemon keeps serving after a bad request
+    assert daemonStatus(socketPath)["runtimes"]["python"]["state"] == "ready"
+
+
+def testStop(socketPath):
+    stopDaemon(socketPath)
+    deadline = time.monotonic() + 10.0
+    while os.path.exists(socketPath):
+        assert time.monotonic() < deadline, "Solver daemon did not stop"
+        time.sleep(0.01)
+    with pytest.raises(DaemonError, match="No solver daemon"):
+        daemonStatus(socketPath)
@@ -0,0 +1,105 @@
+"""Every puzzle file format reads back the same puzzles, plain or compressed."""
+
+import gzip
+import io
+import json
+import lzma
+
+import pytest
+from conftest import solvablePuzzles
+from PuzzleFormats import normalizePuzzle, puzzleFormats, readPuzzleFile
+
+puzzles: list[str] = list(solvablePuzzles.values())
+
+
+def _lines() -> str:
+    lines = "".join(f"{pzl.replace('.', '0')} comment {num}\n" for num, pzl in enumerate(puzzles))
+    return "# one puzzle per line\n\n" + lines
+
+
+def _csv() -> str:
+    rows = "".join(f"{num},{pzl},{num / 2}\n" for num, pzl in enumerate(puzzles))
+    return "ID,Puzzle,Score\n" + rows
+
+
+def _jsonl() -> str:
+    values = [
+        puzzles[0],
+        {"puzzle": puzzles[1]},
+        [[int(c) if c != "." else 0 for c in puzzles[2][9 * r : 9 * r + 9]] for r in range(9)],
+        {"quizzes": puzzles[3].replace(".", "0")},
+    ]
+    return "".join(json.dumps(value) + "\n" for value in values)
+
+
+def _grid() -> str:
+    grids = []
+    for pzl in puzzles:
+        rows = []
+        for r in range(9):
+            row = pzl[9 * r : 9 * r + 9]
+            rows.append(f"{row[:3]}|{row[3:6]}|{row[6:]}")
+            if r in (2, 5):
+                rows.append("---+---+---")
+        grids.append("\n".join(rows))
+    return "[Puzzle]\n" + "\n\n".join(grids) + "\n"
+
+
+writers = {"lines": _lines, "csv": _csv, "jsonl": _jsonl, "grid": _grid}
+suffixes = {"lines": ".txt", "csv": ".csv", "jsonl": ".jsonl", "grid": ".sdk"}
+compressors = {
+    "plain": (lambda data: data, ""),
+    "gzip": (gzip.compress, ".gz"),
+    "xz": (lzma.compress, ".xz"),
+}
+
+
+def _writeFile(tmp_path, puzzleFormat: str, compression: str, withSuffix: bool = True) -> str:
+    compress, compressionSuffix = compressors[compression]
+    name = "puzzles" + (suffixes[puzzleFormat] + compressionSuffix if withSuffix else "")
+    path = tmp_path / name
+    path.write_bytes(compress(writers[puzzleFormat]().encode()))
+    return str(path)
+
+
+def testEveryFormatIsCovered():
+    assert sorted(writers) == sorted(puzzleFormats)
+
+
+@pytest.mark.parametrize("compression", sorted(compressors))
+@pytest.mark.parametrize("puzzleFormat", sorted(writers))
+def testReadsEveryFormat(tmp_path, puzzleFormat, compression):
+    path = _writeFile(tmp_path, puzzleFormat, compression)
+    assert list(readPuzzleFile(path)) == puzzles
+    assert list(readPuzzleFile(path, puzzleFormat)) == puzzles
+
+
+@pytest.mark.parametrize("compression", sorted(compressors))
+@pytest.mark.parametrize("puzzleFormat", sorted(writers))
+def testDetectsTheFormatWithoutSuffix(tmp_path, puzzleFormat, compression):
+    path = _writeFile(tmp_path, puzzleFormat, compression, withSuffix=False)
+    assert list(readPuzzleFile(path)) == puzzles
+
+
+def testReadsStdin(monkeypatch):
+    stdin = io.TextIOWrapper(io.BufferedReader(io.BytesIO(gzip.compress(_csv().encode()))))
+    monkeypatch.setattr("sys.stdin", stdin)
+    assert list(readPuzzleFile("-")) == puzzles
+
+
+def testSkipsBrokenEntries(tmp_path):
+    path = tmp_path / "puzzles.txt"
+    path.write_text(f"{puzzles[0]}\nnot a puzzle\n{puzzles[1][:80]}\n{puzzles[2]}\n")
+    assert list(readPuzzleFile(str(path))) == [puzzles[0], puzzles[2]]
+
+
+def testRejectsUnknownFormats(tmp_path):
+    path = _writeFile(tmp_path, "lines", "plain")
+    with pytest.raises(ValueError):
+        list(readPuzzleFile(path, "xml"))
+
+
+@pytest.mark.parametrize("blank", ["0", "_", "*", "x", "."])
+def testNormalizesBlanks(blank):
+    assert normalizePuzzle(puzzles[0].replace(".", blank)) == puzzles[0]
+    assert normalizePuzzle(puzzles[0][:80]) is None
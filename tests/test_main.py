@@ -0,0 +1,64 @@
+"""The headless solve command, run like a user runs it, never touches the GUI."""
+
+import csv
+import io
+import os
+import subprocess
+import sys
+
+from conftest import contradictoryPuzzles, solvablePuzzles
+from Puzzle import SudokuPuzzle
+
+repoDir: str = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Runs src/main.py with PyQt6 blocked, then lists the GUI modules that got imported anyway
+_runMain: str = """
+import runpy, sys
+sys.modules["PyQt6"] = None
+sys.path.insert(0, "src")
+sys.argv[0] = "main.py"
+exitCode = 0
+try:
+    runpy.run_path("src/main.py", run_name="__main__")
+except SystemExit as err:
+    exitCode = err.code
+guiModules = [
+    name for name, module in sys.modules.items()
+    if module is not None and name.split(".")[0] in ("PyQt6", "ui")
+]
+print("GUI modules:", sorted(guiModules), file=sys.stderr)
+sys.exit(exitCode)
+"""
+
+
+def _solutionString(puzzleString: str) -> str:
+    puzzle = SudokuPuzzle(value=puzzleString)
+    result = puzzle.solve(useCache=False, useStore=False)
+    return "".join(result["solution"][sq] for sq in puzzle.squares)
+
+
+def testSolveCommand(tmp_path):
+    puzzleStrings = [
+        solvablePuzzles["easy"],
+        contradictoryPuzzles["duplicate"],
+        solvablePuzzles["hard"],
+    ]
+    inputPath = tmp_path / "puzzles.txt"
+    inputPath.write_text("".join(puzzleString + "\n" for puzzleString in puzzleStrings))
+    completed = subprocess.run(
+        [sys.executable, "-c", _runMain, "solve", "-i", str(inputPath), "--ordered"],
+        cwd=repoDir,
+        capture_output=True,
+        text=True,
+        timeout=120,
+    )
+    assert completed.returncode == 0, completed.stderr
+    assert "GUI modules: []" in completed.stderr
+    assert "3 puzzles (2 solved, 0 timed out, 0 errors)" in completed.stderr
+
+    rows = list(csv.DictReader(io.StringIO(completed.stdout)))
+    assert [row["Index"] for row in rows] == ["0", "1", "2"]
+    assert [row["Status"] for row in rows] == ["solved", "unsolvable", "solved"]
+    assert rows[0]["Solution"] == _solutionString(puzzleStrings[0])
+    assert rows[1]["Solution"] == ""
+    assert rows[2]["Solution"] == _solutionString(puzzleStrings[2])
@@ -0,0 +1,111 @@
+"""Every PySolver propagation rule on a grid built to need it, and the rule metrics of a solve."""
+
+import pytest
+from conftest import solvablePuzzles
+from Puzzle import SudokuPuzzle
+from solver.PySolver import (
+    PuzzleState,
+    _claiming,
+    _hiddenSingles,
+    _hiddenSubsets,
+    _nakedSubsets,
+    _pointing,
+    defaultRules,
+    propagationRules,
+    squares,
+)
+
+rowA: list[str] = [f"A{col}" for col in range(1, 10)]
+firstCell: list[str] = [row + col for row in "ABC" for col in "123"]
+
+
+def _state(candidates: dict[str, list[int]]) -> PuzzleState:
+    """A state where every square not in candidates can still hold any value."""
+    return PuzzleState({sq: candidates.get(sq, list(range(1, 10))) for sq in squares})
+
+
+def _without(sqs: list[str], *values: int) -> dict[str, list[int]]:
+    return {sq: [val for val in range(1, 10) if val not in values] for sq in sqs}
+
+
+def _holding(state: PuzzleState, val: int) -> list[str]:
+    return [sq for sq in squares if val in state.pzl[sq]]
+
+
+def testHiddenSingle():
+    state = _state(_without(rowA[1:], 5))
+    fixedQueue = []
+    assert _hiddenSingles(state, fixedQueue) == 8
+    assert state.pzl["A1"] == [5]
+    assert fixedQueue == ["A1"]
+    # No other place for a value in any family, nothing left to do
+    assert _hiddenSingles(state, []) == 0
+
+
+def testHiddenSingleWithoutPlace():
+    assert _hiddenSingles(_state(_without(rowA, 5)), []) == -1
+
+
+def testNakedPair():
+    state = _state({"A1": [1, 2], "A2": [1, 2]})
+    # The pair shares row A and the first cell, both lose 1 and 2 everywhere else
+    assert _nakedSubsets(state, [], 2) == 2 * (len(rowA) - 2) + 2 * 6
+    holders = sorted(set(rowA) | set(firstCell))
+    assert [sq for sq in holders if 1 in state.pzl[sq]] == ["A1", "A2"]
+    assert [sq for sq in holders if 2 in state.pzl[sq]] == ["A1", "A2"]
+
+
+def testNakedPairInThreeSquares():
+    state = _state({"A1": [1, 2], "A2": [1, 2], "A3": [1, 2]})
+    assert _nakedSubsets(state, [], 2) == -1
+
+
+def testHiddenPair():
+    state = _state(_without(rowA[2:], 1, 2))
+    assert _hiddenSubsets(state, [], 2) == 2 * 7
+    assert state.pzl["A1"] == state.pzl["A2"] == [1, 2]
+    assert _hiddenSubsets(state, [], 2) == 0
+
+
+def testPointing():
+    # 7 fits only in row A of the first cell, so the rest of row A can not hold it
+    state = _state(_without(firstCell[3:], 7))
+    assert _pointing(state, []) == 6
+    assert [sq for sq in rowA if 7 in state.pzl[sq]] == ["A1", "A2", "A3"]
+    assert len(_holding(state, 7)) == 81 - 6 - 6
+
+
+def testClaiming():
+    # 7 fits only in the first cell along row A, so the rest of that cell can not hold it
+    state = _state(_without(rowA[3:], 7))
+    assert _claiming(state, []) == 6
+    assert [sq for sq in firstCell if 7 in state.pzl[sq]] == ["A1", "A2", "A3"]
+    assert len(_holding(state, 7)) == 81 - 6 - 6
+
+
+def testRulesAreOffByDefault():
+    assert defaultRules == ()
+    result = SudokuPuzzle(value=solvablePuzzles["hard"]).solve(useCache=False, useStore=False)
+    assert result["ruleHits"] == {}
+    assert result["ruleDuration_ms"] == {}
+
+
+@pytest.mark.parametrize("rule", sorted(propagationRules))
+def testRuleMetrics(rule):
+    puzzle = SudokuPuzzle(value=solvablePuzzles["escargot"])
+    plain = puzzle.solve(useCache=False, useStore=False)
+    result = puzzle.solve(useCache=False, useStore=False, rules=(rule,))
+    assert result["solution"] == plain["solution"]
+    assert list(result["ruleHits"]) == [rule]
+    assert list(result["ruleDuration_ms"]) == [rule]
+    assert result["ruleHits"][rule] >= 0
+    assert result["ruleDuration_ms"][rule] > 0.0
+
+
+def testAllRulesCutTheGuesses():
+    puzzle = SudokuPuzzle(value=solvablePuzzles["escargot"])
+    plain = puzzle.solve(useCache=False, useStore=False)
+    result = puzzle.solve(useCache=False, useStore=False, rules=tuple(propagationRules))
+    assert result["solution"] == plain["solution"]
+    assert sum(result["ruleHits"].values()) > 0
+    assert result["numRecursions"] < plain["numRecursions"]
@@ -0,0 +1,155 @@
+"""PuzzleSearch, the resumable search behind every PySolver solve."""
+
+from itertools import islice
+
+import pytest
+from conftest import contradictoryPuzzles, solvablePuzzles
+from Puzzle import SudokuPuzzle
+from solver.PySolver import (
+    PuzzleSearch,
+    PuzzleState,
+    branchPolicies,
+    countSolutions,
+    iterSolutions,
+    solve,
+    squares,
+)
+
+
+def _puzzle(puzzleString: str) -> dict[str, list[int]]:
+    return {
+        sq: list(range(1, 10)) if value == "." else [int(value)]
+        for sq, value in zip(squares, puzzleString)
+    }
+
+
+def _solutionString(puzzleString: str) -> str:
+    solution = solve(_puzzle(puzzleString))["solution"]
+    return "".join(solution[sq] for sq in squares)
+
+
+def _twoSolutionPuzzle() -> str:
+    """The escargot solution with the four corners of a swappable rectangle blanked. The
+    rectangle spans two cells, so both ways of filling the corners are solutions.
+    """
+    grid = _solutionString(solvablePuzzles["escargot"])
+    for row1 in range(9):
+        for row2 in range(row1 + 1, 3 * (row1 // 3) + 3):
+            for col1 in range(9):
+                for col2 in range(col1 + 1, 9):
+                    corners = [9 * row1 + col1, 9 * row1 + col2, 9 * row2 + col1, 9 * row2 + col2]
+                    a, b, c, d = (grid[idx] for idx in corners)
+                    if col1 // 3 != col2 // 3 and a == d and b == c:
+                        return "".join("." if idx in corners else v for idx, v in enumerate(grid))
+    raise AssertionError("No swappable rectangle")
+
+
+def _assertConsistent(state: PuzzleState) -> None:
+    """The buckets and counts kept up to date by the state match a full rescan of the puzzle."""
+    rescan = PuzzleState(state.pzl)
+    assert [set(bucket) for bucket in state.sizeBuckets] == [
+        set(bucket) for bucket in rescan.sizeBuckets
+    ]
+    assert state.valueCounts == rescan.valueCounts
+    assert state.familyCounts == rescan.familyCounts
+    assert state.numMissingValues == rescan.numMissingValues
+    assert state.numUnsolved == rescan.numUnsolved
+
+
+@pytest.mark.parametrize("policy", branchPolicies)
+def testPoliciesAgree(policy, solvablePuzzle):
+    reference = solve(_puzzle(solvablePuzzle))
+    result = solve(_puzzle(solvablePuzzle), policy=policy)
+    assert result["status"] == "solved"
+    assert result["solution"] == reference["solution"]
+
+
+def testUnknownPolicy():
+    with pytest.raises(ValueError):
+        PuzzleSearch(_puzzle(solvablePuzzles["easy"]), policy="random")
+
+
+@pytest.mark.parametrize("policy", branchPolicies)
+def testStateStaysConsistent(policy):
+    puzzle = _puzzle(solvablePuzzles["escargot"])
+    search = PuzzleSearch(puzzle, ("hiddenSingles", "pointing"), policy)
+    _assertConsistent(search.state)
+    # Every node propagates, and every guess after the first undoes the node before it
+    for solution in search.steps(1):
+        _assertConsistent(search.state)
+        if solution:
+            break
+    assert search.numRecursions > 0
+    search.state.rollback(0)
+    _assertConsistent(search.state)
+    assert search.state.pzl == puzzle
+
+
+def testCountSolutions(solvablePuzzle, contradictoryPuzzle):
+    assert countSolutions(_puzzle(solvablePuzzle)) == 1
+    assert countSolutions(_puzzle(solvablePuzzle), limit=None) == 1
+    assert countSolutions(_puzzle(contradictoryPuzzle)) == 0
+
+
+def testCountStopsAtTheLimit():
+    twoSolutions = _puzzle(_twoSolutionPuzzle())
+    assert countSolutions(twoSolutions, limit=None) == 2
+    assert countSolutions(twoSolutions) == 2
+    assert countSolutions(twoSolutions, limit=1) == 1
+    # The empty grid has billions of solutions, the count only runs as far as the limit
+    assert countSolutions(_puzzle("." * 81), limit=5) == 5
+
+
+def testIterSolutions():
+    puzzleString = _twoSolutionPuzzle()
+    solutions = ["".join(sol[sq] for sq in squares) for sol in iterSolutions(_puzzle(puzzleString))]
+    assert len(set(solutions)) == 2
+    assert _solutionString(solvablePuzzles["escargot"]) in solutions
+    for solution in solutions:
+        assert all(given in (".", value) for given, value in zip(puzzleString, solution))
+        assert solve(_puzzle(solution))["status"] == "solved"
+    emptySolutions = list(islice(iterSolutions(_puzzle("." * 81)), 3))
+    assert len({tuple(sol.values()) for sol in emptySolutions}) == 3
+
+
+@pytest.mark.parametrize("runtime", ["python", "pybits", "pydlx", "lua", "luajit"])
+def testEveryRuntimeCounts(runtime):
+    if runtime in ("lua", "luajit"):
+        pytest.importorskip("lupa")
+    assert SudokuPuzzle(lang=runtime, value=_twoSolutionPuzzle()).countSolutions() == 2
+    assert SudokuPuzzle(lang=runtime, value=solvablePuzzles["hard"]).countSolutions() == 1
+    puzzle = SudokuPuzzle(lang=runtime, value=contradictoryPuzzles["noValueLeft"])
+    assert puzzle.countSolutions() == 0
+
+
+def testStepsMatchASingleRun():
+    puzzle = _puzzle(solvablePuzzles["escargot"])
+    reference = solve(puzzle)
+    search = PuzzleSearch(puzzle)
+    solutions = [solution for solution in search.steps(7) if solution]
+    assert solutions[0] == reference["solution"]
+    assert search.isExhausted
+    assert search.advance() is None
+
+
+def testSavedSearchResumes(tmp_path):
+    puzzle = _puzzle(solvablePuzzles["escargot"])
+    reference = PuzzleSearch(puzzle, ("hiddenSingles",))
+    expected = reference.advance()
+    expectedResult = reference.result(expected, 0.0)
+
+    search = PuzzleSearch(puzzle, ("hiddenSingles",))
+    assert search.advance(10) is None
+    assert search.numNodes == 10
+    search.save(str(tmp_path / "search.pkl"))
+    resumed = PuzzleSearch.load(str(tmp_path / "search.pkl"))
+    assert resumed.numNodes == 10
+    assert resumed.activeRules == search.activeRules
+
+    solution = resumed.advance()
+    assert solution == expected
+    result = resumed.result(solution, 0.0)
+    for metric in ("numNodes", "numRecursions", "numOperations", "bestSinglePass", "ruleHits"):
+        assert result[metric] == expectedResult[metric]
+    # The search it was saved from still runs on its own
+    assert search.advance() == expected
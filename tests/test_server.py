@@ -0,0 +1,151 @@
+"""Requests against a running PuzzleServer on a local port."""
+
+import asyncio
+import json
+import socket
+from concurrent.futures.process import BrokenProcessPool
+from contextlib import asynccontextmanager
+
+from conftest import contradictoryPuzzles, solvablePuzzles
+from Puzzle import SudokuPuzzle
+from PuzzleServer import PuzzleServer
+
+
+def _freePort() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+@asynccontextmanager
+async def _running(**serverOptions):
+    server = PuzzleServer(workers=1, **serverOptions)
+    port = _freePort()
+    serveTask = asyncio.create_task(server.serve("127.0.0.1", port))
+    try:
+        while server.pool is None or server._batchSlots is None:
+            await asyncio.sleep(0.01)
+        while True:
+            try:
+                _, writer = await asyncio.open_connection("127.0.0.1", port)
+                writer.close()
+                break
+            except ConnectionError:
+                await asyncio.sleep(0.01)
+        yield server, port
+    finally:
+        serveTask.cancel()
+        try:
+            await serveTask
+        except asyncio.CancelledError:
+            pass
+
+
+async def _request(port: int, method: str, path: str, body=None) -> tuple[int, dict]:
+    reader, writer = await asyncio.open_connection("127.0.0.1", port)
+    data = b"" if body is None else json.dumps(body).encode()
+    writer.write(
+        f"{method} {path} HTTP/1.1\r\nContent-Length: {len(data)}\r\n"
+        "Connection: close\r\n\r\n".encode()
+        + data
+    )
+    await writer.drain()
+    response = await reader.read()
+    writer.close()
+    head, _, payload = response.partition(b"\r\n\r\n")
+    return int(head.split()[1]), json.loads(payload)
+
+
+def _solutionString(puzzleString: str) -> str:
+    puzzle = SudokuPuzzle(value=puzzleString)
+    result = puzzle.solve(useCache=False, useStore=False)
+    return "".join(result["solution"][sq] for sq in puzzle.squares)
+
+
+def testSolveRequests():
+    async def scenario():
+        async with _running() as (server, port):
+            status, result = await _request(port, "POST", "/solve", solvablePuzzles["hard"])
+            assert status == 200
+            assert result["status"] == "solved"
+            assert result["solution"] == _solutionString(solvablePuzzles["hard"])
+
+            puzzleStrings = [solvablePuzzles["easy"], contradictoryPuzzles["duplicate"]]
+            status, payload = await _request(port, "POST", "/solve", {"puzzles": puzzleStrings})
+            assert status == 200
+            assert [result["status"] for result in payload["results"]] == ["solved", "unsolvable"]
+
+            status, stats = await _request(port, "GET", "/stats")
+            assert status == 200
+            assert stats["numPuzzles"] == 3
+            status, health = await _request(port, "GET", "/health")
+            assert (status, health["status"]) == (200, "ok")
+
+    asyncio.run(scenario())
+
+
+def testBadRequests():
+    async def scenario():
+        async with _running() as (server, port):
+            status, payload = await _request(port, "POST", "/solve", {"puzzle": "1.2"})
+            assert status == 400
+            assert "error" in payload
+            status, _ = await _request(port, "POST", "/solve", [solvablePuzzles["easy"], 7])
+            assert status == 400
+            reader, writer = await asyncio.open_connection("127.0.0.1", port)
+            writer.write(
+                b"POST /solve HTTP/1.1\r\nContent-Length: 5\r\nConnection: close\r\n\r\n{nope"
+            )
+            response = await reader.read()
+            writer.close()
+            assert response.startswith(b"HTTP/1.1 400")
+            for malformed in (
+                b"GARBAGE\r\n\r\n",
+                b"POST /solve HTTP/1.1\r\nContent-Length: lots\r\n\r\n",
+                b"POST /solve HTTP/1.1\r\nContent-Length: -5\r\n\r\n",
+            ):
+                reader, writer = await asyncio.open_connection("127.0.0.1", port)
+                writer.write(malformed)
+                response = await reader.read()
+                writer.close()
+                head, _, payload = response.partition(b"\r\n\r\n")
+                assert head.startswith(b"HTTP/1.1 400")
+                assert b"Connection: close" in head
+                assert "error" in json.loads(payload)
+            status, _ = await _request(port, "GET", "/solve")
+            assert status == 405
+            status, _ = await _request(port, "GET", "/nowhere")
+            assert status == 404
+
+    asyncio.run(scenario())
+
+
+def testFullQueueIsRejected():
+    async def scenario():
+        async with _running(maxQueue=2) as (server, port):
+            puzzleStrings = [solvablePuzzles["easy"]] * 3
+            status, payload = await _request(port, "POST", "/solve", puzzleStrings)
+            assert status == 503
+            assert "full" in payload["error"]
+            assert server.stats()["numRejected"] == 1
+            # Requests that fit are still served
+            status, _ = await _request(port, "POST", "/solve", puzzleStrings[:2])
+            assert status == 200
+
+    asyncio.run(scenario())
+
+
+def testFailedBatchIsAnInternalError():
+    async def scenario():
+        async with _running() as (server, port):
+
+            def brokenSubmit(*args, **kwargs):
+                raise BrokenProcessPool("A worker died")
+
+            server.pool.submit = brokenSubmit
+            status, payload = await _request(port, "POST", "/solve", solvablePuzzles["easy"])
+            assert status == 500
+            assert "BrokenProcessPool" in payload["error"]
+            assert not server._batchTasks
+
+    asyncio.run(scenario())
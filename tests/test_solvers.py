@@ -0,0 +1,122 @@
+"""Every python runtime has to agree with PySolver, the reference solver."""
+
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+from conftest import contradictoryPuzzles, solvablePuzzles
+from Puzzle import SudokuPuzzle
+from solver import PyParallelSolver
+
+# Runtimes checked against the python runtime
+alternativeRuntimes: list[str] = ["pybits", "pydlx", "pyparallel"]
+
+
+@pytest.fixture(autouse=True, scope="module")
+def _stopParallelPools():
+    yield
+    PyParallelSolver.shutdown()
+
+
+def _solve(runtime: str, puzzleString: str) -> dict:
+    return SudokuPuzzle(lang=runtime, value=puzzleString).solve(useCache=False, useStore=False)
+
+
+def _isValidSolution(puzzleString: str, solution: dict[str, str]) -> bool:
+    puzzle = SudokuPuzzle(value=puzzleString)
+    solutionString = "".join(solution[sq] for sq in puzzle.squares)
+    givensKept = all(given in (".", value) for given, value in zip(puzzleString, solutionString))
+    rows = [solutionString[9 * row : 9 * row + 9] for row in range(9)]
+    cols = ["".join(row[col] for row in rows) for col in range(9)]
+    boxes = [
+        "".join(rows[r][c] for r in range(br, br + 3) for c in range(bc, bc + 3))
+        for br in (0, 3, 6)
+        for bc in (0, 3, 6)
+    ]
+    return givensKept and all(set(unit) == set("123456789") for unit in rows + cols + boxes)
+
+
+def testReferenceSolvesPuzzles(solvablePuzzle):
+    result = _solve("python", solvablePuzzle)
+    assert result["status"] == "solved"
+    assert _isValidSolution(solvablePuzzle, result["solution"])
+
+
+def testReferenceRejectsContradictions(contradictoryPuzzle):
+    result = _solve("python", contradictoryPuzzle)
+    assert result["status"] == "unsolvable"
+    assert result["solution"] is False
+
+
+@pytest.mark.parametrize("runtime", alternativeRuntimes)
+def testRuntimeAgreesOnSolvablePuzzles(runtime, solvablePuzzle):
+    expected = _solve("python", solvablePuzzle)
+    result = _solve(runtime, solvablePuzzle)
+    assert result["status"] == "solved"
+    assert result["solution"] == expected["solution"]
+    assert result["numNodes"] >= 1
+
+
+@pytest.mark.parametrize("runtime", alternativeRuntimes)
+def testRuntimeAgreesOnContradictions(runtime, contradictoryPuzzle):
+    result = _solve(runtime, contradictoryPuzzle)
+    assert result["status"] == "unsolvable"
+    assert result["solution"] is False
+
+
+def testBatchSolverAgrees():
+    np = pytest.importorskip("numpy")
+    from solver.PyBatchSolver import solveBatch, solutionStrings
+
+    puzzleStrings = [*solvablePuzzles.values(), *contradictoryPuzzles.values()]
+    result = solveBatch(puzzleStrings, chunkSize=3)
+    solutions = solutionStrings(result["solution"])
+    for puzzleString, isSolved, solutionString in zip(
+        puzzleStrings, result["isSolved"], solutions
+    ):
+        expected = _solve("python", puzzleString)
+        assert bool(isSolved) == (expected["status"] == "solved")
+        if isSolved:
+            puzzle = SudokuPuzzle(value=puzzleString)
+            assert solutionString == "".join(expected["solution"][sq] for sq in puzzle.squares)
+    assert not np.any(result["solution"][~result["isSolved"]])
+
+
+@pytest.mark.parametrize("workers", [1, 2])
+def testParallelSolverAgreesWithSharedPool(workers):
+    puzzle = SudokuPuzzle(value=solvablePuzzles["escargot"])
+    expected = _solve("python", solvablePuzzles["escargot"])
+    # The first solve starts the workers, forking from the threads below could deadlock
+    assert PyParallelSolver.solve(puzzle.value, workers=workers)["status"] == "solved"
+    # Solves sharing a pool must not cancel each other
+    with ThreadPoolExecutor(4) as threads:
+        results = list(
+            threads.map(lambda _: PyParallelSolver.solve(puzzle.value, workers=workers), range(4))
+        )
+    for result in results:
+        assert result["status"] == "solved"
+        assert result["solution"] == expected["solution"]
+        assert result["workers"] == workers
+        assert 0 < len(result["workerNodes"]) <= workers
+        numSubtreeNodes = sum(result["workerNodes"].values())
+        assert result["numNodes"] == result["frontierNodes"] + numSubtreeNodes
+        assert result["frontierRecursions"] <= result["numRecursions"]
+
+
+def testBitSolverCountsOnlyValidGuesses(monkeypatch):
+    from solver import PyBitSolver
+
+    guesses = []
+    squareFamiliesValid = PyBitSolver.squareFamiliesValid
+
+    def _recordGuess(masks, idx):
+        isValid = squareFamiliesValid(masks, idx)
+        guesses.append(isValid)
+        return isValid
+
+    monkeypatch.setattr(PyBitSolver, "squareFamiliesValid", _recordGuess)
+    result = _solve("pybits", solvablePuzzles["escargot"])
+    assert result["status"] == "solved"
+    # Like PySolver, a guess that leaves a family without a place for a value is not a recursion
+    assert not all(guesses)
+    assert result["numRecursions"] == guesses.count(True)
+    assert result["numNodes"] == result["numRecursions"] + 1
@@ -0,0 +1,120 @@
+"""The persistent solution store buffers writes and keeps metrics per runtime."""
+
+import pytest
+from conftest import contradictoryPuzzles, solvablePuzzles
+from Puzzle import SudokuPuzzle
+from PuzzleCache import solutionCache
+from PuzzleStore import SolutionStore
+
+puzzleString: str = solvablePuzzles["hard"]
+
+
+def _entry(runtime: str = "python") -> dict:
+    puzzle = SudokuPuzzle(lang=runtime, value=puzzleString)
+    result = puzzle.solve(useCache=False, useStore=False)
+    return dict(result, solution="".join(result["solution"][sq] for sq in puzzle.squares))
+
+
+@pytest.fixture
+def store(tmp_path):
+    store = SolutionStore(str(tmp_path / "store" / "solutions.sqlite3"), batchSize=1000)
+    yield store
+    store.close()
+
+
+def testMissIsNone(store):
+    assert store.get(puzzleString) is None
+    assert store.stats()["numMisses"] == 1
+
+
+def testPendingResultsAreVisible(store):
+    entry = _entry()
+    store.put(puzzleString, "python", entry)
+    assert store.stats()["numPending"] == 1
+    hit = store.get(puzzleString, "python")
+    assert hit["solution"] == entry["solution"]
+    assert hit["status"] == "solved"
+    assert hit["runtime"] == "python"
+    assert hit["numRecursions"] == entry["numRecursions"]
+
+
+def testFlushCommits(store):
+    entry = _entry()
+    store.put(puzzleString, "python", entry)
+    unsolvableEntry = {"solution": False, "status": "unsolvable"}
+    store.put(contradictoryPuzzles["duplicate"], "python", unsolvableEntry)
+    store.flush()
+    assert store.stats()["numPending"] == 0
+    assert store.stats()["numFlushes"] == 1
+
+    reopened = SolutionStore(store.path)
+    try:
+        assert reopened.get(puzzleString)["solution"] == entry["solution"]
+        unsolvable = reopened.get(contradictoryPuzzles["duplicate"])
+        assert unsolvable["solution"] is False
+        assert unsolvable["status"] == "unsolvable"
+        assert reopened.stats()["numPuzzles"] == 2
+    finally:
+        reopened.close()
+
+
+def testCloseWritesPendingResults(store):
+    store.put(puzzleString, "python", _entry())
+    store.close()
+    reopened = SolutionStore(store.path)
+    try:
+        assert reopened.get(puzzleString)["status"] == "solved"
+    finally:
+        reopened.close()
+
+
+def testMetricsPerRuntime(store):
+    store.put(puzzleString, "python", _entry("python"))
+    store.put(puzzleString, "pydlx", _entry("pydlx"))
+    store.flush()
+    assert store.get(puzzleString, "pydlx")["numRecursions"] == _entry("pydlx")["numRecursions"]
+    assert store.get(puzzleString, "python")["numRecursions"] == _entry("python")["numRecursions"]
+    # A runtime that never solved the puzzle gets the metrics of another one, named as such
+    assert store.get(puzzleString, "pybits")["runtime"] in ("python", "pydlx")
+
+
+def testSolveUsesTheStore(store, monkeypatch):
+    import PuzzleStore
+
+    monkeypatch.setattr(PuzzleStore, "_store", store)
+    solutionCache.clear()
+    try:
+        first = SudokuPuzzle(value=puzzleString).solve(useCache=False)
+        assert "storeHit" not in first
+        hit = SudokuPuzzle(value=puzzleString).solve(useCache=False)
+        assert hit["storeHit"]
+        assert hit["solution"] == first["solution"]
+        # Other solver options have other metrics, they neither read nor write the store
+        other = SudokuPuzzle(value=solvablePuzzles["easy"]).solve(useCache=False, policy="mrv")
+        assert "storeHit" not in other
+        assert store.get(solvablePuzzles["easy"]) is None
+    finally:
+        solutionCache.clear()
+
+
+def testPortfolioMetricsAreKeyedByTheWinner(store, monkeypatch):
+    import PuzzlePortfolio
+    import PuzzleStore
+
+    monkeypatch.setattr(PuzzleStore, "_store", store)
+    solutionCache.clear()
+    try:
+        puzzle = SudokuPuzzle(value=puzzleString)
+        result = puzzle.solve(portfolio=[{"runtime": "python", "policy": "mrv"}], useCache=False)
+        assert result["portfolio"]["winner"] == "python:policy=mrv"
+        assert store.get(puzzleString, "python:policy=mrv")["runtime"] == "python:policy=mrv"
+        assert store.get(puzzleString, "python")["runtime"] == "python:policy=mrv"
+        # A hit ran no race, it has no portfolio and does not count as a win
+        numWins = sum(PuzzlePortfolio.portfolioWins.values())
+        hit = puzzle.solve(portfolio=True, useCache=False)
+        assert hit["storeHit"]
+        assert "portfolio" not in hit
+        assert sum(PuzzlePortfolio.portfolioWins.values()) == numWins
+    finally:
+        PuzzlePortfolio.shutdown()
+        solutionCache.clear()